@@ -1,25 +1,48 @@
 import os
 import re
 import io
+import csv
+import zlib
+import tempfile
+import json
 import base64
 import time
+import hmac
+import atexit
+import math
+import functools
+import threading
+_startup_started = time.perf_counter()
 import datetime
-import pandas as pd
+import decimal
 import pymysql
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context, g
 from werkzeug.utils import secure_filename
 from fpdf import FPDF
 import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
 # External Data
-from Courses import KEYWORDS, SKILLS_DICT, COURSES, JOB_DESCRIPTIONS
+from Courses import KEYWORDS, SKILLS_DICT, JOB_DESCRIPTIONS
 from celery import Celery
 
 # Internal Utils
-from utils import pdf_reader, clean_text_nltk, extract_resume_data, parse_resume_sections, predict_field_fast, calculate_rigorous_score, mask_pii
+from utils import normalize_text, parse_resume, predict_field_fast, calculate_rigorous_score, mask_pii, warm_job_description_cache, RESUME_CACHE, JD_CACHE
+from utils import WARM_MODELS, warm_models, model_stats, start_model_usage, end_model_usage
+from utils import SEMANTIC_MODEL_NAME, get_job_description, resume_embeddings
 
 # Import the background task
-from batch_selector import process_batch_task
+from batch_selector import process_batch_task, get_batch_status
+from db_pool import ConnectionPool, TimedCursor
+from migrations import LATEST_SCHEMA_VERSION, run_migrations, schema_version
+from skill_stats import record_skills, retry_deadlocks, top_skills, top_skills_by_field
+from write_behind import WriteBehindQueue, candidate_record, insert_candidates
+from semantic_index import CandidateIndex, EMBEDDING_KINDS
+from skill_index import SkillIndex, SkillQueryError
+import metrics
+from metrics import FILES, FILE_BYTES
+import profiling
+from shortlist_pool import SHORTLIST_WORKERS, score_resume_files, score_resume_files_parallel, iter_score_resume_files, get_shortlist_pool
 
 # --- CONFIGURATION ---
 app = Flask(__name__)
@@ -49,49 +72,398 @@ app.config.update(
 
 celery = make_celery(app)
 
-# --- DATABASE CONNECTION ---
-try:
-    connection = pymysql.connect(host='localhost', user='root', password='')
+# --- JOB DESCRIPTION CACHE ---
+# Compile the preset JDs once at startup (set JD_CACHE_PATH to keep them across restarts)
+warm_job_description_cache()
+
+# --- MODEL USAGE PER ROUTE ---
+# Models load on first use; this records which routes actually touch them.
+ROUTE_MODEL_USAGE = {}
+
+@app.before_request
+def track_model_usage():
+    start_model_usage()
+
+@app.after_request
+def record_model_usage(response):
+    # Counted when the response is closed, so streamed bodies are included
+    endpoint = request.endpoint or 'unknown'
+    def record():
+        usage = ROUTE_MODEL_USAGE.setdefault(endpoint, {'requests': 0, 'model_uses': {}})
+        usage['requests'] += 1
+        for name, uses in end_model_usage().items():
+            usage['model_uses'][name] = usage['model_uses'].get(name, 0) + uses
+    response.call_on_close(record)
+    return response
+
+# --- METRICS ---
+# GET /metrics in Prometheus text format; pipeline stages, cache lookups and DB
+# statements are recorded where they happen (utils, db_pool, write_behind).
+HTTP_SECONDS = metrics.histogram('cv_http_request_seconds', 'Request time by route, method and status, streamed bodies included.',
+                                 ['route', 'method', 'status'])
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        # The route pattern, not the path, so /api/candidate/<int:id> is one series
+        labels = {'route': request.url_rule.rule if request.url_rule else 'unmatched', 'method': request.method, 'status': response.status_code}
+        response.call_on_close(lambda: HTTP_SECONDS.observe(time.perf_counter() - started, **labels))
+    return response
+
+def count_upload(source, file=None, size=None):
+    """Counts a received resume file; for an upload the size is read from its (spooled) stream."""
+    if size is None and file is not None:
+        try:
+            stream = file.stream
+            position = stream.tell()
+            size = stream.seek(0, os.SEEK_END)
+            stream.seek(position)
+        except Exception:
+            size = None
+    FILES.inc(source=source)
+    if size is not None: FILE_BYTES.observe(size, source=source)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+# --- PROFILING ---
+# PROFILE_TOKEN set: an admin profiles one upload / shortlist / generator parse
+# (cProfile + tracemalloc) by sending it in X-Profile-Token or ?profile=; the
+# response's X-Profile-Id names the saved artifacts (GET /api/profiles).
+# PROFILE_SLOW_SECONDS > 0 samples those routes' stacks and keeps a profile of
+# every request slower than that. With neither set the routes are not wrapped.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SLOW_SECONDS = float(os.environ.get('PROFILE_SLOW_SECONDS', 0))
+
+def profile_requested():
+    token = request.headers.get('X-Profile-Token') or request.args.get('profile', '')
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+def profiled_route(view):
+    if not PROFILE_TOKEN and not PROFILE_SLOW_SECONDS: return view
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        meta = {'route': request.path, 'method': request.method, 'files': [f.filename for f in request.files.values()]}
+        if profile_requested():
+            g.profiling = True
+            with profiling.DetailedProfile() as profile:
+                response = app.make_response(view(*args, **kwargs))
+            profile_id = profile.save(profiling.new_profile_id(request.endpoint), dict(meta, trigger='requested', status=response.status_code))
+            response.headers['X-Profile-Id'] = profile_id
+            print(f"Profiled {request.path} in {profile.seconds:.2f}s -> {profile_id}")
+            return response
+        if not PROFILE_SLOW_SECONDS: return view(*args, **kwargs)
+        with profiling.SampledProfile() as profile:
+            response = view(*args, **kwargs)
+        if profile.seconds >= PROFILE_SLOW_SECONDS:
+            profile_id = profile.save(profiling.new_profile_id(request.endpoint), dict(meta, trigger='slow'))
+            print(f"Slow request {request.path} ({profile.seconds:.2f}s), profile saved -> {profile_id}")
+        return response
+    return wrapper
+
+def require_profile_token():
+    if not profile_requested(): return jsonify({'error': 'Profiling access needs PROFILE_TOKEN'}), 403
+
+@app.route('/api/profiles')
+def list_profiles():
+    """Saved profiles, newest first."""
+    denied = require_profile_token()
+    if denied: return denied
+    return jsonify(profiling.list_profiles())
+
+@app.route('/api/profiles/<profile_id>/<kind>')
+def download_profile(profile_id, kind):
+    """One artifact of a saved profile: prof, txt, folded or json."""
+    denied = require_profile_token()
+    if denied: return denied
+    path = profiling.profile_path(profile_id, kind)
+    if not path: return jsonify({'error': 'Profile not found'}), 404
+    return send_file(os.path.abspath(path), mimetype=profiling.ARTIFACT_KINDS[kind], as_attachment=True, download_name=f"{profile_id}.{kind}")
+
+# --- DATABASE CONNECTION POOL ---
+# One connection per request, checked out on first use and returned at teardown.
+DB_HOST = os.environ.get('DB_HOST', 'localhost')
+DB_USER = os.environ.get('DB_USER', 'root')
+DB_PASSWORD = os.environ.get('DB_PASSWORD', '')
+DB_NAME = os.environ.get('DB_NAME', 'cv')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+# Connections idle for longer than this are pinged before reuse
+DB_HEALTH_CHECK_INTERVAL = float(os.environ.get('DB_HEALTH_CHECK_INTERVAL', 30))
+
+# Migrations are run from the CLI (python migrations.py) before deploying. With this set,
+# the app's first connection applies them instead (single-process development setups)
+DB_MIGRATE_ON_CONNECT = os.environ.get('DB_MIGRATE_ON_CONNECT', 'false').lower() == 'true'
+
+def create_schema(connection):
     cursor = connection.cursor()
-except Exception as e:
-    print(f"DB Connection Error: {e}")
-    connection = None
-    cursor = None
-
-if connection:
-    cursor.execute("CREATE DATABASE IF NOT EXISTS cv")
-    cursor.execute("USE cv")
-    
-    table_sql = """
-    CREATE TABLE IF NOT EXISTS user_data (
-        ID INT NOT NULL AUTO_INCREMENT,
-        Name varchar(500) NOT NULL,
-        Email_ID VARCHAR(500) NOT NULL,
-        resume_score VARCHAR(8) NOT NULL,
-        Timestamp VARCHAR(50) NOT NULL,
-        Page_no VARCHAR(5) NOT NULL,
-        Predicted_Field BLOB NOT NULL,
-        User_level BLOB NOT NULL,
-        Recommended_skills BLOB NOT NULL,
-        Recommended_courses BLOB NOT NULL,
-        PRIMARY KEY (ID)
-    );
-    """
-    cursor.execute(table_sql)
-
-    skills_table_sql = """
-    CREATE TABLE IF NOT EXISTS user_skills (
-        ID INT NOT NULL AUTO_INCREMENT,
-        user_id INT NOT NULL,
-        skill_name VARCHAR(100) NOT NULL,
-        PRIMARY KEY (ID),
-        FOREIGN KEY (user_id) REFERENCES user_data(ID) ON DELETE CASCADE
-    );
-    """
-    cursor.execute(skills_table_sql)
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+    cursor.execute(f"USE {DB_NAME}")
+    # Tables, column types and indexes are versioned in migrations.py
+    run_migrations(connection)
+    connection.commit()
+
+def check_schema(connection):
+    try:
+        version = schema_version(connection)
+    except pymysql.err.ProgrammingError:
+        version = 0
+    if version < LATEST_SCHEMA_VERSION:
+        print(f"Database schema is at version {version} of {LATEST_SCHEMA_VERSION}: run `python migrations.py` "
+              "(or set DB_MIGRATE_ON_CONNECT=true)")
+
+_schema_ready = False
+
+def connect_db():
+    # The schema is migrated (or, by default, only checked) by the first connection
+    # that succeeds, so a MySQL server that comes up after the app is still covered.
+    global _schema_ready
+    if not _schema_ready and DB_MIGRATE_ON_CONNECT:
+        bootstrap = pymysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD)
+        try: create_schema(bootstrap)
+        finally: bootstrap.close()
+    connection = pymysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME, cursorclass=TimedCursor)
+    if not _schema_ready:
+        check_schema(connection)
+        _schema_ready = True
+    return connection
+
+db_pool = ConnectionPool(connect_db, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, health_check_interval=DB_HEALTH_CHECK_INTERVAL)
+
+def get_db():
+    """This request's pooled connection, or None if the database is unreachable."""
+    if 'db' not in g:
+        try:
+            g.db = db_pool.acquire()
+        except Exception as e:
+            print(f"DB Connection Error: {e}")
+            g.db = None
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc=None):
+    # Any uncommitted work is rolled back and a dead connection is dropped instead of pooled
+    connection = g.pop('db', None)
+    if connection is not None: db_pool.release(connection)
+
+def collect_db_pool():
+    stats = db_pool.stats()
+    return [
+        ('cv_db_pool_connections', 'gauge', 'Pooled database connections by state.',
+         [({'state': 'in_use'}, stats['in_use']), ({'state': 'idle'}, stats['idle'])]),
+        ('cv_db_pool_checkouts_total', 'counter', 'Connections checked out of the pool.', [({}, stats['checkouts'])]),
+        ('cv_db_pool_wait_seconds_total', 'counter', 'Time requests waited for a free connection.', [({}, stats['wait_seconds_total'])]),
+        ('cv_db_pool_timeouts_total', 'counter', 'Requests that gave up waiting for a connection.', [({}, stats['timeouts'])]),
+    ]
+
+metrics.register_collector(collect_db_pool)
+
+# --- WRITE-BEHIND ---
+# WRITE_BEHIND=true takes the /api/upload INSERTs off the request: candidates are
+# queued and written in multi-row batches (see write_behind.py)
+WRITE_BEHIND = os.environ.get('WRITE_BEHIND', 'false').lower() == 'true'
+WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', 200))
+WRITE_FLUSH_INTERVAL = float(os.environ.get('WRITE_FLUSH_INTERVAL', 1.0))
+WRITE_MAX_PENDING = int(os.environ.get('WRITE_MAX_PENDING', 5000))
+# Queued candidates are saved here on shutdown (and past WRITE_MAX_PENDING) and written on the next start
+WRITE_SPILL_PATH = os.environ.get('WRITE_SPILL_PATH', os.path.join('outputs', 'write_behind_spill.jsonl'))
+
+# --- SEMANTIC CANDIDATE INDEX ---
+# FAISS index over the stored candidate embeddings (see semantic_index.py):
+# SEMANTIC_INDEX is auto, flat, ivf or hnsw
+SEMANTIC_INDEX = os.environ.get('SEMANTIC_INDEX', 'auto')
+SEMANTIC_INDEX_FLAT_MAX = int(os.environ.get('SEMANTIC_INDEX_FLAT_MAX', 100000))
+SEMANTIC_IVF_LISTS = int(os.environ.get('SEMANTIC_IVF_LISTS', 0)) or None
+SEMANTIC_IVF_NPROBE = int(os.environ.get('SEMANTIC_IVF_NPROBE', 16))
+SEMANTIC_HNSW_M = int(os.environ.get('SEMANTIC_HNSW_M', 32))
+# How often a search checks the database for candidates added by other processes
+SEMANTIC_SYNC_INTERVAL = float(os.environ.get('SEMANTIC_SYNC_INTERVAL', 5))
+SEMANTIC_SEARCH_MAX_K = 500
+
+_candidate_index = None
+
+def get_candidate_index():
+    """The candidate index; it is built from the database by its first sync()."""
+    global _candidate_index
+    if _candidate_index is None:
+        _candidate_index = CandidateIndex(SEMANTIC_MODEL_NAME, index_type=SEMANTIC_INDEX, flat_max=SEMANTIC_INDEX_FLAT_MAX,
+                                          ivf_lists=SEMANTIC_IVF_LISTS, ivf_nprobe=SEMANTIC_IVF_NPROBE, hnsw_m=SEMANTIC_HNSW_M,
+                                          sync_interval=SEMANTIC_SYNC_INTERVAL)
+    return _candidate_index
+
+# --- SKILL INDEX ---
+# Roaring bitmaps of candidate IDs per skill, for boolean skill search (see skill_index.py)
+SKILL_INDEX_SYNC_INTERVAL = float(os.environ.get('SKILL_INDEX_SYNC_INTERVAL', 5))
+SKILL_SEARCH_PAGE_SIZE = int(os.environ.get('SKILL_SEARCH_PAGE_SIZE', 50))
+SKILL_SEARCH_MAX_PAGE_SIZE = 10000
+
+_skill_index = None
+
+def get_skill_index():
+    """The skill index; it is built from the database by its first sync()."""
+    global _skill_index
+    if _skill_index is None: _skill_index = SkillIndex(sync_interval=SKILL_INDEX_SYNC_INTERVAL)
+    return _skill_index
+
+def build_skill_index():
+    try:
+        with db_pool.connection() as connection:
+            get_skill_index().sync(connection)
+        print(f"Skill index ready: {get_skill_index().stats()['candidates']} candidates")
+    except Exception as e:
+        print(f"Skill index build error: {e}")
+
+def index_candidates(records, ids):
+    # Called after candidates are committed; an index that is not built yet reads them from the database.
+    # Records insert_candidates skipped as already stored have no new ID
+    stored = [(user_id, record) for user_id, record in zip(ids, records) if user_id is not None]
+    ids, records = [user_id for user_id, _ in stored], [record for _, record in stored]
+    if _candidate_index is not None: _candidate_index.add_records(ids, records)
+    if _skill_index is not None:
+        for user_id, record in zip(ids, records): _skill_index.add(user_id, record['skills'])
+
+def unindex_candidates(ids):
+    if _candidate_index is not None: _candidate_index.remove(ids)
+    if _skill_index is not None: _skill_index.remove(ids)
+
+_candidate_writer = None
+
+def get_candidate_writer():
+    """The write-behind queue, started on first use (so only the serving process runs one)."""
+    global _candidate_writer
+    if _candidate_writer is None:
+        _candidate_writer = WriteBehindQueue(db_pool, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL,
+                                             max_pending=WRITE_MAX_PENDING, spill_path=WRITE_SPILL_PATH,
+                                             on_written=index_candidates).start()
+        atexit.register(_candidate_writer.close)
+    return _candidate_writer
+
+def collect_candidate_writer():
+    if _candidate_writer is None: return []
+    stats = _candidate_writer.stats()
+    return [
+        ('cv_write_behind_pending', 'gauge', 'Candidates queued for the next write-behind batch.', [({}, stats['pending'] + stats['in_flight'])]),
+        ('cv_write_behind_written_total', 'counter', 'Candidates written by the write-behind queue.', [({}, stats['written'])]),
+        ('cv_write_behind_errors_total', 'counter', 'Failed write-behind batches (retried).', [({}, stats['write_errors'])]),
+        ('cv_write_behind_spilled_total', 'counter', 'Candidates spilled to the write-behind file.', [({}, stats['spilled'])]),
+        ('cv_write_behind_rejected_total', 'counter', 'Candidates the database refused, moved to the rejected file.', [({}, stats['rejected'])]),
+        ('cv_write_behind_dropped_total', 'counter', 'Candidates discarded for want of a spill or rejected file.', [({}, stats['dropped'])]),
+    ]
+
+metrics.register_collector(collect_candidate_writer)
 
 # --- HELPER FUNCTIONS ---
 
+# /api/data: explicit column list in the old SELECT * order (the dashboard reads rows by position)
+USER_DATA_COLUMNS = ['ID', 'Name', 'Email_ID', 'resume_score', 'Timestamp', 'Page_no', 'Predicted_Field',
+                     'User_level', 'Recommended_skills', 'Recommended_courses']
+# IDs grow with upload time, so "timestamp" order is ID order (and never NULL)
+DATA_SORT_COLUMNS = {'timestamp': 'ID', 'score': 'resume_score'}
+DATA_PAGE_SIZE = int(os.environ.get('DATA_PAGE_SIZE', 50))
+DATA_MAX_PAGE_SIZE = 500
+
+def candidate_filters(args):
+    """
+    SQL conditions and params for the candidate filters in the query string:
+    field, level, min_score, max_score, since and until (YYYY-MM-DD, inclusive).
+    Raises ValueError on malformed values.
+    """
+    conditions, params = [], []
+    if args.get('field'):
+        conditions.append("Predicted_Field = %s"); params.append(args['field'])
+    if args.get('level'):
+        conditions.append("User_level = %s"); params.append(args['level'])
+    if args.get('min_score'):
+        conditions.append("resume_score >= %s"); params.append(finite_score(args['min_score']))
+    if args.get('max_score'):
+        conditions.append("resume_score <= %s"); params.append(finite_score(args['max_score']))
+    if args.get('since'):
+        conditions.append("Timestamp >= %s"); params.append(datetime.date.fromisoformat(args['since']))
+    if args.get('until'):
+        conditions.append("Timestamp < %s"); params.append(datetime.date.fromisoformat(args['until']) + datetime.timedelta(days=1))
+    return conditions, params
+
+def finite_score(value):
+    # float() accepts 'nan' and 'inf', which the DECIMAL column cannot compare against
+    score = float(value)
+    if not math.isfinite(score): raise ValueError(f"score must be a finite number, not {value!r}")
+    return score
+
+def encode_data_cursor(sort_value, row_id):
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode()).decode()
+
+def decode_data_cursor(token):
+    sort_value, row_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+    return str(sort_value), int(row_id)
+
+def format_db_value(item):
+    # Typed columns are sent in the shapes the dashboard and CSV export always had
+    if isinstance(item, bytes): return item.decode('utf-8')
+    if isinstance(item, datetime.datetime): return item.strftime('%Y-%m-%d_%H:%M:%S')
+    if isinstance(item, decimal.Decimal): return float(item)
+    return item
+
+# --- EXPORT ---
+# Rows per fetch from the server-side cursor, and bytes per response chunk
+EXPORT_BATCH_ROWS = int(os.environ.get('EXPORT_BATCH_ROWS', 1000))
+EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', 64 * 1024))
+
+def export_rows(connection, conditions, params):
+    """Yields the column names, then formatted user_data rows read from an unbuffered cursor in ID order."""
+    cursor = connection.cursor(pymysql.cursors.SSCursor)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    cursor.execute(f"SELECT {', '.join(USER_DATA_COLUMNS)} FROM user_data {where} ORDER BY ID", params)
+    yield [desc[0] for desc in cursor.description]
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+        if not rows: break
+        for row in rows:
+            yield [format_db_value(item) for item in row]
+    cursor.close()
+
+def csv_chunks(rows):
+    # Same dialect pandas' to_csv used to write: minimal quoting, \n line endings
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0); buffer.truncate()
+    if buffer.tell(): yield buffer.getvalue().encode()
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data: yield data
+    yield compressor.flush()
+
+def xlsx_chunks(rows):
+    """
+    Writes the rows with a write-only workbook (rows go to a temp file, not a
+    cell tree) and then streams the finished file. An .xlsx is a zip whose
+    directory comes last, so nothing can be sent before the last row is in.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('user_data')
+    for row in rows:
+        sheet.append([ILLEGAL_CHARACTERS_RE.sub('', item) if isinstance(item, str) else item for item in row])
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(EXPORT_CHUNK_BYTES)
+            if not chunk: break
+            yield chunk
+
 def cleanup_file(filepath):
     try:
         if os.path.exists(filepath):
@@ -334,19 +706,25 @@ def analytics_skills_gap():
     """
     Returns top 10 skills in the database to identify skill gaps.
     Example: "We have too many Java devs, not enough Python."
+    Read from the skill count summary tables (see skill_stats.py). Optional
+    query params: limit, field, since/until (YYYY-MM-DD upload days) and
+    by_field=true for {field: [...]} with the top skills of every field.
     """
+    connection = get_db()
     if not connection: return jsonify([])
-    query = """
-    SELECT skill_name, COUNT(*) as count 
-    FROM user_skills 
-    GROUP BY skill_name 
-    ORDER BY count DESC 
-    LIMIT 10
-    """
-    cursor.execute(query)
-    results = cursor.fetchall()
+    try:
+        limit = min(int(request.args.get('limit', 10)), 100)
+        since = datetime.date.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = datetime.date.fromisoformat(request.args['until']) if request.args.get('until') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    cursor = connection.cursor()
     # Convert to list of dicts for Chart.js
-    data = [{'skill': row[0], 'count': row[1]} for row in results]
+    if request.args.get('by_field', 'false').lower() == 'true':
+        by_field = top_skills_by_field(cursor, limit, since, until)
+        return jsonify({field: [{'skill': skill, 'count': count} for skill, count in rows] for field, rows in by_field.items()})
+    results = top_skills(cursor, limit, request.args.get('field') or None, since, until)
+    data = [{'skill': skill, 'count': count} for skill, count in results]
     return jsonify(data)
 
 @app.route('/api/analytics/high_potential')
@@ -355,22 +733,24 @@ def analytics_high_potential():
     Succession Planning:
     Finds 'Fresher' or 'Intermediate' users with high scores (> 80).
     """
+    connection = get_db()
     if not connection: return jsonify([])
     # Selecting Fresher/Intermediate (page 1 or 2) with high score
     query = """
     SELECT Name, Email_ID, resume_score, Predicted_Field 
     FROM user_data 
     WHERE (Page_no = '1' OR User_level = 'Fresher') 
-    AND CAST(resume_score AS DECIMAL) > 80
-    ORDER BY CAST(resume_score AS DECIMAL) DESC
+    AND resume_score > 80
+    ORDER BY resume_score DESC
     """
+    cursor = connection.cursor()
     cursor.execute(query)
     results = cursor.fetchall()
     formatted_data = []
     for row in results:
         formatted_data.append({
             'name': row[0], 'email': row[1], 
-            'score': row[2], 'field': row[3]
+            'score': format_db_value(row[2]), 'field': row[3]
         })
     return jsonify(formatted_data)
 
@@ -380,26 +760,14 @@ def start_batch_process():
     BATCH_FOLDER = 'batch_resumes'
     if not os.path.exists(BATCH_FOLDER):
         return jsonify({'error': 'Batch folder "batch_resumes" does not exist.'}), 404
-    task = process_batch_task.apply_async()
+    # ?full=true rescores every file instead of only new or changed ones
+    full = request.args.get('full', 'false').lower() == 'true'
+    task = process_batch_task.apply_async(kwargs={'full': full})
     return jsonify({'task_id': task.id, 'state': task.state, 'status': 'Batch processing started in background.'})
 
 @app.route('/api/batch_status/<task_id>')
 def batch_status(task_id):
-    task = process_batch_task.AsyncResult(task_id)
-    if task.state == 'PENDING':
-        response = {'state': task.state, 'status': 'Pending...'}
-    elif task.state != 'FAILURE':
-        response = {
-            'state': task.state,
-            'current': task.info.get('current', 0),
-            'total': task.info.get('total', 1),
-            'status': task.info.get('status', '')
-        }
-        if task.state == 'SUCCESS':
-            response['result'] = task.info
-    else:
-        response = {'state': task.state, 'status': str(task.info)}
-    return jsonify(response)
+    return jsonify(get_batch_status(task_id))
 
 @app.route('/api/download_batch_report')
 def download_batch_report():
@@ -409,48 +777,64 @@ def download_batch_report():
     return send_file(OUTPUT_FILE, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', as_attachment=True, download_name='Candidate_Rankings.xlsx')
 
 @app.route('/api/shortlist', methods=['POST'])
+@profiled_route
 def shortlist_resumes():
     jd = request.form.get('job_description', '')
     files = request.files.getlist('resumes')
-    results = []
     target_jd = jd if jd else JOB_DESCRIPTIONS.get('default', '')
     print(f"Processing {len(files)} resumes...")
 
-    for file in files:
-        if file.filename == '': continue
-        try:
-            resume_text_raw, pages = pdf_reader(file)
-            if len(resume_text_raw.strip()) < 50:
-                results.append({'name': file.filename, 'email': 'N/A', 'score': 0, 'status': 'Error: No Text'})
-                continue
-            resume_text_clean = clean_text_nltk(resume_text_raw)
-            data = extract_resume_data(resume_text_raw, resume_text_clean)
-            sections = parse_resume_sections(resume_text_raw)
-            
-            score_data = calculate_rigorous_score(
-                resume_text=resume_text_raw,
-                resume_edu_section=sections.get('Education', ''),
-                resume_exp_section=sections.get('Experience', ''),
-                user_skills=data.get('skills', []),
-                job_description_text=target_jd
-            )
-            
-            results.append({
-                'filename': file.filename,
-                'name': data.get('name', 'Unknown'),
-                'email': data.get('email', 'N/A'),
-                'score': score_data['total_score'],
-                'breakdown': score_data['breakdown'],
-                'skills': data.get('skills', [])
-            })
-        except Exception as e:
-            print(f"Error processing {file.filename}: {e}")
-            results.append({'name': file.filename, 'email': 'Error', 'score': 0, 'status': 'Processing Failed'})
+    # A profiled request scores in-process, where the profiler can see the work
+    if SHORTLIST_WORKERS > 1 and len(files) > 1 and not g.get('profiling'):
+        # PDF bytes go to the warm worker pool; rows come back per chunk
+        named_bytes = [(file.filename, file.read()) for file in files]
+        for _, pdf_bytes in named_bytes: count_upload('shortlist', size=len(pdf_bytes))
+        results = score_resume_files_parallel(named_bytes, target_jd)
+    else:
+        for file in files: count_upload('shortlist', file)
+        results = score_resume_files([(file.filename, file) for file in files], target_jd)
 
     results.sort(key=lambda x: x['score'], reverse=True)
     return jsonify(results)
 
+@app.route('/api/shortlist/stream', methods=['POST'])
+def shortlist_resumes_stream():
+    """
+    Streaming variant of /api/shortlist as NDJSON (one JSON object per line):
+    {"event": "start", "total": N}, then {"event": "result", "row": {...}} as each
+    resume is scored, then {"event": "summary", "results": [...]} ranked by score.
+    If scoring fails midway, {"event": "error", "error": ...} comes first and the
+    summary has the rows scored so far plus "partial": true.
+    NDJSON rather than Server-Sent Events because EventSource cannot POST files.
+    """
+    jd = request.form.get('job_description', '')
+    files = request.files.getlist('resumes')
+    target_jd = jd if jd else JOB_DESCRIPTIONS.get('default', '')
+    # Read the uploads now; the request body is gone once the response starts streaming
+    named_bytes = [(file.filename, file.read()) for file in files if file.filename != '']
+    for _, pdf_bytes in named_bytes: count_upload('shortlist', size=len(pdf_bytes))
+    print(f"Streaming {len(named_bytes)} resumes...")
+
+    def generate():
+        yield json.dumps({'event': 'start', 'total': len(named_bytes)}) + '\n'
+        results = []
+        summary = {'event': 'summary'}
+        try:
+            for row in iter_score_resume_files(named_bytes, target_jd):
+                results.append(row)
+                yield json.dumps({'event': 'result', 'row': row}) + '\n'
+        except Exception as e:
+            print(f"Shortlist stream error after {len(results)} of {len(named_bytes)} resumes: {e}")
+            yield json.dumps({'event': 'error', 'error': str(e), 'done': len(results), 'total': len(named_bytes)}) + '\n'
+            summary['partial'] = True
+        results.sort(key=lambda x: x['score'], reverse=True)
+        summary['results'] = results
+        yield json.dumps(summary) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/upload', methods=['POST'])
+@profiled_route
 def upload_file():
     if 'file' not in request.files: return jsonify({'error': 'No file part'}), 400
     file = request.files['file']
@@ -459,11 +843,13 @@ def upload_file():
 
     if file.filename == '': return jsonify({'error': 'No selected file'}), 400
     if file:
+        count_upload('upload', file)
         try:
-            resume_text_raw, pages = pdf_reader(file)
+            resume = parse_resume(file)
+            resume_text_raw, pages = resume['raw_text'], resume['pages']
             if len(resume_text_raw.strip()) < 50: return jsonify({'error': 'Not enough text'}), 400
-            resume_text_clean = clean_text_nltk(resume_text_raw)
-            data = extract_resume_data(resume_text_raw, resume_text_clean)
+            resume_text_clean = resume['cleaned_text']
+            data = resume['data']
         except Exception as e: 
             return jsonify({'error': f'Parsing error: {str(e)}'}), 500
 
@@ -471,12 +857,9 @@ def upload_file():
         email = data.get('email', 'Unknown')
         mobile = data.get('mobile_number', 'Unknown')
         skills = data.get('skills', [])
-        cand_level = 'Fresher' if pages == 1 else ('Intermediate' if pages == 2 else 'Experienced')
-        sections = parse_resume_sections(resume_text_raw)
+        sections = resume['sections']
 
         reco_field = predict_field_fast(resume_text_clean)
-        recommended_skills = SKILLS_DICT.get(reco_field, [])
-        rec_courses = COURSES.get(reco_field, [])
 
         score_data = calculate_rigorous_score(
             resume_text=resume_text_raw,
@@ -487,24 +870,58 @@ def upload_file():
         )
         score = score_data['total_score']
 
-        if connection:
-            ts = time.time()
-            timestamp = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d_%H:%M:%S')
-            insert_sql = "INSERT INTO user_data (Name, Email_ID, resume_score, Timestamp, Page_no, Predicted_Field, User_level, Recommended_skills, Recommended_courses) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            cursor.execute(insert_sql, (name, email, str(score), timestamp, str(pages), reco_field, cand_level, str(recommended_skills), str(rec_courses)))
-            user_id = cursor.lastrowid
-            if skills:
-                skills_insert_sql = "INSERT INTO user_skills (user_id, skill_name) VALUES (%s, %s)"
-                skills_data = [(user_id, skill) for skill in skills]
-                cursor.executemany(skills_insert_sql, skills_data)
-            connection.commit()
+        record = candidate_record(name, email, score, pages, reco_field, skills)
+        cand_level, recommended_skills, rec_courses = record['level'], record['recommended_skills'], record['recommended_courses']
+        connection = None if WRITE_BEHIND else get_db()
+        if WRITE_BEHIND or connection:
+            # Experience and whole-resume embeddings, stored for /api/semantic_search
+            record['embeddings'] = resume_embeddings([resume])[0]
+        if WRITE_BEHIND:
+            get_candidate_writer().submit(record)
+        elif connection:
+            # Same path as the write-behind batches, with a batch of one
+            ids = retry_deadlocks(connection, lambda cursor: insert_candidates(cursor, [record]))
+            index_candidates([record], ids)
 
         return jsonify({
             'name': name, 'email': email, 'mobile': mobile, 'pages': pages, 'level': cand_level,
             'skills': skills, 'field': reco_field, 'rec_skills': recommended_skills, 'rec_courses': rec_courses,
-            'score': score, 'breakdown': score_data['breakdown']
+            'score': score, 'breakdown': score_data['breakdown'], 'truncated': resume.get('truncated')
         })
 
+@app.route('/api/cache_stats')
+def cache_stats():
+    """Hit/miss counters for the parsed-resume and compiled-JD caches."""
+    return jsonify({'resume_cache': RESUME_CACHE.stats(), 'jd_cache': JD_CACHE.stats()})
+
+@app.route('/api/db_stats')
+def db_stats():
+    """Connection pool size, checkouts and pool-wait times."""
+    return jsonify(db_pool.stats())
+
+@app.route('/api/write_stats')
+def write_stats():
+    """Write-behind queue depth, batch sizes, write time and spill traffic."""
+    if not WRITE_BEHIND: return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **get_candidate_writer().stats()})
+
+@app.route('/api/flush_writes', methods=['POST'])
+def flush_writes():
+    """Waits (up to ?timeout= seconds, default 30) until every queued candidate is in the database."""
+    if not WRITE_BEHIND: return jsonify({'enabled': False, 'flushed': True})
+    try:
+        timeout = float(request.args.get('timeout', 30))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    writer = get_candidate_writer()
+    flushed = writer.flush(timeout)
+    return jsonify({'enabled': True, 'flushed': flushed, **writer.stats()}), (200 if flushed else 503)
+
+@app.route('/api/model_stats')
+def model_usage_stats():
+    """Import/startup time, model load times and which routes used which model."""
+    return jsonify({'utils': model_stats(), 'app_startup_seconds': APP_STARTUP_SECONDS, 'routes': ROUTE_MODEL_USAGE})
+
 @app.route('/api/login', methods=['POST'])
 def admin_login():
     d = request.json
@@ -515,14 +932,46 @@ def admin_login():
 def admin_data():
     """
     ENHANCED: Supports Privacy Mode via query param ?privacy=true
+    One keyset-paginated page of candidates, filtered and sorted in MySQL:
+    {"rows": [...], "next_cursor": "..." or null}. Query params: limit,
+    sort (timestamp|score), order (asc|desc), cursor (next_cursor of the
+    previous page), plus the filters of candidate_filters().
     """
-    if not connection: return jsonify([])
+    connection = get_db()
+    if not connection: return jsonify({'rows': [], 'next_cursor': None})
     
     # Check for privacy mode
     privacy_mode = request.args.get('privacy', 'false').lower() == 'true'
     
-    cursor.execute("SELECT * FROM user_data")
+    try:
+        conditions, params = candidate_filters(request.args)
+        limit = max(1, min(int(request.args.get('limit', DATA_PAGE_SIZE)), DATA_MAX_PAGE_SIZE))
+        sort = request.args.get('sort', 'timestamp')
+        if sort not in DATA_SORT_COLUMNS: raise ValueError(f"sort must be one of {', '.join(DATA_SORT_COLUMNS)}")
+        descending = request.args.get('order', 'desc').lower() != 'asc'
+        after = decode_data_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+    # Keyset pagination: continue after the last (sort value, ID) of the previous
+    # page, so deep pages cost the same as the first one
+    sort_column = DATA_SORT_COLUMNS[sort]
+    op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+    if after is not None:
+        if sort_column == 'ID':
+            conditions.append(f"ID {op} %s")
+            params.append(after[1])
+        else:
+            conditions.append(f"({sort_column} {op} %s OR ({sort_column} = %s AND ID {op} %s))")
+            params.extend([after[0], after[0], after[1]])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    order_by = f"ORDER BY {sort_column} {direction}" + (f", ID {direction}" if sort_column != 'ID' else '')
+
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT {', '.join(USER_DATA_COLUMNS)} FROM user_data {where} {order_by} LIMIT %s", params + [limit + 1])
     raw_data = cursor.fetchall()
+    has_more = len(raw_data) > limit
+    raw_data = raw_data[:limit]
     formatted_data = []
     for row in raw_data:
         # Name is index 1, Email is index 2 (based on your CREATE TABLE statement)
@@ -530,49 +979,91 @@ def admin_data():
         
         new_row = []
         for i, item in enumerate(row):
-            if isinstance(item, bytes): 
-                new_row.append(item.decode('utf-8'))
-            else: 
-                new_row.append(item)
+            new_row.append(format_db_value(item))
         
-        # Apply PII Masking if enabled
+        # Apply PII Masking if enabled (only this page is ever masked)
         if privacy_mode:
             # Mask Name (Index 1)
             new_row[1], new_row[2] = mask_pii(new_row[1], new_row[2])
             
         formatted_data.append(new_row)
-    return jsonify(formatted_data)
+    next_cursor = None
+    if has_more:
+        last = raw_data[-1]
+        next_cursor = encode_data_cursor(str(last[USER_DATA_COLUMNS.index(sort_column)]), last[0])
+    return jsonify({'rows': formatted_data, 'next_cursor': next_cursor})
+
+@app.route('/api/data/count')
+def admin_data_count():
+    """Total number of candidates matching the /api/data filters, and the split by field and level for the charts."""
+    connection = get_db()
+    if not connection: return jsonify({'total': 0, 'by_field': {}, 'by_level': {}})
+    try:
+        conditions, params = candidate_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    cursor = connection.cursor()
+    counts = {}
+    for key, column in [('by_field', 'Predicted_Field'), ('by_level', 'User_level')]:
+        cursor.execute(f"SELECT {column}, COUNT(*) FROM user_data {where} GROUP BY {column}", params)
+        counts[key] = {format_db_value(value): count for value, count in cursor.fetchall()}
+    return jsonify({'total': sum(counts['by_level'].values()), **counts})
 
 @app.route('/api/download')
 def download_file():
-    if not connection: return "No DB connection"
-    cursor.execute("SELECT * FROM user_data")
-    raw_data = cursor.fetchall()
-    formatted_data = []
-    for row in raw_data:
-        new_row = []
-        for item in row:
-            if isinstance(item, bytes): new_row.append(item.decode('utf-8'))
-            else: new_row.append(item)
-        formatted_data.append(new_row)
-    columns = [desc[0] for desc in cursor.description]
-    df = pd.DataFrame(formatted_data, columns=columns)
-    output = io.StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-    return send_file(io.BytesIO(output.getvalue().encode()), mimetype='text/csv', as_attachment=True, download_name='user_data.csv')
+    """
+    user_data as CSV (?gzip=true for user_data.csv.gz) or XLSX (?format=xlsx),
+    optionally narrowed by the /api/data filters. Rows are streamed from a
+    server-side cursor, so memory stays flat however large the table is.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': "format must be 'csv' or 'xlsx'"}), 400
+    try:
+        conditions, params = candidate_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    # The export outlives the request context (the body is sent after the view
+    # returns), so it checks out its own connection instead of get_db()
+    try:
+        connection = db_pool.acquire()
+    except Exception as e:
+        print(f"DB Connection Error: {e}")
+        return "No DB connection"
+
+    rows = export_rows(connection, conditions, params)
+    if export_format == 'xlsx':
+        body, mimetype, filename = xlsx_chunks(rows), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'user_data.xlsx'
+    elif request.args.get('gzip', 'false').lower() == 'true':
+        body, mimetype, filename = gzip_chunks(csv_chunks(rows)), 'application/gzip', 'user_data.csv.gz'
+    else:
+        body, mimetype, filename = csv_chunks(rows), 'text/csv', 'user_data.csv'
+
+    finished = []
+    def generate():
+        yield from body
+        finished.append(True)
+    response = Response(generate(), mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename={filename}', 'X-Accel-Buffering': 'no'})
+    # Runs once the body is sent or the client goes away. A cancelled export
+    # closes its connection: draining the rest of an unbuffered result would
+    # read the whole table first.
+    response.call_on_close(lambda: db_pool.release(connection, broken=not finished))
+    return response
 
 @app.route('/api/parse_for_generator', methods=['POST'])
+@profiled_route
 def parse_for_generator():
     if 'file' not in request.files: return jsonify({'error': 'No file part'}), 400
     file = request.files['file']
+    count_upload('generator', file)
     try:
-        resume_text_raw, pages = pdf_reader(file)
+        resume = parse_resume(file)
+        resume_text_raw = resume['raw_text']
         if not resume_text_raw or len(resume_text_raw.strip()) < 5:
              return jsonify({'error': 'Could not extract text', 'name': 'Unknown', 'email': '', 'mobile': '', 'summary': '', 'experience': '', 'education': '', 'projects': '', 'skills': ''}), 200
-        resume_text_clean = clean_text_nltk(resume_text_raw)
-        basic_data = extract_resume_data(resume_text_raw, resume_text_clean)
-        sections = parse_resume_sections(resume_text_raw)
+        basic_data = resume['data']
+        sections = resume['sections']
         return jsonify({
             'name': basic_data.get('name'), 'email': basic_data.get('email'), 'mobile': basic_data.get('mobile_number'),
             'summary': sections.get('Summary', ''), 'experience': sections.get('Experience', ''),
@@ -585,7 +1076,7 @@ def parse_for_generator():
 def analyze_updated_resume():
     data = request.json
     reconstructed_text = f"{data.get('summary', '')} {data.get('experience', '')} {data.get('education', '')} {data.get('projects', '')} {data.get('skills', '')}"
-    cleaned_text = clean_text_nltk(reconstructed_text)
+    cleaned_text = normalize_text(reconstructed_text)
     reco_field = predict_field_fast(cleaned_text)
     recommended_skills = SKILLS_DICT.get(reco_field, [])
     
@@ -656,17 +1147,128 @@ def download_updated_resume():
         return jsonify({'error': 'Failed to generate PDF', 'details': str(e)}), 500
 
 
+@app.route('/api/semantic_search', methods=['POST'])
+def semantic_search():
+    """
+    The k stored candidates closest to a JD by embedding similarity, from the
+    FAISS index instead of re-reading PDFs. JSON body: job_description (default
+    JD if empty), k (10), on ('resume' or 'experience'), privacy (mask PII).
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        k = max(1, min(int(payload.get('k', 10)), SEMANTIC_SEARCH_MAX_K))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    kind = payload.get('on', 'resume')
+    if kind not in EMBEDDING_KINDS:
+        return jsonify({'error': f"on must be one of {', '.join(EMBEDDING_KINDS)}"}), 400
+    connection = get_db()
+    if not connection: return jsonify({'error': 'Database connection error'}), 500
+
+    start = time.perf_counter()
+    vector = get_job_description(payload.get('job_description') or JOB_DESCRIPTIONS.get('default', '')).vector
+    if vector is None: return jsonify({'error': 'Semantic model unavailable'}), 503
+    index = get_candidate_index()
+    index.sync(connection)
+    hits = index.search(vector, k, kind)
+
+    candidates = {}
+    if hits:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT ID, Name, Email_ID, resume_score, Predicted_Field, User_level FROM user_data WHERE ID IN ({', '.join(['%s'] * len(hits))})",
+                       [user_id for user_id, _ in hits])
+        candidates = {row[0]: row for row in cursor.fetchall()}
+        # Deleted by another process since the last sync (which drops the rest of them)
+        gone = [user_id for user_id, _ in hits if user_id not in candidates]
+        if gone: unindex_candidates(gone)
+    results = []
+    for user_id, similarity in hits:
+        if user_id not in candidates: continue
+        _, name, email, score, field, level = (format_db_value(item) for item in candidates[user_id])
+        if payload.get('privacy'): name, email = mask_pii(name, email)
+        results.append({'id': user_id, 'name': name, 'email': email, 'score': score, 'field': field, 'level': level,
+                        'similarity': round(similarity, 4)})
+    return jsonify({'results': results, 'took_ms': round((time.perf_counter() - start) * 1000, 2), 'index': index.stats()})
+
+@app.route('/api/skill_search')
+def skill_search():
+    """
+    Candidate IDs matching a boolean skill expression, from the skill index:
+    ?q=python AND (django OR flask) AND NOT php. Paged newest first like
+    /api/data (limit, order, cursor); details=true adds name, email, score,
+    field and level for the page's candidates.
+    """
+    expression = request.args.get('q', '')
+    try:
+        limit = max(1, min(int(request.args.get('limit', SKILL_SEARCH_PAGE_SIZE)), SKILL_SEARCH_MAX_PAGE_SIZE))
+        after = int(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    connection = get_db()
+    if not connection: return jsonify({'error': 'Database connection error'}), 500
+    index = get_skill_index()
+    index.sync(connection)
+    start = time.perf_counter()
+    try:
+        result = index.query(expression, limit=limit, after=after, descending=request.args.get('order', 'desc').lower() != 'asc')
+    except SkillQueryError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    result['took_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    if request.args.get('details', 'false').lower() == 'true' and result['ids']:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT ID, Name, Email_ID, resume_score, Predicted_Field, User_level FROM user_data WHERE ID IN ({', '.join(['%s'] * len(result['ids']))})",
+                       result['ids'])
+        rows = {row[0]: [format_db_value(item) for item in row] for row in cursor.fetchall()}
+        # Deleted by another process since this one indexed them
+        gone = [user_id for user_id in result['ids'] if user_id not in rows]
+        if gone: unindex_candidates(gone)
+        result['candidates'] = [dict(zip(['id', 'name', 'email', 'score', 'field', 'level'], rows[user_id]))
+                                for user_id in result['ids'] if user_id in rows]
+    return jsonify(result)
+
+@app.route('/api/skill_index_stats')
+def skill_index_stats():
+    """Skill index size and memory (compressed bitmaps vs. plain ID lists), and query times."""
+    return jsonify(get_skill_index().stats())
+
 @app.route('/api/candidate/<int:id>', methods=['DELETE'])
 def delete_candidate(id):
+    connection = get_db()
     if not connection: 
         return jsonify({'error': 'Database connection error'}), 500
-    try:
+    def delete(cursor):
+        # Take the candidate's skills out of the skill counts in the same transaction as the delete
+        cursor.execute("SELECT Predicted_Field, Timestamp FROM user_data WHERE ID = %s FOR UPDATE", (id,))
+        candidate = cursor.fetchone()
+        if candidate:
+            cursor.execute("SELECT skill_name FROM user_skills WHERE user_id = %s", (id,))
+            record_skills(cursor, [row[0] for row in cursor.fetchall()], candidate[0], candidate[1], delta=-1)
         cursor.execute("DELETE FROM user_data WHERE ID = %s", (id,))
-        connection.commit()
+    try:
+        retry_deadlocks(connection, delete)
+        unindex_candidates([id])
         return jsonify({'success': True, 'message': 'Candidate deleted successfully'})
     except Exception as e:
+        connection.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+APP_STARTUP_SECONDS = round(time.perf_counter() - _startup_started, 3)
+
 if __name__ == '__main__':
+    # Start the shortlist workers before serving so the first request finds them warm
+    # (only in the reloader's serving child, not in the file-watching parent)
+    if SHORTLIST_WORKERS > 1 and os.environ.get('WERKZEUG_RUN_MAIN') == 'true': get_shortlist_pool()
+    # WARM_MODELS=true loads the models before serving instead of on the first scoring request
+    if WARM_MODELS and os.environ.get('WERKZEUG_RUN_MAIN') == 'true': warm_models()
+    # Starting the writer now also writes back candidates spilled by the last shutdown
+    if WRITE_BEHIND and os.environ.get('WERKZEUG_RUN_MAIN') == 'true': get_candidate_writer()
+    # Connect before serving so a schema that is behind is reported now, not on the first request
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        try:
+            with db_pool.connection(): pass
+        except Exception as e:
+            print(f"DB Connection Error: {e}")
+    # The skill index loads in the background; a search before it is ready waits for it
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true': threading.Thread(target=build_skill_index, daemon=True).start()
     app.run(debug=True)
\ No newline at end of file
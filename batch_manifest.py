@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import closing
+
+class BatchManifest:
+    """
+    Per-file record of what the batch job has already scored: size, mtime and
+    content hash of the PDF, the JD hash and taxonomy version it was scored
+    under, and the resulting report row (NULL for PDFs without usable text).
+    Chunks write their records as soon as they finish, so an interrupted batch
+    picks up where it stopped and a rerun only scores new or changed files.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_manifest (
+                filename TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                jd_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                row_json TEXT,
+                updated REAL NOT NULL
+            )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def pending_files(self, folder, filenames, jd_hash, version, hashes=None):
+        """
+        Returns the filenames that need (re)scoring. A file is unchanged when its
+        size and mtime match the manifest; if only the mtime moved, the content
+        hash decides and the stored mtime is refreshed. Pending files hashed on
+        the way are added to `hashes` as {filename: (size, mtime, content_hash)}.
+        """
+        with closing(self._connect()) as conn:
+            known = {row[0]: row[1:] for row in conn.execute(
+                "SELECT filename, size, mtime, content_hash FROM batch_manifest WHERE jd_hash = ? AND version = ?", (jd_hash, version)
+            )}
+        pending, touched = [], []
+        for filename in filenames:
+            entry = known.get(filename)
+            if entry is None:
+                pending.append(filename)
+                continue
+            size, mtime, content_hash = entry
+            stat = os.stat(os.path.join(folder, filename))
+            if stat.st_size == size and stat.st_mtime == mtime: continue
+            if stat.st_size == size:
+                current_hash = file_hash(os.path.join(folder, filename))
+                if current_hash == content_hash:
+                    touched.append((stat.st_mtime, filename))
+                    continue
+                if hashes is not None: hashes[filename] = (stat.st_size, stat.st_mtime, current_hash)
+            pending.append(filename)
+        if touched:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("UPDATE batch_manifest SET mtime = ? WHERE filename = ?", touched)
+        return pending
+
+    def record(self, records, jd_hash, version):
+        """Checkpoints scored files: each record has filename, size, mtime, content_hash and row."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "REPLACE INTO batch_manifest (filename, size, mtime, content_hash, jd_hash, version, row_json, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r['filename'], r['size'], r['mtime'], r['content_hash'], jd_hash, version,
+                  json.dumps(r['row']) if r['row'] is not None else None, now) for r in records]
+            )
+
+    def rows(self, filenames, jd_hash, version):
+        """Report rows for the given files that are scored under this JD and version."""
+        wanted = set(filenames)
+        with closing(self._connect()) as conn:
+            return [json.loads(row_json) for filename, row_json in conn.execute(
+                "SELECT filename, row_json FROM batch_manifest WHERE jd_hash = ? AND version = ? AND row_json IS NOT NULL", (jd_hash, version)
+            ) if filename in wanted]
+
+def file_hash(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
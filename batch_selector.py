@@ -1,70 +1,301 @@
 import os
-import pandas as pd
-from utils import calculate_rigorous_score, clean_text_nltk, extract_resume_data, parse_resume_sections, pdf_reader
+from utils import calculate_rigorous_scores, parse_resumes, spooled_pdf, predict_field_fast, resume_embeddings, job_description_key, TAXONOMY_VERSION, WARM_MODELS, warm_models
+from batch_manifest import BatchManifest
+from db_pool import ConnectionPool, TimedCursor
+from write_behind import WriteBehindQueue, candidate_record
 from Courses import JOB_DESCRIPTIONS
-from celery import Celery
+import metrics
+from metrics import FILES, FILE_BYTES, stage
+from celery import Celery, chord
+from celery.signals import worker_process_init, worker_init, worker_process_shutdown, worker_shutdown, task_postrun
 
-celery = Celery('batch_selector', broker='redis://localhost:6379/0')
+celery = Celery('batch_selector')
+# Chords need a result backend to collect the chunk results for the fan-in step
+celery.config_from_object({'broker_url': 'redis://localhost:6379/0', 'result_backend': 'redis://localhost:6379/0'})
+# Optional replacement config module, e.g. a local filesystem broker (see benchmarks/bench_batch_fanout.py)
+celery.config_from_envvar('CELERY_CONFIG_MODULE', silent=True)
 BATCH_FOLDER = 'batch_resumes'
-OUTPUT_FILE = 'candidate_rankings.csv'
+OUTPUT_FOLDER = 'outputs'
+OUTPUT_FILE = 'batch_report.xlsx'
+# Resumes per subtask; every chunk runs on whichever worker picks it up.
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', 25))
+# What has already been scored, so nightly reruns only touch new or changed files
+BATCH_MANIFEST_PATH = os.environ.get('BATCH_MANIFEST_PATH', os.path.join(OUTPUT_FOLDER, 'batch_manifest.sqlite3'))
+# BATCH_SAVE_CANDIDATES=true also stores every scored resume in user_data (as /api/upload
+# does), bulk-loaded through the write-behind queue at the end of each chunk
+BATCH_SAVE_CANDIDATES = os.environ.get('BATCH_SAVE_CANDIDATES', 'false').lower() == 'true'
+BATCH_WRITE_TIMEOUT = float(os.environ.get('BATCH_WRITE_TIMEOUT', 60))
+BATCH_SPILL_PATH = os.environ.get('BATCH_SPILL_PATH', os.path.join(OUTPUT_FOLDER, 'batch_write_spill.jsonl'))
+# CELERY_METRICS_PORT > 0 serves the workers' stage metrics (the same cv_* series
+# as the app's /metrics) on that port. Prefork children write their snapshot to
+# CELERY_METRICS_DIR after each task and the worker's metrics server sums them.
+CELERY_METRICS_PORT = int(os.environ.get('CELERY_METRICS_PORT', 0))
+CELERY_METRICS_DIR = os.environ.get('CELERY_METRICS_DIR', os.path.join(OUTPUT_FOLDER, 'celery_metrics'))
 
-@celery.task(bind=True)
-def process_batch_task(self):
-    BATCH_FOLDER = 'batch_resumes'
-    OUTPUT_FOLDER = 'outputs'
-    OUTPUT_FILE = 'batch_report.xlsx'
-    
+# WARM_MODELS=true loads the models when a worker (or prefork child) starts
+# instead of inside its first chunk.
+@worker_init.connect
+@worker_process_init.connect
+def warm_worker_models(**kwargs):
+    if WARM_MODELS: warm_models()
+
+# --- WORKER METRICS ---
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    if not CELERY_METRICS_PORT: return
+    # Snapshots of a previous worker run would be counted again
+    if os.path.isdir(CELERY_METRICS_DIR):
+        for filename in os.listdir(CELERY_METRICS_DIR): os.remove(os.path.join(CELERY_METRICS_DIR, filename))
+    metrics.serve_metrics(CELERY_METRICS_PORT, CELERY_METRICS_DIR)
+
+@worker_process_init.connect
+def reset_child_metrics(**kwargs):
+    # Observations inherited from the parent (e.g. model warm-up) are not the child's
+    metrics.drain_snapshot()
+
+@task_postrun.connect
+def write_metrics_snapshot(**kwargs):
+    if CELERY_METRICS_PORT: metrics.write_snapshot(CELERY_METRICS_DIR)
+
+def score_batch_files(filenames, job_description, progress=None, candidates=False, hashes=None):
+    """
+    Parses and scores the given files from BATCH_FOLDER. Returns one manifest
+    record per readable file (filename, size, mtime, content_hash, row), where
+    row is the report row or None for a PDF without usable text.
+    `hashes` ({filename: (size, mtime, content_hash)}, from pending_files) are
+    reused for files whose size and mtime still match instead of re-reading them.
+    With candidates=True, scored records also carry the user_data 'candidate'
+    (with its embeddings, encoded for the whole chunk at once).
+    `progress(done, filename)` is called after each file.
+    """
+    records = []
+    parsed = []
+    files = []
+    for filename in filenames:
+        filepath = os.path.join(BATCH_FOLDER, filename)
+        try:
+            stat = os.stat(filepath)
+            FILES.inc(source='batch')
+            FILE_BYTES.observe(stat.st_size, source='batch')
+            known = (hashes or {}).get(filename)
+            known_hash = known[2] if known and tuple(known[:2]) == (stat.st_size, stat.st_mtime) else None
+            # Hashed in chunks and parsed from the path, so a huge PDF is never held in memory whole
+            with spooled_pdf(filepath, digest=known_hash is None) as (_, content_hash):
+                content_hash = content_hash or known_hash
+                files.append(({'filename': filename, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                               'content_hash': content_hash, 'row': None}, filepath))
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+
+    def parse_progress(done):
+        if progress: progress(done, files[done - 1][0]['filename'])
+
+    # The NER name fallback runs once over the whole chunk
+    resumes = parse_resumes([filepath for _, filepath in files], parse_progress)
+    for (record, _), resume in zip(files, resumes):
+        if isinstance(resume, Exception):
+            print(f"Error processing {record['filename']}: {resume}")
+            continue
+        records.append(record)
+        full_text = resume['raw_text']
+        if not full_text or len(full_text.strip()) < 20: continue
+
+        sections = resume['sections']
+        data = resume['data']
+        parsed.append((record, full_text, sections, data, resume))
+
+    # Uses the ENHANCED scoring function, batched so the JD is encoded once
+    scorings = calculate_rigorous_scores([{
+        'resume_text': full_text,
+        'resume_edu_section': sections.get('Education', ''),
+        'resume_exp_section': sections.get('Experience', ''),
+        'user_skills': data.get('skills', [])
+    } for _, full_text, sections, data, _ in parsed], job_description)
+    for (record, *_), scoring in zip(parsed, scorings):
+        if isinstance(scoring, Exception):
+            # Not checkpointed, so the next run retries the file
+            print(f"Error scoring {record['filename']}: {scoring}")
+            records.remove(record)
+    scored = [(item, scoring) for item, scoring in zip(parsed, scorings) if not isinstance(scoring, Exception)]
+    parsed, scorings = [item for item, _ in scored], [scoring for _, scoring in scored]
+
+    embeddings = resume_embeddings([resume for *_, resume in parsed]) if candidates else [None] * len(parsed)
+    for (record, _, _, data, resume), scoring, embedding in zip(parsed, scorings, embeddings):
+        if candidates:
+            record['candidate'] = candidate_record(data.get('name', 'Unknown'), data.get('email', 'Unknown'), scoring['total_score'],
+                                                   resume['pages'], predict_field_fast(resume['cleaned_text']), data.get('skills', []),
+                                                   embeddings=embedding, content_hash=record['content_hash'])
+        record['row'] = {
+            'Filename': record['filename'],
+            'Name': data.get('name'),
+            'Email': data.get('email'),
+            'Total_Score': scoring['total_score'],
+            'Skills_Match': scoring['breakdown']['skills'],
+            'Education_Match': scoring['breakdown']['education'],
+            'Experience_Match': scoring['breakdown']['experience'],
+            'Semantic_Fit': scoring['breakdown'].get('semantic_fit', 0), # New metric
+            'Truncated': resume.get('truncated'), # PDF budget that cut the text short, if any
+            'Status': 'Selected' if scoring['total_score'] > 60 else 'Rejected'
+        }
+    return records
+
+def get_manifest():
+    return BatchManifest(BATCH_MANIFEST_PATH)
+
+_candidate_writer = None
+
+def get_candidate_writer():
+    """This worker process's write-behind queue, started on first use."""
+    global _candidate_writer
+    if _candidate_writer is None:
+        import pymysql
+        connect = lambda: pymysql.connect(host=os.environ.get('DB_HOST', 'localhost'), user=os.environ.get('DB_USER', 'root'),
+                                          password=os.environ.get('DB_PASSWORD', ''), database=os.environ.get('DB_NAME', 'cv'),
+                                          cursorclass=TimedCursor)
+        _candidate_writer = WriteBehindQueue(ConnectionPool(connect, max_size=1), spill_path=BATCH_SPILL_PATH).start()
+    return _candidate_writer
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_candidate_writer(**kwargs):
+    # Candidates the database did not take in time are spilled to BATCH_SPILL_PATH
+    if _candidate_writer is not None: _candidate_writer.close()
+
+def save_candidates(records):
+    """
+    Bulk-loads the chunk's scored candidates into user_data and waits for the
+    write. Returns False if they are still queued after BATCH_WRITE_TIMEOUT.
+    Candidates are keyed by content hash, so saving a chunk again is harmless.
+    """
+    candidates = [r['candidate'] for r in records if r.get('candidate')]
+    if not candidates: return True
+    writer = get_candidate_writer()
+    writer.submit_many(candidates)
+    if not writer.flush(BATCH_WRITE_TIMEOUT):
+        print(f"Batch candidates not yet written after {BATCH_WRITE_TIMEOUT}s; they stay queued")
+        return False
+    return True
+
+def write_batch_report(results, total):
+    import pandas as pd  # only the report writer needs it
     if not os.path.exists(OUTPUT_FOLDER): os.makedirs(OUTPUT_FOLDER)
-    results = []
-    files = [f for f in os.listdir(BATCH_FOLDER) if f.endswith('.pdf')]
-    
-    self.update_state(state='PROGRESS', meta={'current': 0, 'total': len(files), 'status': 'Starting...'})
+    if results:
+        df = pd.DataFrame(results)
+        df = df.sort_values(by='Total_Score', ascending=False)
+        output_path = os.path.join(OUTPUT_FOLDER, OUTPUT_FILE)
+        df.to_excel(output_path, index=False, engine='openpyxl')
+        return {'current': 100, 'total': total, 'status': 'Completed', 'result': len(results)}
+    else:
+        return {'current': 100, 'total': total, 'status': 'No valid resumes found.'}
+
+# --- FAN-OUT / FAN-IN TASKS ---
+# acks_late: a chunk whose worker dies is redelivered instead of lost
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def score_batch_chunk(self, filenames, job_description, hashes=None):
+    """
+    Fan-out: scores one chunk of the batch folder on whichever worker picks it
+    up, checkpoints it into that worker's manifest and returns its report rows.
+    `hashes` are the content hashes the dispatcher already computed.
+    """
+    def progress(done, filename):
+        self.update_state(state='PROGRESS', meta={'current': done, 'total': len(filenames), 'status': f'Processing {filename}...'})
+    with stage('batch_chunk'):
+        records = score_batch_files(filenames, job_description, progress, candidates=BATCH_SAVE_CANDIDATES, hashes=hashes)
+    rows = [r['row'] for r in records if r['row'] is not None]
+    if BATCH_SAVE_CANDIDATES:
+        with stage('batch_save'): saved = save_candidates(records)
+        if not saved:
+            # Reported but not checkpointed, so the next run scores the chunk again (its candidates are not stored twice)
+            print(f"Chunk of {len(filenames)} files not checkpointed: its candidates are not written yet")
+            return rows
+    # Checkpoint: from now on these files are skipped by reruns and resumed runs
+    get_manifest().record(records, job_description_key(job_description), TAXONOMY_VERSION)
+    return rows
 
+@celery.task
+def merge_batch_results(chunk_rows, filenames, job_description, cached_rows=()):
+    """
+    Fan-in: writes the ranked report from the rows the chunks returned plus
+    `cached_rows`, the unchanged files' rows from the dispatching worker's
+    manifest. Nothing is read from this worker's manifest, which on another
+    host would not have the other hosts' checkpoints.
+    """
     try:
-        for i, filename in enumerate(files):
-            filepath = os.path.join(BATCH_FOLDER, filename)
-            try:
-                full_text, _ = pdf_reader(filepath)
-                if not full_text or len(full_text.strip()) < 20: continue
-
-                sections = parse_resume_sections(full_text)
-                cleaned_text = clean_text_nltk(full_text)
-                data = extract_resume_data(full_text, cleaned_text)
-                
-                # Uses the ENHANCED scoring function automatically
-                scoring = calculate_rigorous_score(
-                    resume_text=full_text,
-                    resume_edu_section=sections.get('Education', ''),
-                    resume_exp_section=sections.get('Experience', ''),
-                    user_skills=data.get('skills', []),
-                    job_description_text=JOB_DESCRIPTIONS.get('default', '')
-                )
-
-                results.append({
-                    'Filename': filename,
-                    'Name': data.get('name'),
-                    'Email': data.get('email'),
-                    'Total_Score': scoring['total_score'],
-                    'Skills_Match': scoring['breakdown']['skills'],
-                    'Education_Match': scoring['breakdown']['education'],
-                    'Experience_Match': scoring['breakdown']['experience'],
-                    'Semantic_Fit': scoring['breakdown'].get('semantic_fit', 0), # New metric
-                    'Status': 'Selected' if scoring['total_score'] > 60 else 'Rejected'
-                })
-                
-                self.update_state(state='PROGRESS', meta={'current': i+1, 'total': len(files), 'status': f'Processing {filename}...'})
-
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-
-        if results:
-            df = pd.DataFrame(results)
-            df = df.sort_values(by='Total_Score', ascending=False)
-            output_path = os.path.join(OUTPUT_FOLDER, OUTPUT_FILE)
-            df.to_excel(output_path, index=False, engine='openpyxl')
-            return {'current': 100, 'total': len(files), 'status': 'Completed', 'result': len(results)}
-        else:
-            return {'current': 100, 'total': len(files), 'status': 'No valid resumes found.'}
+        results = list(cached_rows) + [row for rows in chunk_rows for row in rows]
+        return write_batch_report(results, len(filenames))
+    except Exception as e:
+        return {'current': 0, 'total': 0, 'status': f'Error: {str(e)}'}
 
+@celery.task(bind=True)
+def process_batch_task(self, chunk_size=None, full=False):
+    """
+    Scores the new or changed PDFs in batch_resumes (all of them with full=True)
+    and rebuilds the report. Pending files are split into chunks of
+    BATCH_CHUNK_SIZE and dispatched as a chord: score_batch_chunk runs in
+    parallel across all workers and returns its rows, then merge_batch_results
+    writes the report from them and the unchanged files' manifest rows, which
+    are read here and passed along. The returned ids let
+    get_batch_status aggregate progress from the chunks.
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    try:
+        files = sorted(f for f in os.listdir(BATCH_FOLDER) if f.endswith('.pdf'))
+        if not files:
+            return write_batch_report([], 0)
+        job_description = JOB_DESCRIPTIONS.get('default', '')
+        jd_hash = job_description_key(job_description)
+        manifest = get_manifest()
+        hashes = {}
+        pending = files if full else manifest.pending_files(BATCH_FOLDER, files, jd_hash, TAXONOMY_VERSION, hashes)
+        cached = len(files) - len(pending)
+        if not pending:
+            report = write_batch_report(manifest.rows(files, jd_hash, TAXONOMY_VERSION), len(files))
+            report['cached'] = cached
+            return report
+        pending_set = set(pending)
+        cached_rows = manifest.rows([f for f in files if f not in pending_set], jd_hash, TAXONOMY_VERSION) if cached else []
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        report = chord(score_batch_chunk.s(chunk, job_description, {f: hashes[f] for f in chunk if f in hashes})
+                       for chunk in chunks)(merge_batch_results.s(files, job_description, cached_rows))
+        return {
+            'current': 0, 'total': len(pending), 'cached': cached,
+            'status': f'Dispatched {len(chunks)} chunks ({cached} unchanged resumes reused)',
+            'report_task_id': report.id,
+            'chunk_task_ids': [result.id for result in report.parent.results],
+            'chunk_sizes': [len(chunk) for chunk in chunks]
+        }
     except Exception as e:
-        return {'current': 0, 'total': 0, 'status': f'Error: {str(e)}'}
\ No newline at end of file
+        return {'current': 0, 'total': 0, 'status': f'Error: {str(e)}'}
+
+def get_batch_status(task_id):
+    """Status of a process_batch_task run, with progress summed over its chunks."""
+    task = process_batch_task.AsyncResult(task_id)
+    if task.state == 'PENDING':
+        return {'state': task.state, 'status': 'Pending...'}
+    if task.state == 'FAILURE':
+        return {'state': task.state, 'status': str(task.info)}
+    info = task.info or {}
+    if task.state != 'SUCCESS' or 'report_task_id' not in info:
+        response = {
+            'state': task.state,
+            'current': info.get('current', 0),
+            'total': info.get('total', 1),
+            'status': info.get('status', '')
+        }
+        if task.state == 'SUCCESS':
+            response['result'] = info
+        return response
+
+    report = celery.AsyncResult(info['report_task_id'])
+    if report.state == 'SUCCESS':
+        return {'state': 'SUCCESS', 'current': 100, 'total': info['total'], 'status': report.info.get('status', ''), 'result': report.info}
+    if report.state == 'FAILURE':
+        return {'state': 'FAILURE', 'status': str(report.info)}
+
+    current = 0
+    for chunk_id, chunk_size in zip(info['chunk_task_ids'], info['chunk_sizes']):
+        chunk = celery.AsyncResult(chunk_id)
+        if chunk.state == 'SUCCESS': current += chunk_size
+        elif chunk.state == 'PROGRESS': current += (chunk.info or {}).get('current', 0)
+    status = f'Processed {current} of {info["total"]} resumes...' if current < info['total'] else 'Writing report...'
+    return {'state': 'PROGRESS', 'current': current, 'total': info['total'], 'status': status}
@@ -0,0 +1,110 @@
+"""
+Benchmark: fan-out/fan-in batch processing vs. number of Celery workers.
+
+Usage (from the repo root):
+    python benchmarks/bench_batch_fanout.py [--workers 1 2 4] [--copies 5] [--chunk-size 5]
+
+Needs no Redis: a throwaway folder is used as a filesystem broker and file
+result backend (the local broker stand-in), and a batch_resumes/ folder is
+filled with --copies renamed copies of every PDF in uploads/. For each worker
+count N, N single-process `celery worker --pool solo` processes are started,
+process_batch_task is run to completion (full=True, ignoring the manifest) and the
+wall time is reported. The resume cache is disabled so
+every run parses every PDF.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOADS_FOLDER = os.path.join(REPO_ROOT, 'uploads')
+
+CELERY_CONFIG = """
+broker_url = 'filesystem://'
+broker_transport_options = {{
+    'data_folder_in': {queue!r},
+    'data_folder_out': {queue!r},
+    'polling_interval': 0.1,
+}}
+result_backend = 'file://{results}'
+worker_prefetch_multiplier = 1
+"""
+
+def prepare_workdir(workdir, copies):
+    batch_folder = os.path.join(workdir, 'batch_resumes')
+    os.makedirs(batch_folder)
+    for copy in range(copies):
+        for filename in os.listdir(UPLOADS_FOLDER):
+            if filename.endswith('.pdf'):
+                shutil.copy(os.path.join(UPLOADS_FOLDER, filename), os.path.join(batch_folder, f"{copy}_{filename}"))
+    queue = os.path.join(workdir, 'broker')
+    results = os.path.join(workdir, 'results')
+    os.makedirs(queue)
+    os.makedirs(results)
+    with open(os.path.join(workdir, 'bench_celeryconfig.py'), 'w') as f:
+        f.write(CELERY_CONFIG.format(queue=queue, results=results))
+    return len(os.listdir(batch_folder))
+
+def run_batch(workers, chunk_size, env, workdir):
+    from batch_selector import process_batch_task, score_batch_chunk, get_batch_status
+
+    # N independent single-process workers, like N Celery machines sharing one broker
+    worker_processes = [subprocess.Popen(
+        [sys.executable, '-m', 'celery', '-A', 'batch_selector', 'worker', '--pool', 'solo', '-n', f'bench{i}@%h',
+         '--without-gossip', '--without-mingle', '--without-heartbeat', '-l', 'warning'],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ) for i in range(workers)]
+    try:
+        # Wait until every worker has booted and loaded its models
+        for warmup in [score_batch_chunk.delay([], '') for _ in range(workers)]:
+            warmup.get(timeout=600)
+        task = process_batch_task.delay(chunk_size, full=True)
+        start = time.perf_counter()
+        while True:
+            status = get_batch_status(task.id)
+            if status['state'] in ('SUCCESS', 'FAILURE'): break
+            time.sleep(0.2)
+        return time.perf_counter() - start, status
+    finally:
+        for worker in worker_processes:
+            worker.terminate()
+        for worker in worker_processes:
+            worker.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--copies', type=int, default=5)
+    parser.add_argument('--chunk-size', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_batch_')
+    try:
+        total = prepare_workdir(workdir, args.copies)
+        env = dict(os.environ)
+        env.update({
+            'CELERY_CONFIG_MODULE': 'bench_celeryconfig',
+            'PYTHONPATH': os.pathsep.join([REPO_ROOT, workdir, env.get('PYTHONPATH', '')]),
+            'RESUME_CACHE_PATH': '', 'RESUME_CACHE_SIZE': '0', 'WARM_MODELS': 'true',
+        })
+        os.environ.update(env)
+        sys.path[:0] = [REPO_ROOT, workdir]
+        os.chdir(workdir)
+
+        print(f"Resumes: {total} | chunk size: {args.chunk_size}")
+        baseline = None
+        for workers in args.workers:
+            elapsed, status = run_batch(workers, args.chunk_size, env, workdir)
+            baseline = baseline or elapsed
+            print(f"workers={workers:<2} : {elapsed:7.2f} s  {total / elapsed:6.1f} resumes/s  "
+                  f"vs first run {baseline / elapsed:4.1f}x  [{status['state']}: {status.get('status', '')}]")
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: request throughput through one shared connection vs. the pool.
+
+Usage (from the repo root):
+    python benchmarks/bench_db_pool.py [--threads 1 2 4 8 16] [--requests 400] [--latency 0.005]
+    python benchmarks/bench_db_pool.py --host localhost --user root --database cv --query "SELECT 1"
+
+Each simulated request checks out a connection, runs one query and releases
+it, from --threads concurrent threads. "shared" is the old layout: a single
+connection, which has to be serialised with a lock because pymysql
+connections are not thread-safe. "pool" is db_pool.ConnectionPool with
+--pool-size connections (default: one per thread).
+
+Without --host the database is a local stand-in whose queries take --latency
+seconds of server time (the round trip a real MySQL would spend), so no
+server is needed. With --host the same workload runs against that MySQL.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool
+
+class StandInConnection:
+    """Just enough of a pymysql connection for the pool: queries sleep for `latency`."""
+    def __init__(self, latency):
+        self.latency = latency
+        self.open = True
+        self.server_status = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, args=None):
+        time.sleep(self.latency)
+
+    def fetchall(self):
+        return []
+
+    def ping(self): pass
+    def commit(self): pass
+    def rollback(self): pass
+
+    def close(self):
+        self.open = False
+
+def make_connect(args):
+    if not args.host:
+        return lambda: StandInConnection(args.latency)
+    import pymysql
+    return lambda: pymysql.connect(host=args.host, user=args.user, password=args.password, database=args.database)
+
+def run_requests(threads, total, handle):
+    per_thread = [total // threads + (1 if i < total % threads else 0) for i in range(threads)]
+    def worker(count):
+        for _ in range(count): handle()
+    workers = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+    start = time.perf_counter()
+    for worker_thread in workers: worker_thread.start()
+    for worker_thread in workers: worker_thread.join()
+    return time.perf_counter() - start
+
+def shared_handler(connect, query):
+    connection = connect()
+    lock = threading.Lock()
+    def handle():
+        with lock:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            cursor.fetchall()
+    return handle
+
+def pool_handler(pool, query):
+    def handle():
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            cursor.fetchall()
+    return handle
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.005, help='stand-in query time in seconds')
+    parser.add_argument('--pool-size', type=int, default=None)
+    parser.add_argument('--query', default='SELECT skill_name, COUNT(*) AS count FROM user_skills GROUP BY skill_name ORDER BY count DESC LIMIT 10')
+    parser.add_argument('--host')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='cv')
+    args = parser.parse_args()
+
+    connect = make_connect(args)
+    print(f"Requests: {args.requests} | database: {args.host or f'stand-in ({args.latency * 1000:.1f} ms/query)'}")
+    for threads in args.threads:
+        shared = run_requests(threads, args.requests, shared_handler(connect, args.query))
+        pool = ConnectionPool(connect, max_size=args.pool_size or threads)
+        pooled = run_requests(threads, args.requests, pool_handler(pool, args.query))
+        stats = pool.stats()
+        pool.close_all()
+        print(f"threads={threads:<3}: shared {args.requests / shared:8.1f} req/s | pool x{stats['max_size']:<3} {args.requests / pooled:8.1f} req/s "
+              f"({shared / pooled:4.1f}x)  pool waits {stats['waits']:4d}, avg wait {stats['wait_seconds_avg'] * 1000:6.2f} ms")
+
+if __name__ == '__main__':
+    main()
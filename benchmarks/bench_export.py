@@ -0,0 +1,131 @@
+"""
+Benchmark: /api/download time and peak memory vs. table size.
+
+Usage (from the repo root):
+    python benchmarks/bench_export.py [--rows 10000 50000] [--formats legacy csv gzip xlsx]
+    python benchmarks/bench_export.py --host localhost --user root --database cv --formats legacy csv
+
+"legacy" is the old export (fetchall, decoded row list, pandas DataFrame,
+StringIO, BytesIO); csv, gzip and xlsx go through the streaming route with
+the Flask test client, reading the body chunk by chunk as a client would.
+Each export is timed once and then repeated under tracemalloc for the
+peak of Python allocations.
+
+Without --host the rows come from a stand-in server-side cursor that
+generates --rows synthetic candidates, so no MySQL is needed. With --host
+the exports read that database's user_data (--rows is ignored).
+"""
+import os
+import sys
+import time
+import argparse
+import datetime
+import decimal
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class StandInCursor:
+    """Yields `rows` synthetic user_data rows with the typed columns pymysql returns."""
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.description = [(column,) for column in columns]
+        self.position = 0
+
+    def execute(self, query, args=None):
+        self.position = 0
+
+    def _row(self, i):
+        return (i + 1, f"Candidate {i}", f"c{i}@example.com", decimal.Decimal(f"{i % 100}.50"),
+                datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i), '1', 'Web Development', 'Fresher',
+                "['python', 'sql', 'flask']", "['Flask course']")
+
+    def fetchmany(self, size):
+        end = min(self.rows, self.position + size)
+        batch = [self._row(i) for i in range(self.position, end)]
+        self.position = end
+        return batch
+
+    def fetchall(self):
+        return self.fetchmany(self.rows)
+
+    def close(self): pass
+
+class StandInConnection:
+    def __init__(self, rows, columns):
+        self.rows, self.columns = rows, columns
+        self.open = True
+        self.server_status = 0
+
+    def cursor(self, cursor_class=None):
+        return StandInCursor(self.rows, self.columns)
+
+    def ping(self): pass
+    def commit(self): pass
+    def rollback(self): pass
+
+    def close(self):
+        self.open = False
+
+def legacy_export(app_module):
+    # The pre-streaming download_file body
+    import io
+    import pandas as pd
+    connection = app_module.db_pool.acquire()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM user_data")
+        formatted_data = [[app_module.format_db_value(item) for item in row] for row in cursor.fetchall()]
+        columns = [desc[0] for desc in cursor.description]
+        output = io.StringIO()
+        pd.DataFrame(formatted_data, columns=columns).to_csv(output, index=False)
+        return len(io.BytesIO(output.getvalue().encode()).getvalue())
+    finally:
+        app_module.db_pool.release(connection)
+
+def streaming_export(client, query):
+    response = client.get('/api/download' + query, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+def measure(run):
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--formats', nargs='+', default=['legacy', 'csv', 'gzip', 'xlsx'], choices=['legacy', 'csv', 'gzip', 'xlsx'])
+    parser.add_argument('--host')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='cv')
+    args = parser.parse_args()
+
+    if args.host:
+        os.environ.update({'DB_HOST': args.host, 'DB_USER': args.user, 'DB_PASSWORD': args.password, 'DB_NAME': args.database})
+    import app as app_module
+    client = app_module.app.test_client()
+    queries = {'csv': '', 'gzip': '?gzip=true', 'xlsx': '?format=xlsx'}
+
+    for rows in ([None] if args.host else args.rows):
+        if rows is not None:
+            app_module.db_pool.close_all()
+            app_module.db_pool._connect = lambda rows=rows: StandInConnection(rows, app_module.USER_DATA_COLUMNS)
+        print(f"Rows: {rows if rows is not None else args.host}")
+        for export_format in args.formats:
+            if export_format == 'legacy':
+                size, elapsed, peak = measure(lambda: legacy_export(app_module))
+            else:
+                size, elapsed, peak = measure(lambda: streaming_export(client, queries[export_format]))
+            print(f"  {export_format:<7}: {elapsed:7.2f}s  {size / 1e6:8.2f} MB sent  peak {peak / 1e6:8.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: cold-start import time and first-use model loading.
+
+Usage (from the repo root):
+    python benchmarks/bench_import_time.py [--modules utils batch_selector app] [--repeat 3]
+
+Each module is imported in a fresh interpreter (so nothing is cached in the
+process) and the wall time and peak RSS of the import are reported. Then the
+models are loaded in one more fresh interpreter with utils.warm_models() to
+show what the first scoring request (or WARM_MODELS=true) costs.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import json, time, resource
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+WARM_SNIPPET = """
+import json, resource
+import utils
+errors = {{}}
+for name in utils.MODEL_LOADERS:
+    try:
+        utils.warm_models([name])
+    except Exception as e:
+        errors[name] = str(e)
+stats = utils.model_stats()
+stats['errors'] = errors
+stats['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(stats))
+"""
+
+def run_snippet(snippet, **fmt):
+    out = subprocess.run([sys.executable, '-c', snippet.format(**fmt)], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=['utils', 'batch_selector', 'app'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        runs = [run_snippet(IMPORT_SNIPPET, module=module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run['seconds'])
+        print(f"import {module:<15}: {best['seconds']:6.2f} s  peak RSS {best['max_rss_mb']:7.1f} MB  (best of {args.repeat})")
+
+    stats = run_snippet(WARM_SNIPPET)
+    for name, model in stats['models'].items():
+        load = f"{model['load_seconds']:6.2f} s" if model['load_seconds'] is not None else f"failed: {stats['errors'].get(name, 'n/a')}"
+        print(f"load model {name:<12}: {load}")
+    print(f"peak RSS after warm_models(): {stats['max_rss_mb']:.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: NER name fallback, full spaCy pipeline vs. the trimmed one.
+
+Usage (from the repo root):
+    python benchmarks/bench_ner.py [--model en_core_web_sm] [--copies 3] [--batch-size 32]
+
+Runs the raw text of every PDF in uploads/ (repeated --copies times) through
+three variants, each in a fresh interpreter so load memory is comparable:
+  full      - every pipeline component, whole resume, one nlp() call per resume (the old fallback)
+  trimmed   - utils' NER-only pipeline, header region only, one call per resume
+  batched   - trimmed, with all headers going through nlp.pipe (utils.ner_names)
+and prints per-resume latency and peak RSS. --model also takes a path to a
+saved pipeline.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOADS_FOLDER = os.path.join(REPO_ROOT, 'uploads')
+
+VARIANT_SNIPPET = """
+import sys, json, time, resource
+import spacy
+import utils
+variant, model, batch_size = {variant!r}, {model!r}, {batch_size!r}
+texts = json.load(sys.stdin)
+if variant == 'full':
+    nlp = spacy.load(model)
+else:
+    utils.MODEL_LOADERS['spacy'] = lambda: spacy.load(model, exclude=utils.NER_EXCLUDED_PIPES)
+    nlp = utils.get_nlp()
+rss_loaded = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+start = time.perf_counter()
+if variant == 'full':
+    names = [utils._name_from_entities(nlp(text)) for text in texts]
+elif variant == 'trimmed':
+    names = [utils.ner_names([text])[0] for text in texts]
+else:
+    names = utils.ner_names(texts, batch_size=batch_size)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'pipes': nlp.pipe_names, 'seconds': elapsed, 'rss_loaded_mb': rss_loaded,
+                  'rss_peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'names': names}}))
+"""
+
+def load_texts(copies):
+    sys.path.insert(0, REPO_ROOT)
+    from utils import pdf_reader
+    texts = []
+    for filename in sorted(f for f in os.listdir(UPLOADS_FOLDER) if f.endswith('.pdf')):
+        raw_text, _ = pdf_reader(os.path.join(UPLOADS_FOLDER, filename))
+        if raw_text.strip(): texts.append(raw_text)
+    return texts * copies
+
+def run_variant(variant, model, batch_size, texts):
+    snippet = VARIANT_SNIPPET.format(variant=variant, model=model, batch_size=batch_size)
+    out = subprocess.run([sys.executable, '-c', snippet], cwd=REPO_ROOT, input=json.dumps(texts),
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='en_core_web_sm')
+    parser.add_argument('--copies', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    texts = load_texts(args.copies)
+    print(f"Resumes: {len(texts)} | avg length {sum(map(len, texts)) // max(len(texts), 1)} chars")
+    baseline = None
+    for variant in ('full', 'trimmed', 'batched'):
+        result = run_variant(variant, args.model, args.batch_size, texts)
+        per_doc = result['seconds'] / max(len(texts), 1) * 1000
+        baseline = baseline or per_doc
+        print(f"{variant:<8}: {per_doc:7.2f} ms/resume ({baseline / per_doc:5.1f}x)  "
+              f"RSS after load {result['rss_loaded_mb']:6.1f} MB, peak {result['rss_peak_mb']:6.1f} MB  "
+              f"pipes: {', '.join(result['pipes'])}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: reading a large PDF whole vs. with utils.read_pdf's budgets.
+
+Usage (from the repo root):
+    python benchmarks/bench_pdf_reader.py [--pdf portfolio.pdf] [--pages 300]
+
+Without --pdf a --pages page PDF (a text-heavy resume page and an image on
+every other page, like a scanned portfolio) is generated in a temporary
+directory. Each mode runs in a fresh process, reading the PDF as an upload
+(a file object), and reports the wall time, the process's peak memory
+growth, the pages read and the characters kept:
+  whole     the old pdf_reader: file.read() into memory, text += per page
+  unbounded read_pdf with no budgets (spooled to disk, text joined once)
+  budgeted  read_pdf with the PDF_MAX_PAGES / PDF_MAX_CHARS defaults
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ['whole', 'unbounded', 'budgeted']
+
+def make_pdf(path, pages):
+    import fitz
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        for line in range(60):
+            page.insert_text((50, 72 + line * 11), f"Page {number} line {line}: python sql docker react project experience", fontsize=8)
+        # A fresh image per page: PyMuPDF stores a reused one only once
+        if number % 2 == 0: page.insert_image(fitz.Rect(0, 0, 300, 300), pixmap=fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 400, 400), 0))
+    doc.save(path)
+    doc.close()
+
+def run_mode(mode, path):
+    import utils
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        if mode == 'whole':
+            doc = utils.fitz.open(stream=f.read(), filetype="pdf")
+            text = ""
+            for page in doc:
+                text += page.get_text("text") + "\n"
+            result = {'pages_read': doc.page_count, 'chars': len(text)}
+            doc.close()
+        else:
+            pdf = utils.read_pdf(f, max_pages=0 if mode == 'unbounded' else None, max_chars=0 if mode == 'unbounded' else None)
+            result = {'pages_read': pdf['pages_read'], 'chars': len(pdf['text']), 'truncated': pdf['truncated']}
+    result['seconds'] = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux
+    result['peak_mb'] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024
+    print(json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf')
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args.mode, args.pdf)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.pdf
+        if not path:
+            path = os.path.join(directory, 'portfolio.pdf')
+            make_pdf(path, args.pages)
+        print(f"PDF: {path if args.pdf else f'{args.pages} generated pages'} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        for mode in MODES:
+            output = subprocess.run([sys.executable, __file__, '--mode', mode, '--pdf', path], capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            truncated = f" (truncated: {result['truncated']})" if result.get('truncated') else ''
+            print(f"  {mode:<9}: {result['seconds']:6.2f}s | peak +{result['peak_mb']:6.1f} MB | {result['pages_read']:4d} pages, {result['chars']} chars{truncated}")
+
+if __name__ == '__main__':
+    main()
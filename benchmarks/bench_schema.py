@@ -0,0 +1,127 @@
+"""
+Benchmark: analytics queries on the legacy vs. the migrated user_data schema.
+
+Usage (from the repo root, needs a MySQL server you can create databases on):
+    python benchmarks/bench_schema.py [--host localhost] [--user root] [--candidates 1000000] [--skills 5]
+
+Creates a scratch database (--database, dropped first), migrates it to schema
+version 1 (VARCHAR score and timestamp, BLOB field and level, no indexes) and
+fills it with --candidates synthetic candidates with --skills skills each.
+It then prints EXPLAIN and the best-of-3 timing of the high_potential,
+skills_gap and /api/data queries, applies the remaining migrations (timing the backfill)
+and prints the same for the migrated schema.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+from migrations import run_migrations, schema_version, USER_LEVELS
+
+# The analytics queries from app.py at each schema version
+QUERIES = {
+    'high_potential': {
+        1: """SELECT Name, Email_ID, resume_score, Predicted_Field FROM user_data
+              WHERE (Page_no = '1' OR User_level = 'Fresher') AND CAST(resume_score AS DECIMAL) > 80
+              ORDER BY CAST(resume_score AS DECIMAL) DESC""",
+        3: """SELECT Name, Email_ID, resume_score, Predicted_Field FROM user_data
+              WHERE (Page_no = '1' OR User_level = 'Fresher') AND resume_score > 80
+              ORDER BY resume_score DESC""",
+    },
+    'skills_gap': {
+        1: "SELECT skill_name, COUNT(*) as count FROM user_skills GROUP BY skill_name ORDER BY count DESC LIMIT 10",
+        3: "SELECT skill_name, COUNT(*) as count FROM user_skills GROUP BY skill_name ORDER BY count DESC LIMIT 10",
+        4: "SELECT skill_name, count FROM skill_totals WHERE count > 0 ORDER BY count DESC LIMIT 10",
+    },
+    # /api/data: the whole table, then one keyset page of a field by score
+    'admin_data': {
+        1: "SELECT * FROM user_data",
+        5: """SELECT ID, Name, Email_ID, resume_score, Timestamp, Page_no, Predicted_Field, User_level, Recommended_skills, Recommended_courses
+              FROM user_data WHERE Predicted_Field = 'Web Development' AND (resume_score < 50 OR (resume_score = 50 AND ID < 500000))
+              ORDER BY resume_score DESC, ID DESC LIMIT 51""",
+    },
+}
+FIELDS = ['Data Science & AI', 'Web Development', 'DevOps & Cloud', 'Mobile Development', 'Cybersecurity', 'Product Management']
+SKILLS = ['python', 'java', 'sql', 'react', 'aws', 'docker', 'kubernetes', 'pandas', 'flask', 'django',
+          'javascript', 'typescript', 'git', 'linux', 'tensorflow', 'swift', 'kotlin', 'agile', 'scrum', 'azure']
+
+def seed(connection, candidates, skills_per_candidate, batch_size=5000):
+    rng = random.Random(42)
+    cursor = connection.cursor()
+    start_time = datetime.datetime(2023, 1, 1)
+    next_id = 1
+    for start in range(0, candidates, batch_size):
+        count = min(batch_size, candidates - start)
+        rows, skill_rows = [], []
+        for offset in range(count):
+            pages = rng.choice([1, 1, 2, 3])
+            # Most candidates score low, so > 80 is selective, as in production
+            score = round(min(100, rng.expovariate(1 / 30)), 2)
+            timestamp = (start_time + datetime.timedelta(minutes=start + offset)).strftime('%Y-%m-%d_%H:%M:%S')
+            rows.append((next_id + offset, f"Candidate {start + offset}", f"c{start + offset}@example.com", str(score), timestamp,
+                         str(pages), rng.choice(FIELDS), USER_LEVELS[min(pages, 3) - 1], '[]', '[]'))
+            skill_rows.extend((next_id + offset, skill) for skill in rng.sample(SKILLS, skills_per_candidate))
+        cursor.executemany("INSERT INTO user_data (ID, Name, Email_ID, resume_score, Timestamp, Page_no, Predicted_Field, User_level, "
+                           "Recommended_skills, Recommended_courses) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)", rows)
+        cursor.executemany("INSERT INTO user_skills (user_id, skill_name) VALUES (%s, %s)", skill_rows)
+        connection.commit()
+        next_id += count
+    cursor.execute("ANALYZE TABLE user_data, user_skills")
+    cursor.fetchall()
+
+def report(connection, version):
+    cursor = connection.cursor()
+    for name, queries in QUERIES.items():
+        query = queries[max(v for v in queries if v <= version)]
+        cursor.execute("EXPLAIN " + query)
+        columns = [desc[0] for desc in cursor.description]
+        plans = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+        print(f"  {name:<15}: {min(timings) * 1000:9.1f} ms  ({len(rows)} rows)")
+        for plan in plans:
+            print(f"      EXPLAIN table={plan.get('table')} type={plan.get('type')} key={plan.get('key')} "
+                  f"rows={plan.get('rows')} extra={plan.get('Extra')}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.environ.get('DB_HOST', 'localhost'))
+    parser.add_argument('--user', default=os.environ.get('DB_USER', 'root'))
+    parser.add_argument('--password', default=os.environ.get('DB_PASSWORD', ''))
+    parser.add_argument('--database', default='cv_schema_bench')
+    parser.add_argument('--candidates', type=int, default=1000000)
+    parser.add_argument('--skills', type=int, default=5)
+    args = parser.parse_args()
+
+    connection = pymysql.connect(host=args.host, user=args.user, password=args.password)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {args.database}")
+        cursor.execute(f"CREATE DATABASE {args.database}")
+        connection.select_db(args.database)
+        run_migrations(connection, target=1)
+
+        start = time.perf_counter()
+        seed(connection, args.candidates, args.skills)
+        print(f"Seeded {args.candidates} candidates in {time.perf_counter() - start:.1f}s")
+        print("Schema version 1 (legacy):")
+        report(connection, 1)
+
+        start = time.perf_counter()
+        run_migrations(connection)
+        print(f"Migrated to version {schema_version(connection)} in {time.perf_counter() - start:.1f}s")
+        report(connection, schema_version(connection))
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
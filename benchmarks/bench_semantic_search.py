@@ -0,0 +1,94 @@
+"""
+Benchmark: FAISS candidate search by index type and candidate count.
+
+Usage (from the repo root):
+    python benchmarks/bench_semantic_search.py [--candidates 10000 100000] [--types flat ivf hnsw] [--dim 384]
+
+For each candidate count, --candidates synthetic unit-length embeddings
+(clustered, as real resume embeddings are) are served to
+semantic_index.CandidateIndex by a stand-in candidate_embeddings table.
+The benchmark then reports the build time, search p50/p95 over --queries
+queries, recall@10 against exact search and the vector memory.
+
+For comparison, the scan this replaces costs one model forward pass per
+stored resume per query (seconds per thousand candidates on CPU) on top of
+re-reading every PDF.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from semantic_index import CandidateIndex
+
+MODEL = 'bench-model'
+
+class StandInCursor:
+    """Answers the candidate_embeddings SELECTs CandidateIndex issues from an in-memory table."""
+    def __init__(self, table):
+        self.table = table
+        self.rows = []
+
+    def execute(self, query, args):
+        if query.startswith("SELECT user_id FROM"):
+            self.rows = [(user_id,) for user_id in self.table if user_id > args[1]]
+        elif 'IN (' in query:
+            self.rows = [(user_id,) + self.table[user_id] for user_id in args[1:] if user_id in self.table]
+        else:
+            last_id, limit = args[1], args[2]
+            self.rows = [(user_id,) + self.table[user_id] for user_id in range(last_id + 1, min(last_id + 1 + limit, len(self.table) + 1))]
+
+    def fetchall(self):
+        return self.rows
+
+class StandInConnection:
+    def __init__(self, table):
+        self.table = table
+
+    def cursor(self):
+        return StandInCursor(self.table)
+
+def unit(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)).astype('float32')
+
+def make_table(candidates, dim, rng):
+    centers = rng.normal(size=(max(1, candidates // 500), dim))
+    vectors = unit(centers[rng.integers(0, len(centers), candidates)] + 0.6 * rng.normal(size=(candidates, dim)))
+    return {i + 1: (None, vectors[i].tobytes()) for i in range(candidates)}, vectors, centers
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidates', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--types', nargs='+', default=['flat', 'ivf', 'hnsw'], choices=['flat', 'ivf', 'hnsw'])
+    parser.add_argument('--dim', type=int, default=384, help='384 for all-MiniLM-L6-v2')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for candidates in args.candidates:
+        table, vectors, centers = make_table(candidates, args.dim, rng)
+        queries = unit(centers[rng.integers(0, len(centers), args.queries)] + 0.6 * rng.normal(size=(args.queries, args.dim)))
+        exact = [set((np.argsort(-(vectors @ query))[:args.k] + 1).tolist()) for query in queries]
+        print(f"Candidates: {candidates} (dim {args.dim})")
+        for index_type in args.types:
+            index = CandidateIndex(MODEL, index_type=index_type)
+            start = time.perf_counter()
+            index.sync(StandInConnection(table))
+            build = time.perf_counter() - start
+            timings, recalls = [], []
+            for query, expected in zip(queries, exact):
+                start = time.perf_counter()
+                hits = index.search(query, args.k)
+                timings.append(time.perf_counter() - start)
+                recalls.append(len(expected & {user_id for user_id, _ in hits}) / args.k)
+            quantiles = statistics.quantiles(timings, n=100)
+            print(f"  {index_type:<5}: build {build:6.2f}s | search p50 {quantiles[49] * 1000:7.3f} ms  p95 {quantiles[94] * 1000:7.3f} ms | "
+                  f"recall@{args.k} {statistics.mean(recalls):.3f} | vectors {index.stats()['vector_bytes'] / 1e6:7.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: sequential shortlist scoring vs. the warm process pool.
+
+Usage (from the repo root):
+    python benchmarks/bench_shortlist_pool.py [--workers 1 2 4 8] [--copies 3]
+
+Scores every PDF in uploads/ (repeated --copies times) against the default JD,
+first in this process and then through shortlist_pool with each worker count,
+and prints wall time and speedup. The resume cache is disabled so every run
+really parses the PDFs.
+"""
+import os
+import sys
+import time
+import argparse
+
+# Disable both resume cache tiers (also for the workers, which inherit the environment)
+os.environ['RESUME_CACHE_PATH'] = ''
+os.environ['RESUME_CACHE_SIZE'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shortlist_pool
+from Courses import JOB_DESCRIPTIONS
+
+UPLOADS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--copies', type=int, default=3)
+    args = parser.parse_args()
+
+    named_bytes = []
+    for copy in range(args.copies):
+        for filename in sorted(f for f in os.listdir(UPLOADS_FOLDER) if f.endswith('.pdf')):
+            with open(os.path.join(UPLOADS_FOLDER, filename), 'rb') as f:
+                named_bytes.append((f"{copy}_{filename}", f.read()))
+    jd = JOB_DESCRIPTIONS.get('default', '')
+
+    start = time.perf_counter()
+    shortlist_pool._score_chunk(named_bytes, jd)
+    sequential = time.perf_counter() - start
+    print(f"Resumes: {len(named_bytes)}")
+    print(f"sequential      : {sequential:7.2f} s")
+
+    for workers in sorted(set(args.workers)):
+        shortlist_pool.SHORTLIST_WORKERS = workers
+        shortlist_pool.get_shortlist_pool(workers)
+        start = time.perf_counter()
+        shortlist_pool.score_resume_files_parallel(named_bytes, jd)
+        elapsed = time.perf_counter() - start
+        shortlist_pool.shutdown_shortlist_pool()
+        print(f"pool x{workers:<2}        : {elapsed:7.2f} s  ({sequential / elapsed:4.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: boolean skill search with the roaring-bitmap skill index.
+
+Usage (from the repo root):
+    python benchmarks/bench_skill_index.py [--candidates 1000000] [--skills-per-candidate 8] [--repeat 200]
+    python benchmarks/bench_skill_index.py --host localhost --user root --database cv
+
+Without --host, --candidates synthetic candidates get skills drawn from
+Courses.KEYWORDS (a few popular skills, a long tail), served to
+skill_index.SkillIndex.build by a stand-in user_data / user_skills. With
+--host the index is built from that database instead.
+
+Reported: build time, the index's bitmap memory next to plain int32 ID
+lists, and per query the match count and p50/p95 latency of evaluating the
+expression and fetching the first page of 50 IDs.
+"""
+import os
+import sys
+import time
+import bisect
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Courses import KEYWORDS
+from skill_index import SkillIndex
+
+QUERIES = [
+    'python',
+    'python AND (django OR flask) AND NOT php',
+    'java AND NOT python',
+    '(aws OR azure OR gcp) AND docker AND kubernetes',
+    'NOT sql',
+    'react AND (node.js OR "next.js") AND NOT angular',
+    'machine learning AND python AND (tensorflow OR pytorch)',
+]
+
+class StandInCursor:
+    """Serves the keyset-paged SELECTs of SkillIndex.build from in-memory rows sorted by ID."""
+    def __init__(self, candidate_ids, skill_rows):
+        self.candidate_ids, self.skill_rows = candidate_ids, skill_rows
+        self.skill_row_ids = [row[0] for row in skill_rows]
+        self.rows = []
+
+    def execute(self, query, args):
+        after, limit = args
+        if 'FROM user_data' in query:
+            start = bisect.bisect_right(self.candidate_ids, after)
+            self.rows = [(user_id,) for user_id in self.candidate_ids[start:start + limit]]
+        else:
+            start = bisect.bisect_right(self.skill_row_ids, after)
+            self.rows = self.skill_rows[start:start + limit]
+
+    def fetchall(self):
+        return self.rows
+
+class StandInConnection:
+    def __init__(self, candidate_ids, skill_rows):
+        self.candidate_ids, self.skill_rows = candidate_ids, skill_rows
+
+    def cursor(self):
+        return StandInCursor(self.candidate_ids, self.skill_rows)
+
+def synthetic_database(candidates, skills_per_candidate):
+    rng = random.Random(42)
+    skills = sorted({skill.lower() for field_skills in KEYWORDS.values() for skill in field_skills})
+    # Zipf-like popularity: a few skills are on most resumes
+    weights = [1 / (rank + 1) for rank in range(len(skills))]
+    rng.shuffle(weights)
+    for popular in ('python', 'sql', 'java', 'aws', 'docker', 'react'):
+        if popular in skills: weights[skills.index(popular)] = 1.0
+    candidate_ids, skill_rows = [], []
+    for user_id in range(1, candidates + 1):
+        candidate_ids.append(user_id)
+        for skill in set(rng.choices(skills, weights, k=rng.randint(1, 2 * skills_per_candidate - 1))):
+            skill_rows.append((len(skill_rows) + 1, user_id, skill))
+    return StandInConnection(candidate_ids, skill_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidates', type=int, default=1000000)
+    parser.add_argument('--skills-per-candidate', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--host')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='cv')
+    args = parser.parse_args()
+
+    if args.host:
+        import pymysql
+        connection = pymysql.connect(host=args.host, user=args.user, password=args.password, database=args.database)
+    else:
+        start = time.perf_counter()
+        connection = synthetic_database(args.candidates, args.skills_per_candidate)
+        print(f"Generated {args.candidates} candidates, {len(connection.skill_rows)} skill rows in {time.perf_counter() - start:.1f}s")
+
+    index = SkillIndex()
+    index.build(connection)
+    stats = index.stats()
+    print(f"Built in {stats['build_seconds']:.1f}s: {stats['candidates']} candidates, {stats['skills']} skills, {stats['postings']} postings")
+    print(f"Memory: bitmaps {stats['bitmap_bytes'] / 1e6:.1f} MB vs int32 ID lists {stats['uncompressed_bytes'] / 1e6:.1f} MB")
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = index.query(query, limit=50)
+            timings.append(time.perf_counter() - start)
+        quantiles = statistics.quantiles(timings, n=100)
+        print(f"  {result['total']:8d} matches  p50 {quantiles[49] * 1000:7.3f} ms  p95 {quantiles[94] * 1000:7.3f} ms  {query}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: per-keyword regex loop vs. the single-pass skill matcher.
+
+Usage (from the repo root):
+    python benchmarks/bench_skill_matcher.py [--repeat 20]
+
+Reads every PDF in uploads/, checks that both matchers return the same skills
+and prints the time spent matching skills per resume.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Courses import KEYWORDS
+from utils import pdf_reader, normalize_texts, match_skills
+
+UPLOADS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+
+def legacy_match_skills(cleaned_text):
+    found_skills = set()
+    for field, keywords in KEYWORDS.items():
+        for keyword in keywords:
+            if re.search(r'\b' + re.escape(keyword) + r'\b', cleaned_text):
+                found_skills.add(keyword)
+    return found_skills
+
+def time_it(func, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    files = sorted(f for f in os.listdir(UPLOADS_FOLDER) if f.endswith('.pdf'))
+    texts = normalize_texts([pdf_reader(os.path.join(UPLOADS_FOLDER, filename))[0] for filename in files])
+
+    mismatches = [f for f, t in zip(files, texts) if legacy_match_skills(t) != match_skills(t)]
+    if mismatches:
+        print(f"MISMATCH on: {', '.join(mismatches)}")
+        sys.exit(1)
+
+    legacy = time_it(legacy_match_skills, texts, args.repeat)
+    single_pass = time_it(match_skills, texts, args.repeat)
+    print(f"Resumes: {len(texts)} | identical results: yes")
+    print(f"Per-keyword loop : {legacy * 1000:8.3f} ms/resume")
+    print(f"Single-pass      : {single_pass * 1000:8.3f} ms/resume")
+    print(f"Speedup          : {legacy / single_pass:8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Benchmark: every resume-pipeline stage timed on its own over the uploads/ corpus.
+
+Usage (from the repo root):
+    python benchmarks/bench_stages.py [--repeat 10] [--semantic] [--stages pdf_reader normalize_text]
+    python benchmarks/bench_stages.py --save-baseline          # record this machine's baseline
+    python benchmarks/bench_stages.py                          # ... later: compare against it
+
+Stages: pdf_reader, normalize_text, parse_resume_sections,
+extract_resume_data (without the NER fallback), ner_names (only when the
+spaCy model is installed), predict_field_fast, jd_compile, each part of
+calculate_rigorous_score (score_skills, score_education, score_experience,
+and score_semantic_fit with --semantic), and the two resume PDF generators
+of /api/download_updated_resume (classic_pdf, modern_pdf).
+
+Each stage runs --repeat times over every resume (every preset JD for
+jd_compile) for p50/p95 latency per call and throughput, then once more
+under tracemalloc for the peak of Python allocations (MuPDF's own memory is
+not included). Results go to --output as JSON. When a baseline exists
+(--baseline, default benchmarks/results/baseline.json) each stage is
+compared with it. A stage is flagged as a regression when its best time
+(the mean over items of each item's fastest run, steadier than p50 on a
+busy machine) is more than --threshold and --min-ms slower, or its peak
+memory more than --threshold and 64 KB larger; the exit status is then 1.
+Baseline times are first scaled by a calibration workload timed in both
+runs, which absorbs CPU frequency and noisy-neighbour drift; compare runs
+from the same machine all the same.
+
+Runs offline: Hugging Face downloads are disabled, and the semantic model is
+only used with --semantic and only if it is already in the local cache.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import statistics
+import tracemalloc
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+UPLOADS_FOLDER = os.path.join(ROOT, 'uploads')
+RESULTS_FOLDER = os.path.join(ROOT, 'benchmarks', 'results')
+MIN_PEAK_BYTES = 64 * 1024
+
+def load_corpus(folder):
+    from utils import pdf_reader, normalize_text, parse_resume_sections, extract_resume_data
+    corpus = []
+    for filename in sorted(f for f in os.listdir(folder) if f.lower().endswith('.pdf')):
+        path = os.path.join(folder, filename)
+        raw_text, _ = pdf_reader(path)
+        if not raw_text.strip(): continue
+        cleaned_text = normalize_text(raw_text)
+        sections = parse_resume_sections(raw_text)
+        data = extract_resume_data(raw_text, cleaned_text, ner=False)
+        corpus.append({'filename': filename, 'path': path, 'raw': raw_text, 'clean': cleaned_text, 'sections': sections, 'data': data,
+                       # What /api/parse_for_generator hands the PDF generators
+                       'generator': {'name': data.get('name'), 'email': data.get('email'), 'mobile': data.get('mobile_number'),
+                                     'summary': sections.get('Summary', ''), 'experience': sections.get('Experience', ''),
+                                     'education': sections.get('Education', ''), 'projects': sections.get('Projects', ''),
+                                     'skills': "\n".join(data.get('skills', []))}})
+    return corpus
+
+def build_stages(corpus, semantic):
+    """{name: (function of one item, items)}; stages whose dependency is missing are left out with a note."""
+    import utils
+    from Courses import JOB_DESCRIPTIONS
+    jd = utils.JobDescription(JOB_DESCRIPTIONS.get('default', ''))
+    stages = {
+        'pdf_reader': (utils.pdf_reader, [r['path'] for r in corpus]),
+        'normalize_text': (utils.normalize_text, [r['raw'] for r in corpus]),
+        'parse_resume_sections': (utils.parse_resume_sections, [r['raw'] for r in corpus]),
+        'extract_resume_data': (lambda r: utils.extract_resume_data(r['raw'], r['clean'], ner=False), corpus),
+        'ner_names': (lambda r: utils.ner_names([r['raw']]), corpus),
+        'predict_field_fast': (utils.predict_field_fast, [r['clean'] for r in corpus]),
+        # Compiling a JD (uncached), then the four parts of calculate_rigorous_score against the default JD
+        'jd_compile': (utils.JobDescription, list(JOB_DESCRIPTIONS.values())),
+        'score_skills': (lambda r: utils._skills_score(r['data'].get('skills', []), jd), corpus),
+        'score_education': (lambda r: utils._education_score(r['sections'].get('Education', ''), jd), corpus),
+        'score_experience': (lambda r: utils._experience_score(r['sections'].get('Experience', ''), jd), corpus),
+        'score_semantic_fit': (lambda r: utils._semantic_fit_scores([r['sections'].get('Experience', '')], jd, utils.SEMANTIC_BATCH_SIZE), corpus),
+    }
+    notes = {}
+    if importlib.util.find_spec('en_core_web_sm') is None:
+        notes['ner_names'] = 'skipped: spaCy model en_core_web_sm is not installed'
+    if not semantic:
+        notes['score_semantic_fit'] = 'skipped: run with --semantic'
+    elif utils.get_semantic_model() is None:
+        notes['score_semantic_fit'] = 'skipped: semantic model not in the local cache'
+    else:
+        jd.embedding  # encoded once, as the JD cache does
+    if importlib.util.find_spec('fpdf') is None:
+        notes['classic_pdf'] = notes['modern_pdf'] = 'skipped: fpdf is not installed'
+    else:
+        # app.py owns the generators; importing it also warms the JD cache and tries the database
+        import app
+        def render(create):
+            return lambda data: create(data).output(dest='S')
+        stages['classic_pdf'] = (render(app.create_classic_pdf), [r['generator'] for r in corpus])
+        stages['modern_pdf'] = (render(app.create_modern_pdf), [r['generator'] for r in corpus])
+    return {name: stage for name, stage in stages.items() if name not in notes}, notes
+
+def calibrate():
+    # Best of 5 runs of a fixed pure-Python workload: how fast this machine is right now
+    def workload():
+        return sorted(str(i * 7919 % 10007) for i in range(50000))
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        workload()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def run_stage(function, items, repeat):
+    function(items[0])  # warm-up: lazy models, regex compilation
+    per_item = [[] for _ in items]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item, item_timings in zip(items, per_item):
+            call_start = time.perf_counter()
+            function(item)
+            item_timings.append(time.perf_counter() - call_start)
+    wall = time.perf_counter() - start
+    timings = [t for item_timings in per_item for t in item_timings]
+    # A separate pass, since tracemalloc slows every allocation down
+    tracemalloc.start()
+    for item in items: function(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else [timings[0]] * 99
+    return {'calls': len(timings), 'throughput_per_s': len(timings) / wall if wall else None,
+            'mean_ms': statistics.mean(timings) * 1000, 'p50_ms': quantiles[49] * 1000, 'p95_ms': quantiles[94] * 1000,
+            # Mean over items of each item's fastest run: the figure least disturbed by other load
+            'best_ms': statistics.mean(min(item_timings) for item_timings in per_item) * 1000,
+            'peak_bytes': peak}
+
+def compare(results, baseline, threshold, min_ms):
+    """Prints each stage against the baseline; returns the names of the stages that regressed."""
+    regressions = []
+    # Baseline times are scaled by how much faster or slower the machine runs the calibration workload now
+    speed = results['meta']['calibration_ms'] / baseline['meta']['calibration_ms'] if baseline['meta'].get('calibration_ms') else 1.0
+    print(f"\nAgainst baseline from {baseline['meta'].get('timestamp', '?')} (threshold {threshold:.0%}, machine speed factor {speed:.2f}):")
+    for name, current in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            print(f"  {name:<22} new stage")
+            continue
+        flags = []
+        # Gated on best_ms: p50 and p95 over a small corpus move with whatever else the machine is doing
+        expected = before['best_ms'] * speed
+        if current['best_ms'] > expected * (1 + threshold) and current['best_ms'] - expected >= min_ms: flags.append('time')
+        if current['peak_bytes'] > before['peak_bytes'] * (1 + threshold) and current['peak_bytes'] - before['peak_bytes'] >= MIN_PEAK_BYTES:
+            flags.append('memory')
+        change = (current['best_ms'] / expected - 1) if expected else 0.0
+        print(f"  {name:<22} best {expected:9.3f} -> {current['best_ms']:9.3f} ms ({change:+7.1%})  "
+              f"p50 {before['p50_ms']:9.3f} -> {current['p50_ms']:9.3f} ms  "
+              f"peak {before['peak_bytes'] / 1024:8.1f} -> {current['peak_bytes'] / 1024:8.1f} KB"
+              f"{'  REGRESSION: ' + ', '.join(flags) if flags else ''}")
+        if flags: regressions.append(name)
+    for name in baseline['stages']:
+        if name not in results['stages']: print(f"  {name:<22} not run this time")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=UPLOADS_FOLDER, help='folder of resume PDFs')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--stages', nargs='+', help='only these stages')
+    parser.add_argument('--semantic', action='store_true', help='include score_semantic_fit (needs the cached model)')
+    parser.add_argument('--output', default=os.path.join(RESULTS_FOLDER, 'latest.json'))
+    parser.add_argument('--baseline', default=os.path.join(RESULTS_FOLDER, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='also write the results to --baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown / memory growth (0.2 = 20%%)')
+    parser.add_argument('--min-ms', type=float, default=0.05, help='ignore latency changes smaller than this')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus: sys.exit(f"No readable PDFs in {args.corpus}")
+    stages, notes = build_stages(corpus, args.semantic)
+    if args.stages:
+        unknown = set(args.stages) - set(stages) - set(notes)
+        if unknown: sys.exit(f"Unknown stages: {', '.join(sorted(unknown))}")
+        stages = {name: stage for name, stage in stages.items() if name in args.stages}
+        notes = {name: note for name, note in notes.items() if name in args.stages}
+
+    results = {'meta': {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                        'platform': platform.platform(), 'cpus': os.cpu_count(), 'corpus': args.corpus, 'resumes': len(corpus),
+                        'repeat': args.repeat, 'semantic': args.semantic, 'skipped': notes, 'calibration_ms': calibrate()},
+               'stages': {}}
+    print(f"Resumes: {len(corpus)} | repeat: {args.repeat}")
+    for name, (function, items) in stages.items():
+        try:
+            result = run_stage(function, items, args.repeat)
+        except Exception as e:
+            notes[name] = f"failed: {type(e).__name__}: {e}"
+            continue
+        results['stages'][name] = result
+        print(f"  {name:<22} {result['throughput_per_s']:10.1f}/s  p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  "
+              f"peak {result['peak_bytes'] / 1024:8.1f} KB")
+    for name, note in notes.items(): print(f"  {name:<22} {note}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f: json.dump(results, f, indent=2)
+    print(f"Results: {args.output}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f: json.dump(results, f, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f: baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: /api/upload persistence inline vs. through the write-behind queue.
+
+Usage (from the repo root):
+    python benchmarks/bench_write_behind.py [--threads 1 8] [--uploads 400] [--latency 0.002] [--commit-latency 0.01]
+    python benchmarks/bench_write_behind.py --host localhost --user root --database cv
+
+"inline" is the WRITE_BEHIND=false path: every upload inserts its own
+candidate and commits while the request waits. "write-behind" only submits
+the record to write_behind.WriteBehindQueue, which writes batches of
+--batch-size in one transaction. Reported: the time each upload spends on
+persistence (p50/p95), the wall time until everything is committed
+(including the final flush), and the number of transactions.
+
+Without --host the database is a local stand-in: each statement takes
+--latency seconds and each commit --commit-latency (the round trip and log
+flush of a real server). With --host the candidates are inserted into that
+database (drop them afterwards).
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool
+from write_behind import WriteBehindQueue, candidate_record, insert_candidates
+
+class StandInCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.lastrowid = 1
+
+    def execute(self, query, args=None):
+        time.sleep(self.connection.latency)
+
+    def executemany(self, query, rows):
+        # pymysql sends an INSERT ... VALUES executemany as one multi-row statement
+        time.sleep(self.connection.latency)
+
+    def fetchone(self):
+        return (1,)
+
+class StandInConnection:
+    def __init__(self, latency, commit_latency, counter):
+        self.latency, self.commit_latency, self.counter = latency, commit_latency, counter
+        self.open = True
+        self.server_status = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def commit(self):
+        time.sleep(self.commit_latency)
+        self.counter.append(1)
+
+    def ping(self): pass
+    def rollback(self): pass
+
+    def close(self):
+        self.open = False
+
+def make_records(count):
+    return [candidate_record(f"Candidate {i}", f"c{i}@example.com", 55.5, 1 + i % 3, 'Web Development',
+                             ['python', 'sql', 'flask', 'docker'][:1 + i % 4]) for i in range(count)]
+
+def run(threads, records, persist):
+    latencies = []
+    lock = threading.Lock()
+    def worker(chunk):
+        for record in chunk:
+            start = time.perf_counter()
+            persist(record)
+            with lock: latencies.append(time.perf_counter() - start)
+    workers = [threading.Thread(target=worker, args=(records[i::threads],)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker_thread in workers: worker_thread.start()
+    for worker_thread in workers: worker_thread.join()
+    return latencies, start
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100)[p - 1] * 1000 if len(values) > 1 else values[0] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--uploads', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.002, help='stand-in statement time in seconds')
+    parser.add_argument('--commit-latency', type=float, default=0.01, help='stand-in commit time in seconds')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--host')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='cv')
+    args = parser.parse_args()
+
+    commits = []
+    if args.host:
+        import pymysql
+        connect = lambda: pymysql.connect(host=args.host, user=args.user, password=args.password, database=args.database)
+    else:
+        connect = lambda: StandInConnection(args.latency, args.commit_latency, commits)
+    records = make_records(args.uploads)
+    print(f"Uploads: {args.uploads} | database: {args.host or f'stand-in ({args.latency * 1000:.1f} ms/statement, {args.commit_latency * 1000:.1f} ms/commit)'}")
+
+    for threads in args.threads:
+        pool = ConnectionPool(connect, max_size=threads)
+        def persist_inline(record):
+            with pool.connection() as connection:
+                insert_candidates(connection.cursor(), [record])
+                connection.commit()
+        commits.clear()
+        latencies, start = run(threads, records, persist_inline)
+        inline_wall, inline_commits = time.perf_counter() - start, len(commits)
+        print(f"threads={threads:<3} inline      : upload p50 {percentile(latencies, 50):7.2f} ms  p95 {percentile(latencies, 95):7.2f} ms | "
+              f"all committed after {inline_wall:6.2f}s | {inline_commits} transactions")
+
+        commits.clear()
+        queue = WriteBehindQueue(pool, batch_size=args.batch_size).start()
+        latencies, start = run(threads, records, queue.submit)
+        queue.flush()
+        wall = time.perf_counter() - start
+        stats = queue.stats()
+        queue.close()
+        pool.close_all()
+        print(f"threads={threads:<3} write-behind: upload p50 {percentile(latencies, 50):7.2f} ms  p95 {percentile(latencies, 95):7.2f} ms | "
+              f"all committed after {wall:6.2f}s | {stats['batches']} transactions (avg {stats['avg_batch_size']:.0f} rows)")
+
+if __name__ == '__main__':
+    main()
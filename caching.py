@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache with an optional time-to-live per entry.
+    Used for compiled job descriptions and parsed resumes, where the same
+    inputs come back many times a day.
+    """
+    def __init__(self, max_size=256, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.time() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._data[key] = (value, stored_at if stored_at is not None else time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def items(self):
+        """Snapshot of (key, value, stored_at) for every live entry, oldest first."""
+        with self._lock:
+            now = time.time()
+            return [(k, v, ts) for k, (v, ts) in self._data.items() if self.ttl is None or now - ts <= self.ttl]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+class ResumeCache:
+    """
+    Two-tier cache for parsed resumes keyed by a hash of the PDF bytes.
+    Tier 1 is an in-memory LRUCache, tier 2 an SQLite file shared by every
+    process (Flask workers, Celery workers) and evicted least-recently-used
+    first once the stored payloads exceed max_disk_bytes. The file is opened
+    on first use, not on construction; entries written under a different
+    `version` (taxonomy/parser version) are dropped then.
+    `encode` / `decode` convert a value to and from what is stored as JSON.
+    """
+    def __init__(self, path=None, version='', memory_size=512, max_disk_bytes=256 * 1024 * 1024, encode=None, decode=None):
+        self.path = path
+        self.version = version
+        self.encode = encode
+        self.decode = decode
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = LRUCache(max_size=memory_size)
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._opened = False
+        # Running total of the stored payload sizes, so a put does not SUM the table
+        self._disk_bytes = 0
+
+    def _open(self):
+        # Creates the file and drops other versions' entries on first use, so importing
+        # a module that builds a ResumeCache leaves the disk alone. False without a disk tier
+        if self._opened: return bool(self.path)
+        with self._lock:
+            if not self._opened and self.path:
+                try:
+                    self._init_db()
+                except Exception as e:
+                    print(f"Warning: Resume cache disk tier disabled ({self.path}): {e}")
+                    self.path = None
+            self._opened = True
+        return bool(self.path)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS resume_cache (
+                cache_key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_resume_cache_accessed ON resume_cache (accessed)")
+            conn.execute("DELETE FROM resume_cache WHERE version != ?", (self.version,))
+            self._disk_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM resume_cache").fetchone()[0]
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None: return value
+        if self._open():
+            try:
+                with self._lock, closing(self._connect()) as conn, conn:
+                    row = conn.execute("SELECT payload FROM resume_cache WHERE cache_key = ? AND version = ?", (key, self.version)).fetchone()
+                    if row:
+                        conn.execute("UPDATE resume_cache SET accessed = ? WHERE cache_key = ?", (time.time(), key))
+                if row:
+                    value = json.loads(row[0])
+                    if self.decode: value = self.decode(value)
+                    self.memory.set(key, value)
+                    self.disk_hits += 1
+                    return value
+            except Exception as e:
+                print(f"Resume cache read error: {e}")
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if not self._open(): return
+        payload = json.dumps(self.encode(value) if self.encode else value).encode('utf-8')
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                old = conn.execute("SELECT size FROM resume_cache WHERE cache_key = ?", (key,)).fetchone()
+                conn.execute(
+                    "REPLACE INTO resume_cache (cache_key, version, payload, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, self.version, payload, len(payload), time.time())
+                )
+                self._disk_bytes += len(payload) - (old[0] if old else 0)
+                if self._disk_bytes > self.max_disk_bytes: self._evict(conn)
+        except Exception as e:
+            print(f"Resume cache write error: {e}")
+
+    def _evict(self, conn):
+        # The running total only counts this process's puts; the real one includes the other processes'
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM resume_cache").fetchone()[0]
+        if total > self.max_disk_bytes:
+            for cache_key, size in conn.execute("SELECT cache_key, size FROM resume_cache ORDER BY accessed").fetchall():
+                conn.execute("DELETE FROM resume_cache WHERE cache_key = ?", (cache_key,))
+                total -= size
+                if total <= self.max_disk_bytes: break
+        self._disk_bytes = total
+
+    def clear(self):
+        self.memory.clear()
+        if self._open():
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM resume_cache")
+                self._disk_bytes = 0
+
+    def stats(self):
+        memory = self.memory.stats()
+        stats = {
+            'memory_hits': memory['hits'], 'disk_hits': self.disk_hits, 'misses': self.misses,
+            'memory_size': memory['size'], 'memory_max_size': memory['max_size'],
+            'disk_entries': 0, 'disk_bytes': 0, 'disk_max_bytes': self.max_disk_bytes, 'version': self.version,
+        }
+        if self._open():
+            try:
+                with closing(self._connect()) as conn:
+                    stats['disk_entries'], stats['disk_bytes'] = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM resume_cache").fetchone()
+            except Exception as e:
+                print(f"Resume cache stats error: {e}")
+        return stats
@@ -0,0 +1,155 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+import pymysql
+from metrics import DB_SECONDS
+
+# pymysql's SERVER_STATUS_IN_TRANS: the connection has an open transaction
+SERVER_STATUS_IN_TRANS = 1
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections (pymysql in app.py).
+    Connections are created on demand up to max_size and handed out one per
+    request. A connection idle for longer than health_check_interval is pinged
+    before reuse and replaced if the ping fails, and a closed or broken
+    connection is dropped on release, so a restarted MySQL server is picked up
+    without restarting the app. stats() reports checkouts and time spent
+    waiting for a free connection.
+    """
+    def __init__(self, connect, max_size=8, timeout=10, health_check_interval=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._waiting = 0
+        self._metrics = {
+            'checkouts': 0, 'waits': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0,
+            'timeouts': 0, 'connects': 0, 'connect_errors': 0, 'health_checks': 0, 'reconnects': 0, 'discarded': 0
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _new_connection(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._metrics['connect_errors'] += 1
+                # As in release(): a queued waiter gets the slot (and tries its own connect)
+                hand_over = self._waiting > 0
+                if not hand_over: self._created -= 1
+            if hand_over: self._idle.put((None, None))
+            raise
+        self._count('connects')
+        return conn
+
+    def acquire(self):
+        """Checks out a healthy connection, waiting up to `timeout` seconds for one to be released."""
+        start = time.perf_counter()
+        with self._lock:
+            # Callers queue behind earlier waiters instead of grabbing a just-released connection
+            create = self._waiting == 0 and self._idle.empty() and self._created < self.max_size
+            if create: self._created += 1
+            else: self._waiting += 1
+            waited = not create and (self._waiting > 1 or self._idle.empty())
+        if create:
+            conn, released_at = self._new_connection(), None
+        else:
+            try:
+                conn, released_at = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                self._count('timeouts')
+                raise PoolTimeout(f"No database connection free after {self.timeout}s ({self.max_size} in use)")
+            finally:
+                with self._lock: self._waiting -= 1
+            # A dropped connection hands its slot to the next waiter
+            if conn is None: conn = self._new_connection()
+
+        if released_at is not None and time.monotonic() - released_at > self.health_check_interval:
+            self._count('health_checks')
+            try:
+                conn.ping()
+            except Exception:
+                self._close(conn)
+                self._count('reconnects')
+                conn = self._new_connection()
+
+        wait = time.perf_counter() - start
+        with self._lock:
+            self._metrics['checkouts'] += 1
+            if waited:
+                self._metrics['waits'] += 1
+                self._metrics['wait_seconds_total'] += wait
+                self._metrics['wait_seconds_max'] = max(self._metrics['wait_seconds_max'], wait)
+        return conn
+
+    def release(self, conn, broken=False):
+        """Returns a connection to the pool; uncommitted work is rolled back and broken connections are dropped."""
+        if not broken and getattr(conn, 'open', True):
+            try:
+                if getattr(conn, 'server_status', 0) & SERVER_STATUS_IN_TRANS: conn.rollback()
+                self._idle.put((conn, time.monotonic()))
+                return
+            except Exception:
+                pass
+        self._close(conn)
+        with self._lock:
+            self._metrics['discarded'] += 1
+            if self._waiting == 0:
+                self._created -= 1
+                return
+        self._idle.put((None, None))
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... (outside a request)."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, broken=not getattr(conn, 'open', True))
+            raise
+        else:
+            self.release(conn)
+
+    def _close(self, conn):
+        try: conn.close()
+        except Exception: pass
+
+    def close_all(self):
+        while True:
+            try: conn, _ = self._idle.get_nowait()
+            except queue.Empty: break
+            with self._lock: self._created -= 1
+            if conn is not None: self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats.update({'max_size': self.max_size, 'open': self._created, 'idle': self._idle.qsize(),
+                          'in_use': self._created - self._idle.qsize()})
+        stats['wait_seconds_avg'] = stats['wait_seconds_total'] / stats['waits'] if stats['waits'] else 0.0
+        return stats
+
+class TimedCursor(pymysql.cursors.Cursor):
+    """
+    pymysql cursor (pass as cursorclass) recording each statement's time in
+    cv_db_seconds by SQL verb. A buffered cursor reads the whole result inside
+    execute, and executemany goes through execute, so this is the full round trip.
+    """
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - start, operation=(query.split(None, 1) or ['empty'])[0].lower())
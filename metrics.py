@@ -0,0 +1,288 @@
+"""
+Counters and histograms for where requests spend their time, rendered in the
+Prometheus text exposition format (GET /metrics, and a small HTTP server for
+Celery workers; see serve_metrics).
+
+Metrics live in one process-wide registry. Other processes report into it by
+snapshot: shortlist pool workers hand back drain_snapshot() with every chunk
+and the app merges it, Celery children write theirs to a directory the
+worker's metrics server sums up. With METRICS_ENABLED=false every
+observation is a no-op.
+"""
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; resume stages run from well under a millisecond (skill matching) to seconds (NER, embeddings)
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6, 64e6)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED: return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def _merge(self, samples):
+        with self._lock:
+            for key, value in samples:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0) + value
+
+    def _reset(self):
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+            self._values = {}
+        return samples
+
+    def _render(self, samples):
+        for key, value in samples:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=TIME_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        # label values -> [count per bucket (last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED: return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None: entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][position] += 1
+            entry[1] += value
+
+    def time(self, **labels):
+        """Context manager observing the seconds its block takes."""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            return [[list(key), [list(counts), total]] for key, (counts, total) in self._values.items()]
+
+    def _merge(self, samples):
+        with self._lock:
+            for key, (counts, total) in samples:
+                entry = self._values.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0])
+                for i, count in enumerate(counts): entry[0][i] += count
+                entry[1] += total
+
+    def _reset(self):
+        with self._lock:
+            samples = [[list(key), [list(counts), total]] for key, (counts, total) in self._values.items()]
+            self._values = {}
+        return samples
+
+    def _render(self, samples):
+        for key, (counts, total) in samples:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), list(key) + [_number(bound)])} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+def _number(value):
+    if value == float('inf'): return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def _labels(names, values):
+    if not names: return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+# --- REGISTRY ---
+_registry = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+def _register(metric):
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None: return existing
+        _registry[metric.name] = metric
+        return metric
+
+def counter(name, documentation, labelnames=()):
+    """The registered counter `name`, created on first use."""
+    return _register(Counter(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=TIME_BUCKETS):
+    """The registered histogram `name`, created on first use."""
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+def register_collector(collect):
+    """
+    Adds a function called at every render that returns [(name, kind, help,
+    [(labels dict, value)])], for values a component already tracks itself
+    (pool sizes, queue depths). These stay local to this process.
+    """
+    _collectors.append(collect)
+
+def _dump(reset):
+    with _registry_lock: metrics = list(_registry.values())
+    return {m.name: {'kind': m.kind, 'help': m.documentation, 'labels': list(m.labelnames),
+                     'buckets': list(getattr(m, 'buckets', ())), 'samples': m._reset() if reset else m._samples()} for m in metrics}
+
+def snapshot():
+    """This process's counters and histograms as JSON-serialisable data, for merge_snapshot elsewhere."""
+    return _dump(reset=False)
+
+def drain_snapshot():
+    """snapshot() that also zeroes this process's metrics, so each observation is handed over once."""
+    return _dump(reset=True)
+
+def merge_snapshot(data):
+    """Adds another process's snapshot into this process's metrics."""
+    if not data or not METRICS_ENABLED: return
+    for name, entry in data.items():
+        if entry['kind'] == 'histogram':
+            histogram(name, entry['help'], entry['labels'], entry['buckets'])._merge(entry['samples'])
+        else:
+            counter(name, entry['help'], entry['labels'])._merge(entry['samples'])
+
+def render(data=None):
+    """Prometheus text for a snapshot (default: this process's metrics plus its collectors)."""
+    lines = []
+    if data is None:
+        data = snapshot()
+        for collect in _collectors:
+            try:
+                for name, kind, documentation, samples in collect():
+                    lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                    lines += [f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}" for labels, value in samples]
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+    for name, entry in sorted(data.items()):
+        metric = (Histogram(name, entry['help'], entry['labels'], entry['buckets']) if entry['kind'] == 'histogram'
+                  else Counter(name, entry['help'], entry['labels']))
+        lines += [f"# HELP {name} {entry['help']}", f"# TYPE {name} {entry['kind']}"]
+        lines += list(metric._render(entry['samples']))
+    return '\n'.join(lines) + '\n'
+
+# --- MULTI-PROCESS WORKERS ---
+
+def write_snapshot(directory):
+    """Writes this process's cumulative snapshot to directory/<pid>.json (atomically)."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    with open(path + '.tmp', 'w') as f: json.dump(snapshot(), f)
+    os.replace(path + '.tmp', path)
+
+def read_snapshots(directory):
+    """The sum of every snapshot in `directory` (files of exited processes included: counters never go back)."""
+    total = {}
+    for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if not filename.endswith('.json'): continue
+        try:
+            with open(os.path.join(directory, filename)) as f: data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, entry in data.items():
+            merged = total.setdefault(name, dict(entry, samples=[]))
+            merged['samples'] = _add_samples(merged['samples'], entry['samples'], entry['kind'])
+    return total
+
+def _add_samples(into, samples, kind):
+    values = {tuple(key): value for key, value in into}
+    for key, value in samples:
+        key = tuple(key)
+        if key not in values:
+            values[key] = value
+        elif kind == 'histogram':
+            values[key] = [[a + b for a, b in zip(values[key][0], value[0])], values[key][1] + value[1]]
+        else:
+            values[key] += value
+    return [[list(key), value] for key, value in values.items()]
+
+def serve_metrics(port, directory=None, host='0.0.0.0'):
+    """
+    Serves GET /metrics on `port` from a daemon thread: this process's
+    metrics, or with `directory` the sum of the snapshots written there.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = render(read_snapshots(directory) if directory else None).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics served on :{port}/metrics")
+    return server
+
+# --- PIPELINE METRICS ---
+# Shared by the app, the shortlist pool workers and the Celery batch tasks
+STAGE_SECONDS = histogram('cv_stage_seconds', 'Time spent in each resume pipeline stage.', ['stage'])
+DB_SECONDS = histogram('cv_db_seconds', 'Time spent on database work, by operation.', ['operation'])
+FILES = counter('cv_files_total', 'Resume files received, by source.', ['source'])
+FILE_BYTES = histogram('cv_file_bytes', 'Size of received resume files in bytes, by source.', ['source'], BYTE_BUCKETS)
+PDF_PAGES = histogram('cv_pdf_pages', 'Pages per PDF read.', buckets=PAGE_BUCKETS)
+PDF_TRUNCATED = counter('cv_pdf_truncated_total', 'PDFs cut short by a read budget, by budget.', ['budget'])
+CACHE_REQUESTS = counter('cv_cache_requests_total', 'Cache lookups, by cache and result (hit / miss).', ['cache', 'result'])
+
+def stage(name):
+    """`with stage('ner'):` times its block into cv_stage_seconds."""
+    return _Timer(STAGE_SECONDS, {'stage': name})
+
+def timed_stage(name):
+    """Decorator form of stage()."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+        return wrapper
+    return decorate
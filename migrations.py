@@ -0,0 +1,240 @@
+"""
+Versioned schema migrations for the cv database.
+
+Each migration runs once, in order, and is recorded in schema_migrations.
+Run them before starting the app (which only warns about a schema that is
+behind, unless DB_MIGRATE_ON_CONNECT=true has it migrate on connect):
+    python migrations.py [--host localhost] [--user root] [--database cv] [--target N]
+"""
+import os
+import time
+import argparse
+
+from skill_stats import create_skill_count_tables, rebuild_skill_counts
+
+# Rows per UPDATE while backfilling, so no single statement locks the whole table
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 10000))
+# Old Timestamp strings were written as '%Y-%m-%d_%H:%M:%S'
+LEGACY_TIMESTAMP_FORMAT = '%Y-%m-%d_%H:%i:%s'
+# Strings STR_TO_DATE is given at all: in strict mode an UPDATE that hands it anything
+# else fails with a truncated-value error instead of storing NULL
+LEGACY_TIMESTAMP_PATTERN = '^[0-9]{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])_([01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$'
+USER_LEVELS = ('Fresher', 'Intermediate', 'Experienced')
+
+def column_type(cursor, table, column):
+    cursor.execute(
+        "SELECT DATA_TYPE FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    row = cursor.fetchone()
+    return row[0].lower() if row else None
+
+def has_index(cursor, table, index):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+        (table, index)
+    )
+    return cursor.fetchone() is not None
+
+def backfill(connection, table, assignments, where=''):
+    """Runs `UPDATE table SET assignments` in ID ranges of MIGRATION_BATCH_SIZE, committing each range."""
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COALESCE(MIN(ID), 0), COALESCE(MAX(ID), -1) FROM {table}")
+    low, high = cursor.fetchone()
+    for start in range(low, high + 1, MIGRATION_BATCH_SIZE):
+        condition = "ID BETWEEN %s AND %s" + (f" AND ({where})" if where else '')
+        cursor.execute(f"UPDATE {table} SET {assignments} WHERE {condition}", (start, start + MIGRATION_BATCH_SIZE - 1))
+        connection.commit()
+
+# --- MIGRATIONS ---
+
+def create_base_tables(connection):
+    # The original schema, as app.py used to create it
+    cursor = connection.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_data (
+        ID INT NOT NULL AUTO_INCREMENT,
+        Name varchar(500) NOT NULL,
+        Email_ID VARCHAR(500) NOT NULL,
+        resume_score VARCHAR(8) NOT NULL,
+        Timestamp VARCHAR(50) NOT NULL,
+        Page_no VARCHAR(5) NOT NULL,
+        Predicted_Field BLOB NOT NULL,
+        User_level BLOB NOT NULL,
+        Recommended_skills BLOB NOT NULL,
+        Recommended_courses BLOB NOT NULL,
+        PRIMARY KEY (ID)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_skills (
+        ID INT NOT NULL AUTO_INCREMENT,
+        user_id INT NOT NULL,
+        skill_name VARCHAR(100) NOT NULL,
+        PRIMARY KEY (ID),
+        FOREIGN KEY (user_id) REFERENCES user_data(ID) ON DELETE CASCADE
+    );
+    """)
+
+def retype_column(connection, column, sql_type, attributes, conversion):
+    """
+    Changes user_data.`column` to `sql_type` (plus `attributes`, e.g. NOT NULL
+    and its position) through a <column>_typed copy filled with `conversion` in
+    batches. Each step checks what is already done, so a run that stopped
+    halfway picks up where it left off.
+    """
+    cursor = connection.cursor()
+    typed = f"{column}_typed"
+    drop = ''
+    if column_type(cursor, 'user_data', column) is not None:
+        if column_type(cursor, 'user_data', typed) is None:
+            cursor.execute(f"ALTER TABLE user_data ADD COLUMN {typed} {sql_type} NULL")
+        backfill(connection, 'user_data', f"{typed} = {conversion}".replace('%', '%%'))
+        drop = f"DROP COLUMN {column}, "
+    # Without the old column (a run that stopped between the drop and the rename) only the rename is left
+    cursor.execute(f"ALTER TABLE user_data {drop}CHANGE COLUMN {typed} {column} {sql_type} {attributes}")
+
+def type_user_data_columns(connection):
+    """
+    resume_score VARCHAR -> DECIMAL(5,2), Timestamp VARCHAR -> DATETIME,
+    Predicted_Field BLOB -> VARCHAR(100), User_level BLOB -> ENUM.
+    Score and timestamp go through new columns that are backfilled in batches
+    and then take the old names and positions (the admin dashboard reads rows
+    by position). Scores that are not numbers become 0, timestamps that do not
+    parse become NULL and unknown levels become 'Experienced'. Each column is
+    checked separately, so a partly applied run is finished rather than redone.
+    """
+    cursor = connection.cursor()
+    if column_type(cursor, 'user_data', 'resume_score') != 'decimal':
+        retype_column(connection, 'resume_score', 'DECIMAL(5,2)', 'NOT NULL AFTER Email_ID',
+                      "CASE WHEN resume_score REGEXP '^[0-9]+([.][0-9]+)?$' THEN LEAST(CAST(resume_score AS DECIMAL(10,2)), 999.99) ELSE 0 END")
+    if column_type(cursor, 'user_data', 'Timestamp') != 'datetime':
+        retype_column(connection, 'Timestamp', 'DATETIME', 'NULL AFTER resume_score',
+                      f"CASE WHEN Timestamp REGEXP '{LEGACY_TIMESTAMP_PATTERN}' THEN STR_TO_DATE(Timestamp, '{LEGACY_TIMESTAMP_FORMAT}') ELSE NULL END")
+    if column_type(cursor, 'user_data', 'User_level') != 'enum':
+        levels = ', '.join(f"'{level}'" for level in USER_LEVELS)
+        backfill(connection, 'user_data', "User_level = 'Experienced'", where=f"CAST(User_level AS CHAR) NOT IN ({levels})")
+        cursor.execute(f"""
+        ALTER TABLE user_data
+            MODIFY COLUMN Predicted_Field VARCHAR(100) NOT NULL,
+            MODIFY COLUMN User_level ENUM({levels}) NOT NULL
+        """)
+
+def add_analytics_indexes(connection):
+    # score: high_potential's range filter and ORDER BY; skill_name: skills_gap's GROUP BY;
+    # field and timestamp: filtering the dashboard by field and by upload time
+    cursor = connection.cursor()
+    for table, index, columns in [
+        ('user_data', 'idx_user_data_score', 'resume_score'),
+        ('user_data', 'idx_user_data_field', 'Predicted_Field'),
+        ('user_data', 'idx_user_data_timestamp', 'Timestamp'),
+        ('user_skills', 'idx_user_skills_skill', 'skill_name'),
+    ]:
+        if not has_index(cursor, table, index):
+            cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+def create_skill_counts(connection):
+    # Summary tables for skills_gap, filled from the existing user_skills rows
+    create_skill_count_tables(connection)
+    rebuild_skill_counts(connection)
+
+def add_dashboard_indexes(connection):
+    # /api/data keyset pages: score order within a field, and level filters in ID order
+    cursor = connection.cursor()
+    for index, columns in [('idx_user_data_field_score', 'Predicted_Field, resume_score'), ('idx_user_data_level', 'User_level')]:
+        if not has_index(cursor, 'user_data', index):
+            cursor.execute(f"CREATE INDEX {index} ON user_data ({columns})")
+
+def create_candidate_embeddings(connection):
+    # float32 vectors (experience section and whole resume) for the FAISS candidate index
+    cursor = connection.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS candidate_embeddings (
+        user_id INT NOT NULL,
+        model VARCHAR(100) NOT NULL,
+        experience BLOB NULL,
+        resume BLOB NOT NULL,
+        PRIMARY KEY (user_id),
+        FOREIGN KEY (user_id) REFERENCES user_data(ID) ON DELETE CASCADE
+    );
+    """)
+
+def add_content_hash(connection):
+    # sha256 of the resume file for batch-loaded candidates, so a redelivered or rerun
+    # chunk does not store them twice (uploads leave it NULL, which UNIQUE allows repeatedly)
+    cursor = connection.cursor()
+    if column_type(cursor, 'user_data', 'content_hash') is None:
+        cursor.execute("ALTER TABLE user_data ADD COLUMN content_hash CHAR(64) NULL")
+    if not has_index(cursor, 'user_data', 'uq_user_data_content_hash'):
+        cursor.execute("CREATE UNIQUE INDEX uq_user_data_content_hash ON user_data (content_hash)")
+
+MIGRATIONS = [
+    (1, 'base user_data and user_skills tables', create_base_tables),
+    (2, 'typed score, timestamp, field and level columns', type_user_data_columns),
+    (3, 'indexes for the analytics queries', add_analytics_indexes),
+    (4, 'skill count summary tables', create_skill_counts),
+    (5, 'indexes for the paginated candidate list', add_dashboard_indexes),
+    (6, 'candidate embeddings for semantic search', create_candidate_embeddings),
+    (7, 'content hash key for batch-loaded candidates', add_content_hash),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations(connection, target=None):
+    """
+    Applies every migration newer than the recorded schema version (up to
+    `target`) to the connection's current database. A MySQL named lock keeps
+    several app processes from migrating at once. Returns the applied versions.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL,
+        description VARCHAR(200) NOT NULL,
+        applied_at DATETIME NOT NULL,
+        PRIMARY KEY (version)
+    );
+    """)
+    cursor.execute("SELECT GET_LOCK('cv_schema_migrations', 300)")
+    applied = []
+    try:
+        cursor.execute("SELECT version FROM schema_migrations")
+        done = {row[0] for row in cursor.fetchall()}
+        for version, description, migrate in MIGRATIONS:
+            if version in done or (target is not None and version > target): continue
+            print(f"Applying migration {version}: {description}...")
+            start = time.perf_counter()
+            migrate(connection)
+            cursor.execute("INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, NOW())", (version, description))
+            connection.commit()
+            print(f"Migration {version} applied in {time.perf_counter() - start:.1f}s")
+            applied.append(version)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('cv_schema_migrations')")
+    return applied
+
+def schema_version(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+def main():
+    import pymysql
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.environ.get('DB_HOST', 'localhost'))
+    parser.add_argument('--user', default=os.environ.get('DB_USER', 'root'))
+    parser.add_argument('--password', default=os.environ.get('DB_PASSWORD', ''))
+    parser.add_argument('--database', default=os.environ.get('DB_NAME', 'cv'))
+    parser.add_argument('--target', type=int, default=None, help='stop at this schema version')
+    args = parser.parse_args()
+
+    connection = pymysql.connect(host=args.host, user=args.user, password=args.password)
+    try:
+        connection.cursor().execute(f"CREATE DATABASE IF NOT EXISTS {args.database}")
+        connection.select_db(args.database)
+        applied = run_migrations(connection, args.target)
+        print(f"Schema version {schema_version(connection)} ({len(applied)} migrations applied)")
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Per-request profiles saved as downloadable artifacts (see app.profiled_route).
+
+DetailedProfile runs cProfile on the calling thread with tracemalloc on, for a
+request an admin asked to profile: <id>.prof (pstats, for snakeviz or
+`python -m pstats`), <id>.txt (top functions, peak memory, top allocation
+sites) and <id>.json (what was profiled). SampledProfile is the cheap one,
+for catching slow requests nobody asked about: a shared background thread
+reads the stacks of the tracked request threads every
+PROFILE_SAMPLE_INTERVAL seconds, and a slow request keeps <id>.folded
+(collapsed stacks for flamegraph.pl / speedscope), <id>.txt and <id>.json.
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join('outputs', 'profiles'))
+# Profiles kept on disk; the oldest are deleted beyond this
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))
+# Stack depth tracemalloc records per allocation (more is slower)
+PROFILE_TRACE_FRAMES = int(os.environ.get('PROFILE_TRACE_FRAMES', 5))
+# Rows in the .txt reports
+PROFILE_TOP = 40
+
+ARTIFACT_KINDS = {'prof': 'application/octet-stream', 'txt': 'text/plain', 'folded': 'text/plain', 'json': 'application/json'}
+PROFILE_ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+def new_profile_id(label):
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}-{uuid.uuid4().hex[:6]}"
+
+# --- CPROFILE + TRACEMALLOC ---
+# tracemalloc is process-wide, so detailed profiles run one at a time
+_detail_lock = threading.Lock()
+
+class DetailedProfile:
+    """cProfile of the calling thread plus tracemalloc's peak for the block."""
+
+    def __enter__(self):
+        _detail_lock.acquire()
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing: tracemalloc.start(PROFILE_TRACE_FRAMES)
+        tracemalloc.reset_peak()
+        self._base_bytes = tracemalloc.get_traced_memory()[0]
+        self.profiler = cProfile.Profile()
+        self._start = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+        self.seconds = time.perf_counter() - self._start
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak_bytes, self.retained_bytes = peak - self._base_bytes, current - self._base_bytes
+            # What the request left allocated (the peak's own objects are mostly freed by now)
+            self.allocations = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)]).statistics('lineno')[:PROFILE_TOP]
+            if self._started_tracing: tracemalloc.stop()
+        finally:
+            _detail_lock.release()
+
+    def save(self, profile_id, meta, directory=None):
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, profile_id)
+        self.profiler.dump_stats(base + '.prof')
+        report = io.StringIO()
+        report.write(f"{meta.get('route', '')}: {self.seconds:.3f}s, tracemalloc peak +{self.peak_bytes / 1e6:.1f} MB, retained +{self.retained_bytes / 1e6:.1f} MB\n\n")
+        pstats.Stats(self.profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        report.write("\nTop allocation sites still held at the end of the request:\n")
+        for stat in self.allocations: report.write(f"  {stat}\n")
+        with open(base + '.txt', 'w') as f: f.write(report.getvalue())
+        _write_meta(base, dict(meta, id=profile_id, kind='cprofile', seconds=self.seconds, peak_bytes=self.peak_bytes,
+                               retained_bytes=self.retained_bytes, artifacts=['prof', 'txt', 'json']))
+        prune_profiles(directory)
+        return profile_id
+
+# --- SAMPLING ---
+
+class StackSampler:
+    """
+    One daemon thread sampling the stacks of the threads registered with
+    track(); it sleeps while none are.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def track(self, ident):
+        samples = Counter()
+        with self._lock:
+            self._tracked[ident] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return samples
+
+    def untrack(self, ident):
+        with self._lock: self._tracked.pop(ident, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Sampled under the lock, so nothing is added to a profile after untrack()
+                idle = not self._tracked
+                if not idle:
+                    frames = sys._current_frames()
+                    for ident, samples in self._tracked.items():
+                        frame = frames.get(ident)
+                        stack = []
+                        while frame is not None:
+                            code = frame.f_code
+                            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                            frame = frame.f_back
+                        if stack: samples[';'.join(reversed(stack))] += 1
+                    del frames, frame
+            if idle:
+                self._wake.wait()
+                self._wake.clear()
+            else:
+                time.sleep(self.interval)
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+def get_sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None: _sampler = StackSampler(PROFILE_SAMPLE_INTERVAL)
+    return _sampler
+
+class SampledProfile:
+    """Samples the calling thread's stack for the block (collapsed stack -> sample count)."""
+
+    def __enter__(self):
+        self._ident = threading.get_ident()
+        self.samples = get_sampler().track(self._ident)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        get_sampler().untrack(self._ident)
+
+    def save(self, profile_id, meta, directory=None):
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, profile_id)
+        with open(base + '.folded', 'w') as f:
+            for stack, count in self.samples.most_common(): f.write(f"{stack} {count}\n")
+        total = sum(self.samples.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames): inclusive[frame] += count
+        with open(base + '.txt', 'w') as f:
+            f.write(f"{meta.get('route', '')}: {self.seconds:.3f}s, {total} samples every {get_sampler().interval * 1000:g} ms\n")
+            for title, counts in (('Own time', own), ('Including callees', inclusive)):
+                f.write(f"\n{title}:\n")
+                for frame, count in counts.most_common(PROFILE_TOP): f.write(f"  {count * 100 / total:5.1f}%  {frame}\n")
+        _write_meta(base, dict(meta, id=profile_id, kind='sampled', seconds=self.seconds, samples=total, artifacts=['folded', 'txt', 'json']))
+        prune_profiles(directory)
+        return profile_id
+
+# --- ARTIFACTS ---
+
+def _write_meta(base, meta):
+    meta['created'] = time.time()
+    with open(base + '.json', 'w') as f: json.dump(meta, f, indent=2)
+
+def list_profiles(directory=None):
+    """Saved profiles' metadata, newest first."""
+    directory = directory or PROFILE_DIR
+    profiles = []
+    for filename in os.listdir(directory) if os.path.isdir(directory) else []:
+        if not filename.endswith('.json'): continue
+        try:
+            with open(os.path.join(directory, filename)) as f: profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda meta: meta.get('created', 0), reverse=True)
+
+def profile_path(profile_id, kind, directory=None):
+    """Path of one artifact of a saved profile, or None for an unknown (or unsafe) id or kind."""
+    if kind not in ARTIFACT_KINDS or not PROFILE_ID_PATTERN.match(profile_id): return None
+    path = os.path.join(directory or PROFILE_DIR, f"{profile_id}.{kind}")
+    return path if os.path.isfile(path) else None
+
+def prune_profiles(directory=None, keep=None):
+    """Deletes all but the newest `keep` profiles."""
+    keep = PROFILE_KEEP if keep is None else keep
+    directory = directory or PROFILE_DIR
+    for meta in list_profiles(directory)[keep:]:
+        for kind in meta.get('artifacts', ARTIFACT_KINDS):
+            try:
+                os.remove(os.path.join(directory, f"{meta['id']}.{kind}"))
+            except OSError:
+                pass
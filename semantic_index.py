@@ -0,0 +1,204 @@
+"""
+FAISS index over the stored candidate embeddings (candidate_embeddings, see
+migrations.py), for ranking every candidate in the database against a JD.
+
+There is one index per embedding kind ('resume' for the whole resume,
+'experience' for the Experience section), all inner product over unit
+vectors, i.e. cosine similarity. The index type is chosen at build time:
+  flat  exact search; fine up to ~100k candidates
+  ivf   inverted lists (trained on the stored vectors), searching ivf_nprobe lists
+  hnsw  graph index; FAISS cannot delete from it, so deletes are tombstoned,
+        filtered from results and dropped by the next rebuild
+  auto  flat below flat_max candidates, hnsw above
+
+The index is built from the database on first use and kept current by
+add_records() (called after this process commits candidates), remove()
+(after a delete) and sync(), which picks up rows other processes (the batch
+workers, other app processes) committed since the last look.
+"""
+import time
+import threading
+import numpy as np
+
+EMBEDDING_KINDS = ('resume', 'experience')
+# Rows per SELECT while building or syncing
+SYNC_FETCH_ROWS = 2000
+
+class CandidateIndex:
+    def __init__(self, model, index_type='auto', flat_max=100000, ivf_lists=None, ivf_nprobe=16,
+                 hnsw_m=32, hnsw_ef_search=64, sync_interval=5.0, sync_lookback=1000, rebuild_ratio=0.2):
+        self.model = model
+        self.index_type = index_type
+        self.flat_max = flat_max
+        self.ivf_lists = ivf_lists
+        self.ivf_nprobe = ivf_nprobe
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_search = hnsw_ef_search
+        self.sync_interval = sync_interval
+        # IDs are allocated before commit, so a transaction can commit below the
+        # highest ID already seen; sync() re-checks this many IDs back for them
+        self.sync_lookback = sync_lookback
+        self.rebuild_ratio = rebuild_ratio
+        self.built_type = None
+        self.dim = None
+        self._lock = threading.RLock()       # index contents
+        self._sync_lock = threading.Lock()   # one build/sync at a time
+        self._indexes = {}
+        self._ids = {kind: set() for kind in EMBEDDING_KINDS}
+        self._tombstones = {kind: set() for kind in EMBEDDING_KINDS}
+        self._max_id = 0
+        self._built_size = 0
+        self._synced_at = 0.0
+        self._metrics = {'builds': 0, 'build_seconds': 0.0, 'syncs': 0, 'synced': 0, 'added': 0, 'removed': 0,
+                         'searches': 0, 'search_seconds_total': 0.0}
+
+    # --- BUILD ---
+
+    def _fetch(self, cursor, query, args):
+        # [(user_id, experience bytes or None, resume bytes)] for this model
+        cursor.execute(f"SELECT user_id, experience, resume FROM candidate_embeddings WHERE model = %s AND {query}", [self.model] + list(args))
+        return cursor.fetchall()
+
+    def _new_index(self, index_type, vectors):
+        import faiss  # imported on first build, so importing the app does not load it
+        dim = vectors.shape[1]
+        if index_type == 'ivf':
+            lists = self.ivf_lists or max(1, int(np.sqrt(len(vectors))))
+            # FAISS wants at least ~39 training points per list; 64 per list is plenty
+            lists = max(1, min(lists, len(vectors) // 39))
+            if len(vectors) >= 39:
+                index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, lists, faiss.METRIC_INNER_PRODUCT)
+                sample = np.random.default_rng(0).choice(len(vectors), min(len(vectors), 64 * lists), replace=False)
+                index.train(vectors[np.sort(sample)])
+                index.nprobe = min(self.ivf_nprobe, lists)
+                return index
+            index_type = 'flat'  # too little to train on yet; sync() rebuilds as IVF once there is more
+        if index_type == 'hnsw':
+            hnsw = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efSearch = self.hnsw_ef_search
+            return faiss.IndexIDMap2(hnsw)
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+    def build(self, connection):
+        """(Re)builds every index from the database."""
+        start = time.perf_counter()
+        cursor = connection.cursor()
+        rows, last_id = [], 0
+        while True:
+            batch = self._fetch(cursor, "user_id > %s ORDER BY user_id LIMIT %s", (last_id, SYNC_FETCH_ROWS))
+            if not batch: break
+            rows.extend(batch)
+            last_id = batch[-1][0]
+        index_type = self.index_type
+        if index_type == 'auto': index_type = 'flat' if len(rows) < self.flat_max else 'hnsw'
+        # Built on the side, so searches keep using the old index meanwhile
+        indexes, ids = {}, {kind: set() for kind in EMBEDDING_KINDS}
+        self._add_rows(rows, indexes, ids, index_type)
+        with self._lock:
+            self._indexes, self._ids = indexes, ids
+            self._tombstones = {kind: set() for kind in EMBEDDING_KINDS}
+            self.built_type = index_type
+            self._built_size = len(rows)
+            self._max_id = max(self._max_id, last_id)
+            self._synced_at = time.monotonic()
+            self._metrics['builds'] += 1
+            self._metrics['build_seconds'] = time.perf_counter() - start
+
+    def _add_rows(self, rows, indexes, ids, index_type):
+        for position, kind in ((2, 'resume'), (1, 'experience')):
+            kept = [(row[0], row[position]) for row in rows if row[position] and row[0] not in ids[kind]]
+            if not kept: continue
+            vectors = np.vstack([np.frombuffer(blob, dtype='float32') for _, blob in kept])
+            if kind not in indexes:
+                self.dim = vectors.shape[1]
+                indexes[kind] = self._new_index(index_type, vectors)
+            indexes[kind].add_with_ids(vectors, np.array([user_id for user_id, _ in kept], dtype='int64'))
+            ids[kind].update(user_id for user_id, _ in kept)
+
+    # --- INCREMENTAL UPDATES ---
+
+    def add_records(self, ids, records):
+        """Adds write_behind candidate records that were just committed with these IDs."""
+        rows = [(user_id, r['embeddings']['experience'], r['embeddings']['resume'])
+                for user_id, r in zip(ids, records) if r.get('embeddings') and r['embeddings']['model'] == self.model]
+        if not rows: return
+        with self._lock:
+            if self.built_type is None: return  # the first build reads them from the database
+            self._add_rows(rows, self._indexes, self._ids, self.built_type)
+            self._max_id = max([self._max_id] + [row[0] for row in rows])
+            self._metrics['added'] += len(rows)
+
+    def remove(self, ids):
+        with self._lock:
+            for kind, index in self._indexes.items():
+                gone = [user_id for user_id in ids if user_id in self._ids[kind]]
+                if not gone: continue
+                self._ids[kind].difference_update(gone)
+                if self.built_type == 'hnsw':
+                    self._tombstones[kind].update(gone)
+                else:
+                    index.remove_ids(np.array(gone, dtype='int64'))
+            self._metrics['removed'] += len(ids)
+
+    def _needs_rebuild(self):
+        with self._lock:
+            # auto outgrew flat, IVF lists were trained on less than half the vectors,
+            # or HNSW carries too many deleted vectors
+            size = len(self._ids['resume'])
+            if self.index_type == 'auto' and self.built_type == 'flat' and size >= self.flat_max: return True
+            if self.built_type == 'ivf' and size >= max(39, 2 * self._built_size): return True
+            return self.built_type == 'hnsw' and any(len(self._tombstones[kind]) > self.rebuild_ratio * max(1, index.ntotal)
+                                                     for kind, index in self._indexes.items())
+
+    def sync(self, connection, force=False):
+        """Builds the index on first use, then adds rows other processes committed (at most every sync_interval seconds)."""
+        with self._sync_lock:
+            if self.built_type is None or self._needs_rebuild():
+                self.build(connection)
+            elif force or time.monotonic() - self._synced_at >= self.sync_interval:
+                self._sync_new_rows(connection)
+
+    def _sync_new_rows(self, connection):
+        cursor = connection.cursor()
+        cursor.execute("SELECT user_id FROM candidate_embeddings WHERE model = %s AND user_id > %s",
+                       (self.model, self._max_id - self.sync_lookback))
+        with self._lock:
+            missing = [row[0] for row in cursor.fetchall() if row[0] not in self._ids['resume']]
+        for start in range(0, len(missing), SYNC_FETCH_ROWS):
+            chunk = missing[start:start + SYNC_FETCH_ROWS]
+            rows = self._fetch(cursor, f"user_id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            with self._lock:
+                self._add_rows(rows, self._indexes, self._ids, self.built_type)
+                self._max_id = max([self._max_id] + [row[0] for row in rows])
+                self._metrics['synced'] += len(rows)
+        with self._lock:
+            self._synced_at = time.monotonic()
+            self._metrics['syncs'] += 1
+
+    # --- SEARCH ---
+
+    def search(self, vector, k=10, kind='resume'):
+        """Top-k [(user_id, cosine similarity)] for a unit-length query vector."""
+        start = time.perf_counter()
+        with self._lock:
+            index = self._indexes.get(kind)
+            if index is None or index.ntotal == 0: return []
+            tombstones = self._tombstones[kind]
+            fetch = min(index.ntotal, k + len(tombstones))
+            scores, ids = index.search(np.asarray(vector, dtype='float32').reshape(1, -1), fetch)
+            self._metrics['searches'] += 1
+            self._metrics['search_seconds_total'] += time.perf_counter() - start
+        hits = [(int(user_id), float(score)) for user_id, score in zip(ids[0], scores[0]) if user_id != -1 and user_id not in tombstones]
+        return hits[:k]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats.update({
+                'model': self.model, 'index_type': self.built_type or self.index_type, 'dim': self.dim,
+                'vectors': {kind: index.ntotal - len(self._tombstones[kind]) for kind, index in self._indexes.items()},
+                'tombstones': {kind: len(t) for kind, t in self._tombstones.items() if t},
+                'vector_bytes': sum(index.ntotal for index in self._indexes.values()) * (self.dim or 0) * 4,
+            })
+        stats['search_ms_avg'] = stats['search_seconds_total'] * 1000 / stats['searches'] if stats['searches'] else 0.0
+        return stats
@@ -0,0 +1,183 @@
+import io
+import os
+import math
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from utils import parse_resumes, calculate_rigorous_scores, warm_job_description_cache, warm_models
+
+# --- SHORTLIST PARALLELISM CONFIGURATION ---
+# SHORTLIST_WORKERS <= 1 keeps /api/shortlist sequential inside the request thread.
+SHORTLIST_WORKERS = int(os.environ.get('SHORTLIST_WORKERS', 0))
+# Resumes per task; each task batch-encodes its experience sections together.
+SHORTLIST_CHUNK_SIZE = int(os.environ.get('SHORTLIST_CHUNK_SIZE', 4))
+# 'spawn' gives each worker its own clean copy of torch/spaCy; 'fork' starts faster on Linux.
+SHORTLIST_START_METHOD = os.environ.get('SHORTLIST_START_METHOD', 'spawn')
+
+_executor = None
+# Concurrent first requests (threaded Flask) must not each start a pool of model-loading workers
+_executor_lock = threading.Lock()
+
+def score_resume_files(named_files, target_jd):
+    """
+    Parses and scores (filename, file) pairs against one JD and returns the
+    unsorted /api/shortlist result rows, with the per-file error rows the
+    route has always produced. `file` is anything parse_resume accepts.
+    """
+    results = []
+    # Parse every file first (name NER batched over the files that need it), then
+    # score them together so the semantic model encodes all experience sections
+    # in batched passes.
+    parsed = []
+    named_files = [(filename, file) for filename, file in named_files if filename != '']
+    resumes = parse_resumes([file for _, file in named_files])
+    for (filename, _), resume in zip(named_files, resumes):
+        try:
+            if isinstance(resume, Exception): raise resume
+            resume_text_raw = resume['raw_text']
+            if len(resume_text_raw.strip()) < 50:
+                results.append({'name': filename, 'email': 'N/A', 'score': 0, 'status': 'Error: No Text'})
+                continue
+            data = resume['data']
+            sections = resume['sections']
+            parsed.append((filename, resume_text_raw, data, sections, resume.get('truncated')))
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            results.append({'name': filename, 'email': 'Error', 'score': 0, 'status': 'Processing Failed'})
+
+    try:
+        scores = calculate_rigorous_scores([{
+            'resume_text': resume_text_raw,
+            'resume_edu_section': sections.get('Education', ''),
+            'resume_exp_section': sections.get('Experience', ''),
+            'user_skills': data.get('skills', [])
+        } for _, resume_text_raw, data, sections, _ in parsed], target_jd)
+    except Exception as e:
+        print(f"Error scoring resumes: {e}")
+        scores = [None] * len(parsed)
+
+    for (filename, _, data, _, truncated), score_data in zip(parsed, scores):
+        if score_data is None or isinstance(score_data, Exception):
+            if score_data is not None: print(f"Error scoring {filename}: {score_data}")
+            results.append({'name': filename, 'email': 'Error', 'score': 0, 'status': 'Processing Failed'})
+            continue
+        results.append({
+            'filename': filename,
+            'name': data.get('name', 'Unknown'),
+            'email': data.get('email', 'N/A'),
+            'score': score_data['total_score'],
+            'breakdown': score_data['breakdown'],
+            'skills': data.get('skills', []),
+            'truncated': truncated
+        })
+    return results
+
+def _init_worker():
+    # Runs once per worker process: the pool is always warmed up front, so load
+    # the models and compile the preset JDs before the first task arrives.
+    warm_models()
+    warm_job_description_cache(path=None)
+    # A forked worker starts with a copy of the app's metrics, which the app already reports
+    metrics.drain_snapshot()
+
+def _ping():
+    return os.getpid()
+
+def _score_chunk(chunk, target_jd):
+    return score_resume_files([(filename, io.BytesIO(pdf_bytes)) for filename, pdf_bytes in chunk], target_jd)
+
+def _score_chunk_in_worker(chunk, target_jd):
+    # The worker's stage timings travel back with the rows, for the app's /metrics
+    return _score_chunk(chunk, target_jd), metrics.drain_snapshot()
+
+def get_shortlist_pool(workers=None):
+    """Returns the shared warm process pool, starting it on first use."""
+    global _executor
+    executor = _executor
+    if executor is not None: return executor
+    with _executor_lock:
+        if _executor is None:
+            workers = workers or SHORTLIST_WORKERS
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(SHORTLIST_START_METHOD),
+                initializer=_init_worker
+            )
+            try:
+                # Submitting one no-op per worker makes every worker start (and load models) now
+                for future in [executor.submit(_ping) for _ in range(workers)]:
+                    future.result()
+            except Exception:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            _executor = executor
+            print(f"Shortlist pool ready with {workers} workers ({SHORTLIST_START_METHOD})")
+        return _executor
+
+def shutdown_shortlist_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def score_resume_files_parallel(named_bytes, target_jd, chunk_size=None):
+    """
+    Process-pool version of score_resume_files for (filename, pdf_bytes) pairs.
+    Chunks run on the warm workers; a chunk whose worker fails is re-run here so
+    one broken process does not fail the whole shortlist.
+    """
+    chunk_size = chunk_size or SHORTLIST_CHUNK_SIZE
+    named_bytes = [(filename, pdf_bytes) for filename, pdf_bytes in named_bytes if filename != '']
+    if not named_bytes: return []
+    # Small uploads are still spread over every worker
+    chunk_size = max(1, min(chunk_size, math.ceil(len(named_bytes) / max(SHORTLIST_WORKERS, 1))))
+    chunks = [named_bytes[i:i + chunk_size] for i in range(0, len(named_bytes), chunk_size)]
+
+    try:
+        pool = get_shortlist_pool()
+        futures = [pool.submit(_score_chunk_in_worker, chunk, target_jd) for chunk in chunks]
+    except Exception as e:
+        print(f"Shortlist pool unavailable, scoring sequentially: {e}")
+        futures = [None] * len(chunks)
+
+    results = []
+    for chunk, future in zip(chunks, futures):
+        results.extend(_chunk_result(future, chunk, target_jd))
+    return results
+
+def iter_score_resume_files(named_bytes, target_jd):
+    """
+    Streaming form of score_resume_files for (filename, pdf_bytes) pairs: yields
+    each resume's row as soon as it is scored (in completion order, not rank
+    order). Uses the worker pool when SHORTLIST_WORKERS > 1.
+    """
+    named_bytes = [(filename, pdf_bytes) for filename, pdf_bytes in named_bytes if filename != '']
+    futures = {}
+    if SHORTLIST_WORKERS > 1 and len(named_bytes) > 1:
+        try:
+            pool = get_shortlist_pool()
+            futures = {pool.submit(_score_chunk_in_worker, [item], target_jd): [item] for item in named_bytes}
+        except Exception as e:
+            print(f"Shortlist pool unavailable, scoring sequentially: {e}")
+    if futures:
+        for future in as_completed(futures):
+            yield from _chunk_result(future, futures[future], target_jd)
+        return
+    for item in named_bytes:
+        yield from _score_chunk([item], target_jd)
+
+def _chunk_result(future, chunk, target_jd):
+    if future is None:
+        return _score_chunk(chunk, target_jd)
+    try:
+        rows, worker_metrics = future.result()
+        metrics.merge_snapshot(worker_metrics)
+        return rows
+    except Exception as e:
+        print(f"Shortlist worker failed, retrying chunk locally: {e}")
+        if isinstance(e, BrokenProcessPool): shutdown_shortlist_pool()
+        return _score_chunk(chunk, target_jd)
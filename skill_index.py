@@ -0,0 +1,304 @@
+"""
+In-memory inverted skill index: every skill maps to a compressed (roaring)
+bitmap of the IDs of the candidates that have it, so boolean skill searches
+such as
+    python AND (django OR flask) AND NOT php
+are answered with a few bitmap operations instead of user_skills joins.
+
+Queries use AND / OR / NOT (or & | !), parentheses, and skill names as
+stored in user_skills; multi-word skills can be written bare (machine
+learning) or quoted. The index is built from the database on first use and
+kept current by add() and remove() (called after this process commits an
+upload or delete) and by sync(), which picks up candidates other processes
+added or deleted since the last look: recent IDs on every sync, and all of
+them every full_sync_interval seconds.
+"""
+import re
+import time
+import threading
+from pyroaring import BitMap
+
+# Rows per fetch while building
+SKILL_INDEX_FETCH_ROWS = 10000
+
+class SkillQueryError(ValueError):
+    """A malformed boolean skill expression."""
+
+# --- QUERY PARSER ---
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|\'([^\']*)\'|(&&?|\|\|?|!)|([^\s()"\'&|!]+))')
+OPERATOR_WORDS = {'and': '&', 'or': '|', 'not': '!', '&&': '&', '||': '|'}
+
+def _tokenize(text):
+    tokens, position = [], 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise SkillQueryError(f"Unexpected character at {position}: {text[position]!r}")
+        position = match.end()
+        opening, closing, double, single, symbol, word = match.groups()
+        if opening or closing:
+            tokens.append(opening or closing)
+        elif symbol:
+            tokens.append(OPERATOR_WORDS.get(symbol, symbol))
+        elif word and word.lower() in OPERATOR_WORDS:
+            tokens.append(OPERATOR_WORDS[word.lower()])
+        else:
+            name = (double if double is not None else single if single is not None else word).strip().lower()
+            # Adjacent bare words form one multi-word skill
+            if word and tokens and isinstance(tokens[-1], tuple) and tokens[-1][1]:
+                tokens[-1] = ('skill', True, tokens[-1][2] + ' ' + name)
+            else:
+                tokens.append(('skill', bool(word), name))
+    return tokens
+
+def parse_skill_query(text):
+    """
+    Parses a boolean skill expression into ('skill', name), ('not', node),
+    ('and', [nodes]) and ('or', [nodes]) tuples. NOT binds tightest, then
+    AND, then OR. Raises SkillQueryError on malformed input.
+    """
+    tokens = _tokenize(text)
+    if not tokens: raise SkillQueryError("Empty query")
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        nodes = [parse_and()]
+        while peek() == '|':
+            take()
+            nodes.append(parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def parse_and():
+        nodes = [parse_not()]
+        while peek() == '&':
+            take()
+            nodes.append(parse_not())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def parse_not():
+        token = peek()
+        if token == '!':
+            take()
+            return ('not', parse_not())
+        if token == '(':
+            take()
+            node = parse_or()
+            if peek() != ')': raise SkillQueryError("Missing ')'")
+            take()
+            return node
+        if isinstance(token, tuple):
+            take()
+            if not token[2]: raise SkillQueryError("Empty skill name")
+            return ('skill', token[2])
+        raise SkillQueryError(f"Expected a skill, '(' or NOT, got {token or 'end of query'!r}")
+
+    node = parse_or()
+    if peek() is not None: raise SkillQueryError(f"Unexpected {peek()!r}")
+    return node
+
+def query_skills(node):
+    """The skill names an expression mentions."""
+    if node[0] == 'skill': return {node[1]}
+    if node[0] == 'not': return query_skills(node[1])
+    return set().union(*(query_skills(child) for child in node[1]))
+
+# --- INDEX ---
+
+class SkillIndex:
+    def __init__(self, sync_interval=5.0, sync_lookback=1000, full_sync_interval=300.0):
+        self.sync_interval = sync_interval
+        # Deletions of older candidates are only seen by a sync that reads every ID
+        self.full_sync_interval = full_sync_interval
+        # IDs are allocated before commit, so a transaction can commit below the
+        # highest ID already seen; sync() re-checks this many IDs back for them
+        self.sync_lookback = sync_lookback
+        self.built = False
+        self._lock = threading.RLock()       # bitmap contents
+        self._sync_lock = threading.Lock()   # one build/sync at a time
+        self._skills = {}
+        self._all = BitMap()
+        self._max_id = 0
+        self._synced_at = 0.0
+        self._full_synced_at = 0.0
+        self._metrics = {'builds': 0, 'build_seconds': 0.0, 'syncs': 0, 'full_syncs': 0, 'synced': 0, 'unsynced': 0, 'added': 0, 'removed': 0,
+                         'queries': 0, 'query_seconds_total': 0.0}
+
+    def build(self, connection):
+        """(Re)builds the index from user_data and user_skills, reading them in ID ranges."""
+        start = time.perf_counter()
+        cursor = connection.cursor()
+        candidates = self._read_ids(cursor)
+        last_id = candidates.max() if candidates else 0
+        skills = {}
+        last_row = 0
+        while True:
+            cursor.execute("SELECT ID, user_id, skill_name FROM user_skills WHERE ID > %s ORDER BY ID LIMIT %s", (last_row, SKILL_INDEX_FETCH_ROWS))
+            rows = cursor.fetchall()
+            if not rows: break
+            grouped = {}
+            for _, user_id, skill in rows:
+                grouped.setdefault(skill.lower(), []).append(user_id)
+            for skill, ids in grouped.items():
+                skills.setdefault(skill, BitMap()).update(ids)
+            last_row = rows[-1][0]
+        for bitmap in skills.values(): bitmap.run_optimize()
+        candidates.run_optimize()
+        with self._lock:
+            self._skills, self._all = skills, candidates
+            self._max_id = max(self._max_id, last_id)
+            self._synced_at = self._full_synced_at = time.monotonic()
+            self.built = True
+            self._metrics['builds'] += 1
+            self._metrics['build_seconds'] = time.perf_counter() - start
+
+    def add(self, user_id, skills):
+        """Adds a candidate this process just committed."""
+        with self._lock:
+            if not self.built: return  # the first build reads it from the database
+            self._all.add(user_id)
+            for skill in skills:
+                self._skills.setdefault(skill.lower(), BitMap()).add(user_id)
+            self._max_id = max(self._max_id, user_id)
+            self._metrics['added'] += 1
+
+    def remove(self, ids):
+        with self._lock:
+            gone = BitMap(ids) & self._all
+            if not gone: return
+            self._all -= gone
+            for bitmap in self._skills.values(): bitmap -= gone
+            self._metrics['removed'] += len(gone)
+
+    @staticmethod
+    def _read_ids(cursor):
+        ids = BitMap()
+        last_id = 0
+        while True:
+            cursor.execute("SELECT ID FROM user_data WHERE ID > %s ORDER BY ID LIMIT %s", (last_id, SKILL_INDEX_FETCH_ROWS))
+            rows = [row[0] for row in cursor.fetchall()]
+            if not rows: break
+            ids.update(rows)
+            last_id = rows[-1]
+        return ids
+
+    def sync(self, connection, force=False):
+        """
+        Builds the index on first use, then (at most every sync_interval seconds)
+        adds candidates other processes committed and drops the ones they deleted,
+        comparing the IDs in user_data with the index: the last sync_lookback IDs,
+        or all of them once full_sync_interval has passed.
+        """
+        with self._sync_lock:
+            if not self.built:
+                self.build(connection)
+                return
+            now = time.monotonic()
+            if not force and now - self._synced_at < self.sync_interval: return
+            full = now - self._full_synced_at >= self.full_sync_interval
+            floor = 0 if full else self._max_id - self.sync_lookback
+            # Taken before the read, so IDs add() or remove() change meanwhile are left to them
+            with self._lock:
+                indexed = self._all[self._all.rank(floor):] if floor > 0 else BitMap(self._all)
+            cursor = connection.cursor()
+            if full:
+                present = self._read_ids(cursor)
+            else:
+                cursor.execute("SELECT ID FROM user_data WHERE ID > %s", (floor,))
+                present = BitMap(row[0] for row in cursor.fetchall())
+            missing = list(present - indexed)
+            deleted = indexed - present
+            if missing:
+                cursor.execute(f"SELECT user_id, skill_name FROM user_skills WHERE user_id IN ({', '.join(['%s'] * len(missing))})", missing)
+                skills = {}
+                for user_id, skill in cursor.fetchall():
+                    skills.setdefault(skill.lower(), []).append(user_id)
+                with self._lock:
+                    self._all.update(missing)
+                    for skill, ids in skills.items():
+                        self._skills.setdefault(skill, BitMap()).update(ids)
+                    self._max_id = max(self._max_id, max(missing))
+                    self._metrics['synced'] += len(missing)
+            if deleted:
+                with self._lock:
+                    self._all -= deleted
+                    for bitmap in self._skills.values(): bitmap -= deleted
+                    self._metrics['unsynced'] += len(deleted)
+            with self._lock:
+                self._synced_at = now
+                if full:
+                    self._full_synced_at = now
+                    self._metrics['full_syncs'] += 1
+                self._metrics['syncs'] += 1
+
+    def _evaluate(self, node):
+        # Returns (bitmap, negated): NOT is carried as a flag, so "a AND NOT b"
+        # is a - b and never materialises the complement of b
+        kind = node[0]
+        if kind == 'skill':
+            return self._skills.get(node[1], BitMap()), False
+        if kind == 'not':
+            bitmap, negated = self._evaluate(node[1])
+            return bitmap, not negated
+        parts = [self._evaluate(child) for child in node[1]]
+        positive = [bitmap for bitmap, negated in parts if not negated]
+        negative = [bitmap for bitmap, negated in parts if negated]
+        if kind == 'and':
+            # a & b & ~c & ~d = (a & b) - (c | d); only negatives: ~(c | d)
+            excluded = BitMap.union(*negative) if len(negative) > 1 else (negative[0] if negative else None)
+            if not positive: return excluded, True
+            result = BitMap.intersection(*sorted(positive, key=len)) if len(positive) > 1 else positive[0]
+            return (result - excluded if excluded is not None else result), False
+        # a | b | ~c | ~d = ~((c & d) - (a | b))
+        included = BitMap.union(*positive) if len(positive) > 1 else (positive[0] if positive else None)
+        if not negative: return included, False
+        common = BitMap.intersection(*negative) if len(negative) > 1 else negative[0]
+        return (common - included if included is not None else common), True
+
+    def query(self, expression, limit=50, after=None, descending=True):
+        """
+        Evaluates a boolean skill expression (a string or a parse_skill_query tree).
+        Returns {'total', 'ids', 'next_cursor', 'unknown_skills'}: `limit` matching
+        IDs in ID order (newest first by default), continuing after the ID
+        `after` (the previous page's next_cursor).
+        """
+        start = time.perf_counter()
+        node = parse_skill_query(expression) if isinstance(expression, str) else expression
+        with self._lock:
+            result, negated = self._evaluate(node)
+            if negated: result = self._all - result
+            unknown = sorted(skill for skill in query_skills(node) if skill not in self._skills)
+            if descending:
+                end = result.rank(after - 1) if after is not None else len(result)
+                ids = list(result[max(0, end - limit):end])[::-1]
+            else:
+                begin = result.rank(after) if after is not None else 0
+                ids = list(result[begin:begin + limit])
+            total = len(result)
+            self._metrics['queries'] += 1
+            self._metrics['query_seconds_total'] += time.perf_counter() - start
+        more = (end - limit > 0) if descending else (begin + limit < total)
+        return {'total': total, 'ids': ids, 'next_cursor': ids[-1] if ids and more else None, 'unknown_skills': unknown}
+
+    def skill_counts(self):
+        with self._lock:
+            return {skill: len(bitmap) for skill, bitmap in self._skills.items() if bitmap}
+
+    def stats(self):
+        """Counters plus memory: the serialized (compressed) bitmap bytes, and what plain int32 ID lists would take."""
+        with self._lock:
+            stats = dict(self._metrics)
+            bitmap_bytes = sum(len(bitmap.serialize()) for bitmap in self._skills.values()) + len(self._all.serialize())
+            postings = sum(len(bitmap) for bitmap in self._skills.values())
+            stats.update({'candidates': len(self._all), 'skills': len(self._skills), 'postings': postings,
+                          'bitmap_bytes': bitmap_bytes, 'uncompressed_bytes': (postings + len(self._all)) * 4})
+        stats['query_ms_avg'] = stats['query_seconds_total'] * 1000 / stats['queries'] if stats['queries'] else 0.0
+        return stats
@@ -0,0 +1,177 @@
+"""
+Skill counts for the skills-gap dashboard, kept up to date incrementally.
+
+skill_totals holds one count per skill (the default top-N read) and
+skill_counts the same counts split by Predicted_Field and upload day (for
+the field and date-range breakdowns). Both are changed by record_skills in
+the same transaction as the user_skills rows they summarise. If they ever
+drift, rebuild them from user_skills:
+    python skill_stats.py rebuild [--host localhost] [--user root] [--database cv]
+
+Concurrent uploads upsert the same hot counter rows, so they lock them in
+primary-key order, and their transactions go through retry_deadlocks.
+"""
+import os
+import time
+import random
+import argparse
+import datetime
+from collections import Counter, defaultdict
+
+import pymysql
+
+# Rows with a NULL (unparseable legacy) Timestamp are counted on this day
+UNKNOWN_DAY = datetime.date(1970, 1, 1)
+# ER_LOCK_DEADLOCK: InnoDB rolled the whole transaction back
+MYSQL_DEADLOCK = 1213
+DEADLOCK_RETRIES = int(os.environ.get('DEADLOCK_RETRIES', 3))
+
+def create_skill_count_tables(connection):
+    cursor = connection.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS skill_totals (
+        skill_name VARCHAR(100) NOT NULL,
+        count INT NOT NULL,
+        PRIMARY KEY (skill_name),
+        INDEX idx_skill_totals_count (count)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS skill_counts (
+        day DATE NOT NULL,
+        Predicted_Field VARCHAR(100) NOT NULL,
+        skill_name VARCHAR(100) NOT NULL,
+        count INT NOT NULL,
+        PRIMARY KEY (day, Predicted_Field, skill_name),
+        INDEX idx_skill_counts_field (Predicted_Field, day)
+    );
+    """)
+
+def record_skills(cursor, skills, field, timestamp, delta=1):
+    """
+    Adds `delta` (+1 on upload, -1 on delete) to the counts of one candidate's
+    skills. Call it on the cursor that writes/deletes the user_skills rows,
+    before the commit, so both change together.
+    """
+    record_skills_many(cursor, [(skills, field, timestamp)], delta)
+
+def record_skills_many(cursor, candidates, delta=1):
+    """
+    record_skills for many candidates, given as (skills, field, timestamp), in
+    two statements. Rows go in primary-key order, so two transactions lock the
+    counters they share in the same order instead of deadlocking.
+    """
+    totals, counts = Counter(), Counter()
+    for skills, field, timestamp in candidates:
+        day = timestamp.date() if timestamp else UNKNOWN_DAY
+        for skill in skills:
+            totals[skill] += 1
+            counts[(day, field, skill)] += 1
+    if not totals: return
+    cursor.executemany(
+        "INSERT INTO skill_totals (skill_name, count) VALUES (%s, %s) ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+        [(skill, totals[skill] * delta) for skill in sorted(totals)]
+    )
+    cursor.executemany(
+        "INSERT INTO skill_counts (day, Predicted_Field, skill_name, count) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+        [(day, field, skill, counts[(day, field, skill)] * delta) for day, field, skill in sorted(counts)]
+    )
+
+def retry_deadlocks(connection, work, attempts=None):
+    """
+    Runs work(cursor) and commits. A deadlock rolls the transaction back, so
+    the whole of `work` is run again, up to `attempts` times in all (default
+    DEADLOCK_RETRIES), after a short random pause. Returns what `work` returns.
+    """
+    attempts = attempts or DEADLOCK_RETRIES
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work(connection.cursor())
+            connection.commit()
+            return result
+        except pymysql.err.OperationalError as e:
+            if e.args[0] != MYSQL_DEADLOCK or attempt == attempts: raise
+            connection.rollback()
+            print(f"Deadlock (attempt {attempt} of {attempts}), retrying the transaction")
+            time.sleep(random.uniform(0.01, 0.05) * attempt)
+
+def top_skills(cursor, limit=10, field=None, since=None, until=None):
+    """
+    The `limit` most common skills as [(skill, count)], optionally only for
+    one Predicted_Field and/or upload days in [since, until].
+    """
+    if field is None and since is None and until is None:
+        cursor.execute("SELECT skill_name, count FROM skill_totals WHERE count > 0 ORDER BY count DESC LIMIT %s", (limit,))
+        return [(row[0], int(row[1])) for row in cursor.fetchall()]
+    conditions, args = [], []
+    if field is not None:
+        conditions.append("Predicted_Field = %s"); args.append(field)
+    if since is not None:
+        conditions.append("day >= %s"); args.append(since)
+    if until is not None:
+        conditions.append("day <= %s"); args.append(until)
+    cursor.execute(
+        f"SELECT skill_name, SUM(count) AS total FROM skill_counts WHERE {' AND '.join(conditions)} "
+        "GROUP BY skill_name HAVING total > 0 ORDER BY total DESC LIMIT %s",
+        args + [limit]
+    )
+    return [(row[0], int(row[1])) for row in cursor.fetchall()]
+
+def top_skills_by_field(cursor, limit=10, since=None, until=None):
+    """
+    {Predicted_Field: [(skill, count)]} with the top `limit` skills of every
+    field, from one grouped query (the rows are trimmed to `limit` per field here).
+    """
+    conditions, args = [], []
+    if since is not None:
+        conditions.append("day >= %s"); args.append(since)
+    if until is not None:
+        conditions.append("day <= %s"); args.append(until)
+    cursor.execute(
+        f"SELECT Predicted_Field, skill_name, SUM(count) AS total FROM skill_counts {'WHERE ' + ' AND '.join(conditions) if conditions else ''} "
+        "GROUP BY Predicted_Field, skill_name HAVING total > 0 ORDER BY Predicted_Field, total DESC",
+        args
+    )
+    by_field = defaultdict(list)
+    for field, skill, total in cursor.fetchall():
+        if len(by_field[field]) < limit: by_field[field].append((skill, int(total)))
+    return dict(by_field)
+
+def rebuild_skill_counts(connection):
+    """Recomputes both summary tables from user_skills in one transaction."""
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM skill_totals")
+    cursor.execute("DELETE FROM skill_counts")
+    cursor.execute("""
+    INSERT INTO skill_totals (skill_name, count)
+    SELECT skill_name, COUNT(*) FROM user_skills GROUP BY skill_name
+    """)
+    cursor.execute("""
+    INSERT INTO skill_counts (day, Predicted_Field, skill_name, count)
+    SELECT COALESCE(DATE(d.Timestamp), %s), d.Predicted_Field, s.skill_name, COUNT(*)
+    FROM user_skills s JOIN user_data d ON d.ID = s.user_id
+    GROUP BY 1, 2, 3
+    """, (UNKNOWN_DAY,))
+    connection.commit()
+    cursor.execute("SELECT COUNT(*), COALESCE(SUM(count), 0) FROM skill_totals")
+    skills, total = cursor.fetchone()
+    return {'skills': skills, 'skill_rows': int(total)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--host', default=os.environ.get('DB_HOST', 'localhost'))
+    parser.add_argument('--user', default=os.environ.get('DB_USER', 'root'))
+    parser.add_argument('--password', default=os.environ.get('DB_PASSWORD', ''))
+    parser.add_argument('--database', default=os.environ.get('DB_NAME', 'cv'))
+    args = parser.parse_args()
+
+    connection = pymysql.connect(host=args.host, user=args.user, password=args.password, database=args.database)
+    try:
+        result = rebuild_skill_counts(connection)
+        print(f"Rebuilt skill counts: {result['skills']} skills, {result['skill_rows']} user_skills rows")
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
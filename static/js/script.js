@@ -214,47 +214,98 @@ function logout() {
     window.location.href = '/admin';
 }
 
-async function loadDashboardData() {
-    // Check Privacy Toggle
+// Keyset cursor of the next /api/data page (null when the last page is shown)
+let candidateCursor = null;
+let shownCandidates = 0;
+
+function candidateQuery() {
+    // Privacy toggle, filters and sort order as /api/data query params
+    const params = new URLSearchParams();
     const privacyToggle = document.getElementById('privacyToggle');
-    const isPrivacy = privacyToggle ? privacyToggle.checked : false;
-    const url = isPrivacy ? '/api/data?privacy=true' : '/api/data';
+    if (privacyToggle && privacyToggle.checked) params.set('privacy', 'true');
+    const filters = { field: 'filterField', level: 'filterLevel', min_score: 'filterMinScore',
+                      max_score: 'filterMaxScore', since: 'filterSince', until: 'filterUntil' };
+    Object.entries(filters).forEach(([param, id]) => {
+        const el = document.getElementById(id);
+        if (el && el.value) params.set(param, el.value);
+    });
+    const sortOrder = document.getElementById('sortOrder');
+    if (sortOrder) {
+        const [sort, order] = sortOrder.value.split(':');
+        params.set('sort', sort);
+        params.set('order', order);
+    }
+    return params;
+}
 
-    try {
-        const res = await fetch(url);
-        const data = await res.json();
-
-        const tbody = document.getElementById('user-table-body');
-        if(!tbody) return;
-
-        // Updated: Added the Action column at the end
-        tbody.innerHTML = data.map(row => `
-            <tr>
-                <td>${row[1]}</td>
-                <td>${row[2]}</td>
-                <td><span class="badge bg-${row[3] > 50 ? 'success' : 'danger'}">${row[3]}</span></td>
-                <td>${row[6]}</td>
-                <td>${row[7]}</td>
-                <td class="small text-muted">${row[4]}</td>
-                <td>
-                    <button onclick="deleteCandidate(${row[0]})" class="btn btn-sm btn-danger">Delete</button>
-                </td>
-            </tr>
-        `).join('');
-
-        // Chart Logic (Field & Level)
-        const fields = {};
-        const levels = {};
-        data.forEach(row => {
-            fields[row[6]] = (fields[row[6]] || 0) + 1;
-            levels[row[7]] = (levels[row[7]] || 0) + 1;
-        });
+async function loadCandidatePage(append) {
+    const params = candidateQuery();
+    if (append && candidateCursor) params.set('cursor', candidateCursor);
+
+    const res = await fetch(`/api/data?${params}`);
+    const data = await res.json();
+    const tbody = document.getElementById('user-table-body');
+    if(!tbody) return;
+
+    // Updated: Added the Action column at the end
+    const rowsHtml = data.rows.map(row => `
+        <tr>
+            <td>${row[1]}</td>
+            <td>${row[2]}</td>
+            <td><span class="badge bg-${row[3] > 50 ? 'success' : 'danger'}">${row[3]}</span></td>
+            <td>${row[6]}</td>
+            <td>${row[7]}</td>
+            <td class="small text-muted">${row[4]}</td>
+            <td>
+                <button onclick="deleteCandidate(${row[0]})" class="btn btn-sm btn-danger">Delete</button>
+            </td>
+        </tr>
+    `).join('');
+    if (append) tbody.insertAdjacentHTML('beforeend', rowsHtml);
+    else tbody.innerHTML = rowsHtml;
+
+    shownCandidates = (append ? shownCandidates : 0) + data.rows.length;
+    candidateCursor = data.next_cursor;
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    if (loadMoreBtn) loadMoreBtn.style.display = candidateCursor ? 'inline-block' : 'none';
+    updateCandidateCount();
+}
+
+let candidateTotal = null;
+
+function updateCandidateCount() {
+    const countEl = document.getElementById('candidate-count');
+    if (countEl && candidateTotal !== null) countEl.textContent = `Showing ${shownCandidates} of ${candidateTotal} candidates`;
+}
+
+async function loadCandidateCounts() {
+    // Totals and chart data come from the server, not from the rows on screen
+    const params = candidateQuery();
+    params.delete('privacy');
+    const res = await fetch(`/api/data/count?${params}`);
+    const counts = await res.json();
+    candidateTotal = counts.total;
+    updateCandidateCount();
+
+    const fieldSelect = document.getElementById('filterField');
+    if (fieldSelect && !params.get('field')) {
+        const selected = fieldSelect.value;
+        fieldSelect.innerHTML = '<option value="">All fields</option>' +
+            Object.keys(counts.by_field).map(field => `<option>${field}</option>`).join('');
+        fieldSelect.value = selected;
+    }
 
-        const fieldChartCanvas = document.getElementById('fieldChart');
-        const levelChartCanvas = document.getElementById('levelChart');
+    const fieldChartCanvas = document.getElementById('fieldChart');
+    const levelChartCanvas = document.getElementById('levelChart');
 
-        if(fieldChartCanvas) renderChart('fieldChart', Object.keys(fields), Object.values(fields));
-        if(levelChartCanvas) renderChart('levelChart', Object.keys(levels), Object.values(levels));
+    if(fieldChartCanvas) renderChart('fieldChart', Object.keys(counts.by_field), Object.values(counts.by_field));
+    if(levelChartCanvas) renderChart('levelChart', Object.keys(counts.by_level), Object.values(counts.by_level));
+}
+
+async function loadDashboardData() {
+    try {
+        candidateCursor = null;
+        await Promise.all([loadCandidatePage(false), loadCandidateCounts()]);
 
         // Load Analytics
         loadAnalytics();
@@ -287,9 +338,13 @@ async function deleteCandidate(id) {
     }
 }
 
+const dashboardCharts = {};
+
 function renderChart(canvasId, labels, data) {
+    // Charts are redrawn on every filter change; Chart.js needs the old one destroyed first
+    if (dashboardCharts[canvasId]) dashboardCharts[canvasId].destroy();
     const ctx = document.getElementById(canvasId).getContext('2d');
-    new Chart(ctx, {
+    dashboardCharts[canvasId] = new Chart(ctx, {
         type: 'doughnut',
         data: {
             labels: labels,
@@ -519,6 +574,7 @@ async function processShortlist() {
     const loader = document.getElementById('loader');
     const resultsSection = document.getElementById('results-section');
     const resultsBody = document.getElementById('results-body');
+    const statusTitle = document.getElementById('shortlist-status');
 
     if (fileInput.files.length === 0) {
         alert("Please select at least one resume PDF.");
@@ -536,21 +592,63 @@ async function processShortlist() {
     resultsBody.innerHTML = '';
 
     try {
-        const response = await fetch('/api/shortlist', {
+        // Streamed endpoint: one JSON event per line, each candidate as soon as it is scored
+        const response = await fetch('/api/shortlist/stream', {
             method: 'POST',
             body: formData
         });
-        
-        const data = await response.json();
 
-        if (response.ok) {
-            renderShortlistTable(data);
-            resultsSection.classList.remove('d-none');
-        } else {
+        if (!response.ok || !response.body) {
             alert("Error processing files.");
+            return;
         }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const candidates = [];
+        let total = fileInput.files.length;
+        let buffer = '';
+        let summarized = false;
+        let streamError = null;
+
+        const handleEvent = (event) => {
+            if (event.event === 'start') {
+                total = event.total;
+            } else if (event.event === 'result') {
+                candidates.push(event.row);
+                candidates.sort((a, b) => b.score - a.score);
+                renderShortlistTable(candidates);
+                if (statusTitle) statusTitle.textContent = `Processed ${candidates.length} of ${total}...`;
+                resultsSection.classList.remove('d-none');
+            } else if (event.event === 'error') {
+                streamError = event.error;
+            } else if (event.event === 'summary') {
+                summarized = true;
+                renderShortlistTable(event.results);
+                if (statusTitle) {
+                    statusTitle.textContent = event.partial
+                        ? `Stopped after ${event.results.length} of ${total}: ${streamError || 'server error'}`
+                        : 'Analysis Complete!';
+                }
+                resultsSection.classList.remove('d-none');
+                if (event.partial) alert(`Scoring stopped after ${event.results.length} of ${total} resumes: ${streamError || 'server error'}`);
+            }
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) handleEvent(JSON.parse(buffer));
+        // A stream that ends without its summary was cut off (worker killed, connection dropped)
+        if (!summarized) throw new Error(`Stream ended after ${candidates.length} of ${total} resumes without a summary`);
     } catch (error) {
         console.error("Error:", error);
+        if (statusTitle) statusTitle.textContent = 'Analysis incomplete: the server stopped responding.';
         alert("Server Error");
     } finally {
         loader.classList.add('d-none');
@@ -624,5 +722,11 @@ document.addEventListener("DOMContentLoaded", function() {
         if(privacyToggle) {
             privacyToggle.addEventListener('change', loadDashboardData);
         }
+
+        // Filters and sort order reload the first page and the counts
+        ['filterField', 'filterLevel', 'filterMinScore', 'filterMaxScore', 'filterSince', 'filterUntil', 'sortOrder'].forEach(id => {
+            const el = document.getElementById(id);
+            if (el) el.addEventListener('change', loadDashboardData);
+        });
     }
 });
\ No newline at end of file
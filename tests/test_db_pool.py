@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool, PoolTimeout
+
+class FakeConnection:
+    open = True
+    server_status = 0
+
+    def ping(self, *args): pass
+    def rollback(self): pass
+    def close(self): self.open = False
+
+class FlakyConnect:
+    """connect() that blocks until released, failing the first `failures` calls."""
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.entered = threading.Event()
+        self.go = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            self.entered.set()
+            self.go.wait(5)
+            raise ConnectionError("MySQL is down")
+        return FakeConnection()
+
+def wait_for_waiters(pool, count):
+    deadline = time.monotonic() + 2
+    while pool._waiting < count:
+        assert time.monotonic() < deadline, "waiters never queued"
+        time.sleep(0.005)
+
+def test_failed_connect_hands_its_slot_to_a_queued_waiter():
+    connect = FlakyConnect(failures=1)
+    pool = ConnectionPool(connect, max_size=1, timeout=3)
+    errors, acquired = [], []
+
+    def first():
+        try: pool.acquire()
+        except ConnectionError as e: errors.append(e)
+
+    def waiter():
+        start = time.monotonic()
+        acquired.append((pool.acquire(), time.monotonic() - start))
+
+    threads = [threading.Thread(target=first)]
+    threads[0].start()
+    assert connect.entered.wait(2)
+    threads.append(threading.Thread(target=waiter))
+    threads[1].start()
+    wait_for_waiters(pool, 1)
+    connect.go.set()
+    for thread in threads: thread.join(5)
+
+    assert len(errors) == 1
+    assert len(acquired) == 1 and isinstance(acquired[0][0], FakeConnection)
+    # Woken by the failed connect, not left to the 3 s pool timeout
+    assert acquired[0][1] < 1
+    stats = pool.stats()
+    assert stats['open'] == 1 and stats['connect_errors'] == 1 and stats['timeouts'] == 0
+
+def test_failed_connect_without_waiters_frees_the_slot():
+    connect = FlakyConnect(failures=1)
+    connect.go.set()
+    pool = ConnectionPool(connect, max_size=1, timeout=0.2)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.stats()['open'] == 0
+    assert isinstance(pool.acquire(), FakeConnection)
+
+def test_every_waiter_gets_a_turn_while_the_database_is_down():
+    connect = FlakyConnect(failures=100)
+    pool = ConnectionPool(connect, max_size=1, timeout=3)
+    outcomes = []
+
+    def caller():
+        start = time.monotonic()
+        try: pool.acquire()
+        except (ConnectionError, PoolTimeout) as e: outcomes.append((type(e), time.monotonic() - start))
+
+    threads = [threading.Thread(target=caller)]
+    threads[0].start()
+    assert connect.entered.wait(2)
+    threads += [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads[1:]: thread.start()
+    wait_for_waiters(pool, 3)
+    connect.go.set()
+    for thread in threads: thread.join(5)
+
+    # Each caller fails fast with the connect error instead of timing out
+    assert [kind for kind, _ in outcomes] == [ConnectionError] * 4
+    assert max(seconds for _, seconds in outcomes) < 1
+    assert pool.stats()['open'] == 0
@@ -0,0 +1,139 @@
+import os
+import re
+import sys
+import datetime
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations
+from migrations import LEGACY_TIMESTAMP_PATTERN, type_user_data_columns
+
+class StrictModeError(Exception):
+    """What MySQL's strict mode raises when STR_TO_DATE is given a string it cannot parse."""
+
+class FakeUserData:
+    """
+    Just enough of MySQL (strict mode) for type_user_data_columns on a
+    legacy user_data table: column metadata, ALTERs and the backfill UPDATEs.
+    """
+    def __init__(self, rows):
+        self.columns = {'ID': 'int', 'Name': 'varchar', 'Email_ID': 'varchar', 'resume_score': 'varchar',
+                        'Timestamp': 'varchar', 'Predicted_Field': 'blob', 'User_level': 'blob'}
+        self.rows = {row['ID']: dict(row) for row in rows}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+def mysql_regexp(value, pattern):
+    return value is not None and re.search(pattern, value) is not None
+
+def str_to_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d_%H:%M:%S')
+    except (TypeError, ValueError):
+        raise StrictModeError(f"Truncated incorrect datetime value: {value!r}")
+
+def convert_score(value):
+    return min(Decimal(value), Decimal('999.99')) if mysql_regexp(value, r'^[0-9]+([.][0-9]+)?$') else Decimal(0)
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.result = None
+
+    def execute(self, query, args=None):
+        table = self.table
+        sql = ' '.join(query.split()).replace('%%', '%')
+        if 'information_schema.COLUMNS' in sql:
+            data_type = table.columns.get(args[1])
+            self.result = (data_type,) if data_type else None
+        elif sql.startswith('SELECT COALESCE(MIN(ID)'):
+            self.result = (min(table.rows, default=0), max(table.rows, default=-1))
+        elif sql.startswith('ALTER TABLE'):
+            for name, data_type in re.findall(r'ADD COLUMN (\w+) (\w+)', sql):
+                table.columns[name] = data_type.lower()
+                for row in table.rows.values(): row[name] = None
+            for name in re.findall(r'DROP COLUMN (\w+)', sql):
+                del table.columns[name]
+                for row in table.rows.values(): del row[name]
+            for old, new, data_type in re.findall(r'CHANGE COLUMN (\w+) (\w+) (\w+)', sql):
+                del table.columns[old]
+                table.columns[new] = data_type.lower()
+                for row in table.rows.values(): row[new] = row.pop(old)
+            for name, data_type in re.findall(r'MODIFY COLUMN (\w+) (\w+)', sql):
+                table.columns[name] = data_type.lower()
+        elif sql.startswith('UPDATE user_data SET'):
+            low, high = args
+            for row_id, row in table.rows.items():
+                if low <= row_id <= high: self._update(sql, row)
+        else:
+            raise AssertionError(f"Unexpected query: {sql}")
+
+    def _update(self, sql, row):
+        if 'resume_score_typed =' in sql:
+            row['resume_score_typed'] = convert_score(row['resume_score'])
+        elif 'Timestamp_typed =' in sql:
+            guard = re.search(r"Timestamp_typed = CASE WHEN Timestamp REGEXP '([^']*)' THEN STR_TO_DATE", sql)
+            if guard is None or mysql_regexp(row['Timestamp'], guard.group(1)):
+                row['Timestamp_typed'] = str_to_date(row['Timestamp'])
+            else:
+                row['Timestamp_typed'] = None
+        elif "User_level = 'Experienced'" in sql:
+            if row['User_level'] not in migrations.USER_LEVELS: row['User_level'] = 'Experienced'
+        else:
+            raise AssertionError(f"Unexpected UPDATE: {sql}")
+
+    def fetchone(self):
+        return self.result
+
+LEGACY_ROWS = [
+    {'ID': 1, 'resume_score': '72.5', 'Timestamp': '2023-04-01_09:30:00', 'User_level': 'Fresher'},
+    {'ID': 2, 'resume_score': 'n/a', 'Timestamp': '', 'User_level': 'Expert'},
+    {'ID': 3, 'resume_score': '40', 'Timestamp': 'yesterday', 'User_level': 'Intermediate'},
+    {'ID': 4, 'resume_score': '1200', 'Timestamp': '2023-13-45_25:00:00', 'User_level': 'Experienced'},
+    {'ID': 5, 'resume_score': '55', 'Timestamp': None, 'User_level': 'Fresher'},
+]
+
+@pytest.mark.parametrize('value', ['2023-04-01_09:30:00', '1999-12-31_23:59:59'])
+def test_legacy_pattern_accepts_legacy_timestamps(value):
+    assert mysql_regexp(value, LEGACY_TIMESTAMP_PATTERN)
+
+@pytest.mark.parametrize('value', ['', 'yesterday', '2023-04-01 09:30:00', '2023-13-01_09:30:00', '2023-04-01_24:00:00', '2023-04-01_09:30'])
+def test_legacy_pattern_rejects_other_strings(value):
+    assert not mysql_regexp(value, LEGACY_TIMESTAMP_PATTERN)
+
+def test_bad_timestamps_become_null_instead_of_aborting():
+    table = FakeUserData(LEGACY_ROWS)
+    type_user_data_columns(table)
+    assert table.columns['Timestamp'] == 'datetime' and 'Timestamp_typed' not in table.columns
+    assert table.rows[1]['Timestamp'] == datetime.datetime(2023, 4, 1, 9, 30)
+    assert [table.rows[i]['Timestamp'] for i in (2, 3, 4, 5)] == [None] * 4
+
+def test_scores_and_levels_are_converted():
+    table = FakeUserData(LEGACY_ROWS)
+    type_user_data_columns(table)
+    assert [table.rows[i]['resume_score'] for i in range(1, 6)] == [Decimal('72.5'), 0, 40, Decimal('999.99'), 55]
+    assert table.rows[2]['User_level'] == 'Experienced'
+    assert table.columns['resume_score'] == 'decimal' and table.columns['User_level'] == 'enum'
+
+def test_partial_run_is_finished():
+    # An earlier run that stopped after typing resume_score, with Timestamp half backfilled
+    table = FakeUserData(LEGACY_ROWS)
+    type_user_data_columns(table)
+    table.columns['Timestamp_typed'] = table.columns.pop('Timestamp')
+    table.columns['Timestamp'] = 'varchar'
+    for row in table.rows.values():
+        row['Timestamp_typed'] = row['Timestamp']
+        row['Timestamp'] = 'not a date'
+    row_ids = sorted(table.rows)
+    table.rows[row_ids[0]]['Timestamp'] = '2024-02-03_04:05:06'
+    type_user_data_columns(table)
+    assert table.columns['Timestamp'] == 'datetime' and 'Timestamp_typed' not in table.columns
+    assert table.rows[1]['Timestamp'] == datetime.datetime(2024, 2, 3, 4, 5, 6)
+    assert table.rows[2]['Timestamp'] is None
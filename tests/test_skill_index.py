@@ -0,0 +1,162 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skill_index import SkillIndex, SkillQueryError, parse_skill_query
+
+CANDIDATES = {
+    1: ['Python', 'Django'],
+    2: ['python', 'flask', 'php'],
+    3: ['java'],
+    4: ['python', 'flask'],
+    5: ['php', 'Machine Learning'],
+    6: [],
+}
+
+class FakeCursor:
+    """Answers the three queries SkillIndex sends, from a {user_id: [skills]} dict."""
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.rows = []
+
+    def execute(self, query, args=None):
+        if query.startswith("SELECT ID FROM user_data WHERE ID > %s ORDER BY ID LIMIT %s"):
+            self.rows = [(i,) for i in sorted(self.candidates) if i > args[0]][:args[1]]
+        elif query.startswith("SELECT ID FROM user_data WHERE ID > %s"):
+            self.rows = [(i,) for i in self.candidates if i > args[0]]
+        elif query.startswith("SELECT ID, user_id, skill_name FROM user_skills"):
+            rows = [(user_id, skill) for user_id in sorted(self.candidates) for skill in self.candidates[user_id]]
+            self.rows = [(n, user_id, skill) for n, (user_id, skill) in enumerate(rows, 1) if n > args[0]][:args[1]]
+        elif query.startswith("SELECT user_id, skill_name FROM user_skills WHERE user_id IN"):
+            self.rows = [(user_id, skill) for user_id in args for skill in self.candidates.get(user_id, [])]
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+
+    def fetchall(self):
+        return self.rows
+
+class FakeConnection:
+    def __init__(self, candidates):
+        self.candidates = candidates
+
+    def cursor(self):
+        return FakeCursor(self.candidates)
+
+@pytest.fixture
+def index():
+    index = SkillIndex(sync_interval=0)
+    index.sync(FakeConnection(dict(CANDIDATES)))
+    return index
+
+def ids(index, expression, **kwargs):
+    return sorted(index.query(expression, limit=100, **kwargs)['ids'])
+
+# --- PARSER ---
+
+def test_not_binds_tightest_then_and_then_or():
+    assert parse_skill_query('a OR b AND NOT c') == ('or', [('skill', 'a'), ('and', [('skill', 'b'), ('not', ('skill', 'c'))])])
+
+def test_parentheses_override_precedence():
+    assert parse_skill_query('(a OR b) AND c') == ('and', [('or', [('skill', 'a'), ('skill', 'b')]), ('skill', 'c')])
+
+def test_symbols_and_words_are_the_same_operators():
+    assert parse_skill_query('a & b | !c') == parse_skill_query('a and b or not c')
+    assert parse_skill_query('a && b || c') == parse_skill_query('a AND b OR c')
+
+def test_multi_word_skills_bare_or_quoted():
+    assert parse_skill_query('Machine Learning AND "deep learning"') == ('and', [('skill', 'machine learning'), ('skill', 'deep learning')])
+
+def test_double_not():
+    assert parse_skill_query('NOT NOT a') == ('not', ('not', ('skill', 'a')))
+
+@pytest.mark.parametrize('query', ['', '   ', 'a AND', 'OR a', '(a OR b', 'a b)', 'a AND ()', '""', 'a AND AND b'])
+def test_malformed_queries_raise(query):
+    with pytest.raises(SkillQueryError):
+        parse_skill_query(query)
+
+# --- EVALUATION ---
+
+def test_and_or_precedence(index):
+    # php OR (python AND django), not (php OR python) AND django
+    assert ids(index, 'php OR python AND django') == [1, 2, 5]
+    assert ids(index, '(php OR python) AND django') == [1]
+
+def test_and_not(index):
+    assert ids(index, 'python AND NOT php') == [1, 4]
+    assert ids(index, 'python AND (django OR flask) AND NOT php') == [1, 4]
+
+def test_not_only(index):
+    # Complement over every indexed candidate, including the one without skills
+    assert ids(index, 'NOT python') == [3, 5, 6]
+    assert ids(index, 'NOT python AND NOT php') == [3, 6]
+    assert ids(index, 'NOT NOT java') == [3]
+
+def test_or_with_not(index):
+    assert ids(index, 'java OR NOT python') == [3, 5, 6]
+    assert ids(index, 'NOT python OR NOT php') == [1, 3, 4, 5, 6]
+    assert ids(index, 'flask OR NOT php') == [1, 2, 3, 4, 6]
+
+def test_negated_group(index):
+    assert ids(index, 'NOT (python OR php)') == [3, 6]
+    assert ids(index, 'java OR NOT (python OR php)') == [3, 6]
+
+def test_unknown_skills_match_nothing_and_are_reported(index):
+    result = index.query('python AND cobol')
+    assert result['ids'] == [] and result['total'] == 0
+    assert result['unknown_skills'] == ['cobol']
+    assert ids(index, 'NOT cobol') == [1, 2, 3, 4, 5, 6]
+
+def test_skill_names_are_case_insensitive(index):
+    assert ids(index, 'PYTHON AND "machine learning"') == []
+    assert ids(index, 'Machine Learning') == [5]
+
+# --- PAGING ---
+
+def test_pages_newest_first(index):
+    first = index.query('NOT java', limit=2)
+    assert first['ids'] == [6, 5] and first['total'] == 5 and first['next_cursor'] == 5
+    second = index.query('NOT java', limit=2, after=first['next_cursor'])
+    assert second['ids'] == [4, 2] and second['next_cursor'] == 2
+    last = index.query('NOT java', limit=2, after=second['next_cursor'])
+    assert last['ids'] == [1] and last['next_cursor'] is None
+
+def test_pages_ascending(index):
+    pages, after = [], None
+    while True:
+        page = index.query('python OR php', limit=2, after=after, descending=False)
+        pages.append(page['ids'])
+        after = page['next_cursor']
+        if after is None: break
+    assert pages == [[1, 2], [4, 5]]
+
+def test_exact_last_page_has_no_cursor(index):
+    assert index.query('python', limit=3)['next_cursor'] is None
+    assert index.query('python', limit=3, descending=False)['next_cursor'] is None
+
+# --- SYNC ---
+
+def test_sync_adds_and_drops_recent_candidates():
+    candidates = dict(CANDIDATES)
+    index = SkillIndex(sync_interval=0)
+    connection = FakeConnection(candidates)
+    index.sync(connection)
+    candidates[7] = ['python']
+    del candidates[4]
+    index.sync(connection)
+    assert ids(index, 'python') == [1, 2, 7]
+    assert index.stats()['candidates'] == 6
+
+def test_full_sync_drops_candidates_below_the_lookback():
+    candidates = dict(CANDIDATES)
+    index = SkillIndex(sync_interval=0, sync_lookback=1, full_sync_interval=3600)
+    connection = FakeConnection(candidates)
+    index.sync(connection)
+    del candidates[1]
+    index.sync(connection)
+    assert 1 in ids(index, 'python')
+    index.full_sync_interval = 0
+    index.sync(connection)
+    assert ids(index, 'python') == [2, 4]
@@ -1,28 +1,108 @@
+import time
+_import_started = time.perf_counter()
+
 import os
 import re
-import nltk
-import spacy
+import json
+import math
+import atexit
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from collections import Counter
+from collections.abc import Mapping
 import fitz  # PyMuPDF
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
 from Courses import KEYWORDS, SKILLS_DICT, JOB_DESCRIPTIONS
+from caching import LRUCache, ResumeCache
+from metrics import stage, timed_stage, CACHE_REQUESTS, PDF_PAGES, PDF_TRUNCATED
+
+# --- MODELS (LOADED ON FIRST USE) ---
+# Importing utils loads neither torch nor spaCy: routes that never score or need
+# the NER name fallback (login, data, PDF generation) never pay for them.
+# Serving processes can load them up front with warm_models().
+WARM_MODELS = os.environ.get('WARM_MODELS', 'false').lower() == 'true'
+
+# Stored candidate embeddings record this name, so a model change never mixes vectors
+SEMANTIC_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+def _load_semantic_model():
+    try:
+        from sentence_transformers import SentenceTransformer
+        # 'all-MiniLM-L6-v2' is small (80MB), fast, and runs entirely on CPU.
+        # It will download from HuggingFace on the FIRST run, then cache locally for offline use.
+        print("Loading Semantic Model (Sentence-Transformers)...")
+        model = SentenceTransformer(SEMANTIC_MODEL_NAME)
+        print("Semantic Model Loaded successfully.")
+        return model
+    except Exception as e:
+        print(f"Warning: Could not load SentenceTransformer. Semantic scoring disabled. Error: {e}")
+        return None
+
+# spaCy only serves the NER name fallback, so everything but the entity recognizer is left out
+NER_EXCLUDED_PIPES = ['tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter']
+
+def _load_nlp():
+    import spacy
+    print("Loading spaCy model in utils...")
+    model = spacy.load("en_core_web_sm", exclude=NER_EXCLUDED_PIPES)
+    # The shared tok2vec only feeds the excluded components when NER has its own embedding layer
+    if 'tok2vec' in model.pipe_names and 'ner' not in model.get_pipe('tok2vec').listening_components:
+        model.remove_pipe('tok2vec')
+    print(f"spaCy loaded in utils! (pipes: {', '.join(model.pipe_names)})")
+    return model
+
+MODEL_LOADERS = {'semantic': _load_semantic_model, 'spacy': _load_nlp}
+MODEL_STATS = {name: {'load_seconds': None, 'uses': 0} for name in MODEL_LOADERS}
+_models = {}
+_model_lock = threading.Lock()
+_model_usage = threading.local()
+
+def _ensure_model(name):
+    if name not in _models:
+        with _model_lock:
+            if name not in _models:
+                start = time.perf_counter()
+                _models[name] = MODEL_LOADERS[name]()
+                MODEL_STATS[name]['load_seconds'] = round(time.perf_counter() - start, 3)
+    return _models[name]
 
-# --- NEW: SEMANTIC SEARCH IMPORTS ---
-try:
-    from sentence_transformers import SentenceTransformer, util
-    # 'all-MiniLM-L6-v2' is small (80MB), fast, and runs entirely on CPU.
-    # It will download from HuggingFace on the FIRST run, then cache locally for offline use.
-    print("Loading Semantic Model (Sentence-Transformers)...")
-    semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
-    print("Semantic Model Loaded successfully.")
-except Exception as e:
-    print(f"Warning: Could not load SentenceTransformer. Semantic scoring disabled. Error: {e}")
-    semantic_model = None
-
-# --- LOAD NLP MODELS ---
-print("Loading spaCy model in utils...")
-nlp = spacy.load("en_core_web_sm")
-print("spaCy loaded in utils!")
+def get_model(name):
+    """Returns the 'semantic' or 'spacy' model, loading it on first use (semantic is None if unavailable)."""
+    model = _ensure_model(name)
+    MODEL_STATS[name]['uses'] += 1
+    counts = getattr(_model_usage, 'counts', None)
+    if counts is not None: counts[name] += 1
+    return model
+
+def get_semantic_model():
+    return get_model('semantic')
+
+def get_nlp():
+    return get_model('spacy')
+
+def warm_models(names=None):
+    """Opt-in warm-up for serving processes: loads the models now instead of on the first request."""
+    for name in names or MODEL_LOADERS:
+        _ensure_model(name)
+    if 'semantic' in (names or MODEL_LOADERS): _embed_cached_job_descriptions()
+
+def start_model_usage():
+    """Starts counting the model uses made by this thread (e.g. during one request)."""
+    _model_usage.counts = Counter()
+
+def end_model_usage():
+    """Stops counting and returns {model: uses} since start_model_usage()."""
+    counts = getattr(_model_usage, 'counts', None) or Counter()
+    _model_usage.counts = None
+    return dict(counts)
+
+def model_stats():
+    return {
+        'import_seconds': IMPORT_SECONDS,
+        'models': {name: dict(stats, loaded=name in _models, available=_models.get(name) is not None) for name, stats in MODEL_STATS.items()}
+    }
 
 def mask_pii(name, email):
     """
@@ -47,76 +127,208 @@ def mask_pii(name, email):
         
     return masked_name, masked_email
 
-def pdf_reader(file_input):
+# --- PDF READING ---
+# Per-file budgets (0 = no limit): a 300-page scanned portfolio stops here
+# instead of stalling a worker. The time budget is off by default.
+PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', 50))
+PDF_MAX_CHARS = int(os.environ.get('PDF_MAX_CHARS', 200000))
+PDF_TIME_BUDGET = float(os.environ.get('PDF_TIME_BUDGET', 0))
+# Uploads larger than this are copied to a temporary file, which MuPDF then
+# reads from disk as pages need it, rather than held in memory whole
+PDF_SPOOL_BYTES = int(os.environ.get('PDF_SPOOL_BYTES', 4 * 1024 * 1024))
+PDF_READ_CHUNK = 1024 * 1024
+
+@contextmanager
+def spooled_pdf(file_input, digest=True):
     """
-    Reads PDF from a filepath (string) or a FileStorage object.
-    Handles explicit closing to prevent file locking errors (WinError 32).
+    Yields (source, sha256 hex digest) for a PDF path, bytes or file object.
+    source is a path for files on disk and spooled uploads, bytes for small
+    uploads; either can be passed to read_pdf. The spool file is removed on
+    exit. With digest=False nothing is hashed and the digest is None.
     """
-    text_content = ""
-    doc = None
+    hasher = hashlib.sha256() if digest else None
+    if isinstance(file_input, str):
+        if hasher:
+            with open(file_input, 'rb') as f:
+                for chunk in iter(lambda: f.read(PDF_READ_CHUNK), b''): hasher.update(chunk)
+        yield file_input, hasher and hasher.hexdigest()
+        return
+    if isinstance(file_input, (bytes, bytearray)):
+        if hasher: hasher.update(file_input)
+        yield bytes(file_input), hasher and hasher.hexdigest()
+        return
+    head = file_input.read(PDF_SPOOL_BYTES + 1)
+    if len(head) <= PDF_SPOOL_BYTES:
+        if hasher: hasher.update(head)
+        yield head, hasher and hasher.hexdigest()
+        return
+    # Closed before MuPDF opens it, which Windows requires
+    spool = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
     try:
-        if isinstance(file_input, str):
-            doc = fitz.open(file_input)
-        else:
-            doc = fitz.open(stream=file_input.read(), filetype="pdf")
-        
-        page_count = doc.page_count
-        for page in doc:
-            text_content += page.get_text("text") + "\n"
-            
-    except Exception as e:
-        print(f"Error reading PDF with PyMuPDF: {e}")
-        return "", 0
+        with spool:
+            chunk = head
+            while chunk:
+                if hasher: hasher.update(chunk)
+                spool.write(chunk)
+                chunk = file_input.read(PDF_READ_CHUNK)
+        del head, chunk
+        yield spool.name, hasher and hasher.hexdigest()
     finally:
-        if doc:
-            doc.close()
-            
-    return text_content, page_count
+        os.unlink(spool.name)
 
-def clean_text_nltk(text):
+@timed_stage('pdf_read')
+def read_pdf(file_input, max_pages=None, max_chars=None, time_budget=None):
+    """
+    Extracts a PDF's text page by page from a path, bytes or file object,
+    stopping at the page, character or time (seconds) budget; None uses the
+    PDF_* defaults and 0 means no limit. Returns a dict with text, pages (the
+    document's page count), pages_read and truncated (None, 'pages', 'chars'
+    or 'time'). Unreadable PDFs give empty text and 0 pages.
+    """
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = PDF_MAX_CHARS if max_chars is None else max_chars
+    time_budget = PDF_TIME_BUDGET if time_budget is None else time_budget
+    start = time.perf_counter()
+    parts, chars, truncated = [], 0, None
     try:
-        stop_words = set(nltk.corpus.stopwords.words('english'))
-    except:
-        nltk.download('stopwords')
-        stop_words = set(nltk.corpus.stopwords.words('english'))
-    text = text.lower()
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return text
+        with spooled_pdf(file_input, digest=False) as (source, _):
+            doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+            # Closed explicitly, before the spool file goes, to prevent file locking errors (WinError 32)
+            try:
+                page_count = doc.page_count
+                for number in range(page_count):
+                    if max_pages and number >= max_pages:
+                        truncated = 'pages'
+                        break
+                    if time_budget and time.perf_counter() - start >= time_budget:
+                        truncated = 'time'
+                        break
+                    page_text = doc.load_page(number).get_text("text") + "\n"
+                    if max_chars and chars + len(page_text) > max_chars:
+                        page_text = page_text[:max_chars - chars]
+                        truncated = 'chars'
+                    parts.append(page_text)
+                    chars += len(page_text)
+                    if truncated: break
+            finally:
+                doc.close()
+    except Exception as e:
+        print(f"Error reading PDF with PyMuPDF: {e}")
+        return {'text': '', 'pages': 0, 'pages_read': 0, 'truncated': None}
+    PDF_PAGES.observe(page_count)
+    if truncated:
+        PDF_TRUNCATED.inc(budget=truncated)
+        print(f"PDF truncated ({truncated} budget): read {len(parts)} of {page_count} pages, {chars} characters")
+    return {'text': ''.join(parts), 'pages': page_count, 'pages_read': len(parts), 'truncated': truncated}
 
-def parse_resume_sections(text):
-    lines = text.split('\n')
-    sections_keywords = {
-        'Summary': ['summary', 'profile', 'about', 'objective', 'professional summary', 'professional profile', 'career objective'],
-        'Experience': ['experience', 'employment', 'work history', 'professional experience', 'work experience'],
-        'Education': ['education', 'academic', 'qualifications', 'academic background', 'education background'],
-        'Projects': ['projects', 'portfolio', 'personal projects', 'project experience'],
-        'Skills': ['skills', 'technical skills', 'technologies', 'tech stack', 'core competencies']
-    }
-    parsed_data = {k: '' for k in sections_keywords}
-    current_section = 'Summary'
-    current_text = []
-    for line in lines:
-        stripped = line.strip()
-        if not stripped: continue
-        found_header = False
-        for section, keywords in sections_keywords.items():
-            if any(kw in stripped.lower() for kw in keywords):
-                if current_text: parsed_data[current_section] = "\n".join(current_text).strip()
-                current_section = section
-                current_text = []
-                found_header = True
-                break
-        if not found_header: current_text.append(line)
-    if current_text: parsed_data[current_section] = "\n".join(current_text).strip()
-    return parsed_data
-
-def extract_resume_data(raw_text, cleaned_text):
+def pdf_reader(file_input):
+    """
+    Reads PDF text from a filepath (string) or a FileStorage object, within the
+    PDF_* budgets. Returns (text, page count); see read_pdf for truncation.
+    """
+    pdf = read_pdf(file_input)
+    return pdf['text'], pdf['pages']
+
+# --- TEXT NORMALIZATION ---
+# normalize_text(t) == re.sub(r'[^a-z0-9\s]', '', re.sub(r'\s+', ' ', t.lower())),
+# done on the ASCII bytes with one translate table: A-Z lowered, a-z and 0-9
+# kept, whitespace made ' ', everything else a marker byte. Space runs are then
+# collapsed (a dropped character between two spaces keeps them apart, as the
+# old second regex did) and the markers deleted.
+_DROPPED = b'\x00'
+NORMALIZE_TABLE = bytes(code + 32 if 65 <= code <= 90 else code if chr(code).isalnum() and code < 128
+                        else 32 if chr(code).isspace() else _DROPPED[0] for code in range(256))
+# Non-ASCII characters that survive: whitespace (none exists outside the BMP),
+# and the two whose lowercase is ASCII. encode('ascii', 'replace') drops the rest.
+UNICODE_SPACES = tuple(c for c in map(chr, range(128, 0x10000)) if c.isspace())
+LOWER_TO_ASCII = (('\u0130', 'i'), ('\u212a', 'k'))  # LATIN CAPITAL I WITH DOT ABOVE, KELVIN SIGN
+
+def _normalize(text):
+    if not text.isascii():
+        for space in UNICODE_SPACES:
+            if space in text: text = text.replace(space, ' ')
+        for char, lowered in LOWER_TO_ASCII:
+            if char in text: text = text.replace(char, lowered)
+    data = text.encode('ascii', 'replace').translate(NORMALIZE_TABLE)
+    while b'  ' in data: data = data.replace(b'  ', b' ')
+    return data.replace(_DROPPED, b'').decode('ascii')
+
+@timed_stage('clean_text')
+def normalize_text(text):
+    """Lowercase, whitespace runs as one space, only a-z, 0-9 and spaces kept."""
+    return _normalize(text)
+
+@timed_stage('clean_text')
+def normalize_texts(texts):
+    """normalize_text over a list of texts."""
+    return [_normalize(text) for text in texts]
+
+# Former name (it once loaded the NLTK stopwords it never used)
+clean_text_nltk = normalize_text
+
+# --- NAME HEURISTIC TABLES (built once at import) ---
+JOB_TITLE_KEYWORDS = ['developer', 'engineer', 'manager', 'specialist', 'consultant', 'analyst', 'designer', 'director', 'assistant', 'lead', 'senior', 'intern', 'recruiter', 'architect', 'scientist', 'administrator', 'tester', 'qa', 'front-end', 'frontend', 'backend', 'full stack', 'stack', 'web', 'mobile', 'data', 'cloud', 'devops', 'cyber', 'security', 'product', 'project', 'program', 'technical']
+NAME_EXCLUSIONS = {'about', 'me', 'my', 'i', 'am', 'summary', 'profile', 'objective', 'experience', 'work', 'history', 'employment', 'education', 'academic', 'skills', 'projects', 'portfolio', 'contact', 'info', 'basic', 'phone', 'mobile', 'email', 'address', 'social', 'media'}
+CITIES = ['San Francisco', 'New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose', 'Austin', 'London', 'Paris', 'Berlin', 'Tokyo', 'Toronto']
+CITIES_PATTERN = re.compile(r'\b(' + '|'.join(CITIES) + r')\b', flags=re.IGNORECASE)
+PHONE_WORD_PATTERN = re.compile(r'^[\d\-\(\)]+$')
+NAME_WORD_PATTERN = re.compile(r'^[A-Z][a-zA-Z\-]+$')
+
+# --- SINGLE-PASS SKILL MATCHER ---
+def _build_trie_regex(keywords):
+    """
+    Folds the keywords into a character trie and renders it as one regex.
+    At every node "go deeper" is tried before "stop here", so the first
+    alternative that matches at a position is always the longest keyword.
+    """
+    trie = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def render(node):
+        branches = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+        if not branches: return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+
+    return render(trie)
+
+def build_skill_matcher(keywords_by_field):
+    """
+    Compiles every keyword of KEYWORDS into one pattern equivalent to running
+    re.search(r'\b' + re.escape(keyword) + r'\b') for each keyword separately.
+
+    The lookahead lets matches overlap, so every word boundary is tried once and
+    yields the longest keyword starting there. Shorter keywords starting at the
+    same spot (e.g. 'react' inside 'react native') are implied by the longest one
+    and are precomputed into a lookup table.
+    """
+    keywords = sorted({kw for kws in keywords_by_field.values() for kw in kws})
+    pattern = re.compile(r'\b(?=(' + _build_trie_regex(keywords) + r')\b)')
+    implied = {}
+    for kw in keywords:
+        implied[kw] = frozenset(
+            other for other in keywords
+            if other == kw or (kw.startswith(other) and re.match(re.escape(other) + r'\b', kw))
+        )
+    return pattern, implied
+
+SKILL_PATTERN, SKILL_IMPLIED = build_skill_matcher(KEYWORDS)
+
+def match_skills(text):
+    """Returns the set of KEYWORDS skills found in text in a single regex pass."""
+    found_skills = set()
+    for longest in set(SKILL_PATTERN.findall(text)):
+        found_skills |= SKILL_IMPLIED[longest]
+    return found_skills
+
+def _heuristic_name(raw_text):
     name = 'Candidate'
-    job_title_keywords = ['developer', 'engineer', 'manager', 'specialist', 'consultant', 'analyst', 'designer', 'director', 'assistant', 'lead', 'senior', 'intern', 'recruiter', 'architect', 'scientist', 'administrator', 'tester', 'qa', 'front-end', 'frontend', 'backend', 'full stack', 'stack', 'web', 'mobile', 'data', 'cloud', 'devops', 'cyber', 'security', 'product', 'project', 'program', 'technical']
-    name_exclusions = ['about', 'me', 'my', 'i', 'am', 'summary', 'profile', 'objective', 'experience', 'work', 'history', 'employment', 'education', 'academic', 'skills', 'projects', 'portfolio', 'contact', 'info', 'basic', 'phone', 'mobile', 'email', 'address', 'social', 'media']
-    cities_raw = ['San Francisco', 'New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose', 'Austin', 'London', 'Paris', 'Berlin', 'Tokyo', 'Toronto']
-    cities = r'\b(' + '|'.join(cities_raw) + r')\b'
     first_lines = raw_text.split('\n')[:15]
     
     for line in first_lines:
@@ -129,28 +341,142 @@ def extract_resume_data(raw_text, cleaned_text):
             if 'http' in word_lower or 'www' in word_lower or 'linkedin' in word_lower or 'github' in word_lower: continue
             if '.com' in word_lower or '.net' in word_lower or '.org' in word_lower: continue
             if '@' in word: continue
-            if re.search(cities, word, flags=re.IGNORECASE): continue
-            if any(kw in word_lower for kw in job_title_keywords): continue
-            if word_lower in name_exclusions: continue
-            if re.match(r'^[\d\-\(\)]+$', word): continue
-            if re.match(r'^[A-Z][a-zA-Z\-]+$', word):
+            if CITIES_PATTERN.search(word): continue
+            if any(kw in word_lower for kw in JOB_TITLE_KEYWORDS): continue
+            if word_lower in NAME_EXCLUSIONS: continue
+            if PHONE_WORD_PATTERN.match(word): continue
+            if NAME_WORD_PATTERN.match(word):
                 potential_name_parts.append(word)
                 if len(potential_name_parts) >= 2:
                     name = " ".join(potential_name_parts)
                     break
         if name != 'Candidate': break
+    return name
+
+# --- RESUME SECTIONS ---
+# A line is a header when it contains one of these (lowercased); the first
+# section in this order with a match wins.
+SECTION_KEYWORDS = {
+    'Summary': ['summary', 'profile', 'about', 'objective', 'professional summary', 'professional profile', 'career objective'],
+    'Experience': ['experience', 'employment', 'work history', 'professional experience', 'work experience'],
+    'Education': ['education', 'academic', 'qualifications', 'academic background', 'education background'],
+    'Projects': ['projects', 'portfolio', 'personal projects', 'project experience'],
+    'Skills': ['skills', 'technical skills', 'technologies', 'tech stack', 'core competencies']
+}
+# Finds the candidate header lines in one scan of the whole text
+SECTION_KEYWORD_PATTERN = re.compile(_build_trie_regex(sorted({kw for kws in SECTION_KEYWORDS.values() for kw in kws})))
+# Names a header line's section: one lookahead per section, tried in order
+SECTION_HEADER_PATTERN = re.compile('|'.join(f"(?=.*?(?:{'|'.join(map(re.escape, kws))}))(?P<{name}>)"
+                                             for name, kws in SECTION_KEYWORDS.items()))
+NON_SPACE_PATTERN = re.compile(r'\S')
+
+class ResumeSections(Mapping):
+    """
+    parse_resume_sections' result: section name -> text, kept as (start, end)
+    offsets into the resume text. A section's string (its non-blank lines,
+    stripped) is only cut out when it is read, so scoring, which reads
+    Education and Experience, never copies the rest.
+    """
+    __slots__ = ('text', 'spans', '_strings')
+
+    def __init__(self, text, spans):
+        self.text, self.spans = text, spans
+        self._strings = {}
 
-    if name == 'Candidate':
-        doc = nlp(raw_text)
-        for ent in doc.ents:
-            ent_text = ent.text
-            if ent.label_ == "GPE" or ent.label_ == "LOC": continue
-            if 'http' in ent_text.lower() or 'www' in ent_text.lower(): continue
-            if ent_text.lower() in name_exclusions: continue
-            is_job_title = any(kw in ent_text.lower() for kw in job_title_keywords)
-            if ent.label_ == "PERSON" and len(ent.text.split()) >= 2 and not is_job_title:
-                name = ent_text
-                break
+    def __getitem__(self, name):
+        value = self._strings.get(name)
+        if value is None:
+            span = self.spans[name]
+            value = self._strings[name] = '' if span is None else "\n".join(
+                line for line in self.text[span[0]:span[1]].split('\n') if line.strip()).strip()
+        return value
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __repr__(self):
+        return f"ResumeSections({self.spans!r})"
+
+def _header_lines(text):
+    # (start, end, section) of every header line, in order
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A character lowercased into several (e.g. U+0130): offsets differ, go line by line
+        start = 0
+        for line in text.split('\n'):
+            end = start + len(line)
+            match = SECTION_HEADER_PATTERN.match(line.lower())
+            if match: yield start, end, match.lastgroup
+            start = end + 1
+        return
+    position = 0
+    while True:
+        keyword = SECTION_KEYWORD_PATTERN.search(lowered, position)
+        if not keyword: return
+        start = lowered.rfind('\n', 0, keyword.start()) + 1
+        end = lowered.find('\n', keyword.end())
+        if end < 0: end = len(text)
+        yield start, end, SECTION_HEADER_PATTERN.match(lowered, start, end).lastgroup
+        position = end + 1
+
+@timed_stage('sections')
+def parse_resume_sections(text):
+    """
+    Splits a resume at its header lines into SECTION_KEYWORDS sections (text
+    before the first header is Summary). A section found twice keeps its last
+    non-empty occurrence. Returns a ResumeSections.
+    """
+    spans = dict.fromkeys(SECTION_KEYWORDS)
+    section, block_start = 'Summary', 0
+    for start, end, header in _header_lines(text):
+        if NON_SPACE_PATTERN.search(text, block_start, start): spans[section] = (block_start, start)
+        section, block_start = header, end + 1
+    if NON_SPACE_PATTERN.search(text, block_start): spans[section] = (block_start, len(text))
+    return ResumeSections(text, spans)
+
+def _resume_to_json(parsed):
+    # Disk form for RESUME_CACHE: sections as their spans into raw_text
+    sections = parsed['sections']
+    return dict(parsed, sections=sections.spans) if isinstance(sections, ResumeSections) else parsed
+
+def _resume_from_json(parsed):
+    sections = parsed.get('sections')
+    # Entries written before sections were spans hold the strings themselves
+    if sections and all(span is None or isinstance(span, list) for span in sections.values()):
+        parsed['sections'] = ResumeSections(parsed['raw_text'], sections)
+    return parsed
+
+# --- NER NAME FALLBACK ---
+# The name is in the header, so NER only reads this many leading characters.
+NER_HEADER_CHARS = int(os.environ.get('NER_HEADER_CHARS', 1000))
+NER_BATCH_SIZE = int(os.environ.get('NER_BATCH_SIZE', 32))
+
+def _name_from_entities(doc):
+    for ent in doc.ents:
+        ent_text = ent.text
+        if ent.label_ == "GPE" or ent.label_ == "LOC": continue
+        if 'http' in ent_text.lower() or 'www' in ent_text.lower(): continue
+        if ent_text.lower() in NAME_EXCLUSIONS: continue
+        is_job_title = any(kw in ent_text.lower() for kw in JOB_TITLE_KEYWORDS)
+        if ent.label_ == "PERSON" and len(ent.text.split()) >= 2 and not is_job_title:
+            return ent_text
+    return 'Candidate'
+
+@timed_stage('ner')
+def ner_names(raw_texts, batch_size=NER_BATCH_SIZE):
+    """NER name fallback for many resumes at once: one nlp.pipe pass over their header regions."""
+    headers = (raw_text[:NER_HEADER_CHARS] for raw_text in raw_texts)
+    return [_name_from_entities(doc) for doc in get_nlp().pipe(headers, batch_size=batch_size)]
+
+@timed_stage('extract')
+def extract_resume_data(raw_text, cleaned_text, ner=True):
+    """ner=False skips the NER name fallback (name stays 'Candidate') so callers can batch it with ner_names."""
+    name = _heuristic_name(raw_text)
+    if name == 'Candidate' and ner:
+        name = ner_names([raw_text])[0]
     
     email = 'unknown@email.com'
     email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', raw_text)
@@ -160,98 +486,496 @@ def extract_resume_data(raw_text, cleaned_text):
     mobile_match = re.search(r'[\+\(]?[1-9][\s\d\.\-\(\)]{8,}[0-9]', raw_text)
     if mobile_match: mobile = mobile_match.group(0)
 
-    found_skills = set()
-    for field, keywords in KEYWORDS.items():
-        for keyword in keywords:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', cleaned_text):
-                found_skills.add(keyword)
+    found_skills = match_skills(cleaned_text)
     
     return {'name': name, 'email': email, 'mobile_number': mobile, 'skills': list(found_skills)}
 
-def predict_field_fast(text):
-    text_lower = text.lower()
-    scores = {field: 0 for field in KEYWORDS}
-    strong_indicators = {
-        'Data Science & AI': ['scikit-learn', 'pandas', 'tensorflow', 'pytorch', 'keras', 'nlp', 'natural language processing', 'computer vision', 'generative ai', 'llm', 'hugging face', 'prompt engineering'],
-        'DevOps & Cloud': ['kubernetes', 'k8s', 'jenkins', 'terraform', 'ansible', 'ci/cd', 'docker', 'aws', 'azure', 'gcp'],
-        'Cybersecurity': ['penetration testing', 'pentesting', 'ethical hacking', 'kali linux', 'owasp', 'firewall', 'encryption', 'iso 27001'],
-        'Mobile Development': ['android studio', 'kotlin', 'swift', 'swiftui', 'jetpack compose', 'flutter', 'react native'],
-        'Product Management': ['product roadmap', 'user stories', 'stakeholder management', 'agile', 'scrum', 'kanban']
+# --- VECTORIZED FIELD PREDICTION ---
+STRONG_INDICATORS = {
+    'Data Science & AI': ['scikit-learn', 'pandas', 'tensorflow', 'pytorch', 'keras', 'nlp', 'natural language processing', 'computer vision', 'generative ai', 'llm', 'hugging face', 'prompt engineering'],
+    'DevOps & Cloud': ['kubernetes', 'k8s', 'jenkins', 'terraform', 'ansible', 'ci/cd', 'docker', 'aws', 'azure', 'gcp'],
+    'Cybersecurity': ['penetration testing', 'pentesting', 'ethical hacking', 'kali linux', 'owasp', 'firewall', 'encryption', 'iso 27001'],
+    'Mobile Development': ['android studio', 'kotlin', 'swift', 'swiftui', 'jetpack compose', 'flutter', 'react native'],
+    'Product Management': ['product roadmap', 'user stories', 'stakeholder management', 'agile', 'scrum', 'kanban']
+}
+BACKEND_KEYWORDS = ['django', 'flask', 'fastapi', 'node.js', 'express', 'java', 'spring boot', 'python', 'c#', '.net', 'go', 'php', 'mysql', 'postgresql', 'mongodb', 'sql']
+FRONTEND_KEYWORDS = ['react', 'angular', 'vue', 'next.js', 'html', 'css', 'javascript', 'typescript', 'tailwind', 'bootstrap', 'redux']
+
+def build_field_model(keywords_by_field):
+    """
+    Precomputes everything predict_fields needs:
+    - one overlapping substring pattern over every term used for scoring,
+    - a term-by-field weight matrix (15 per strong indicator, 1 per keyword),
+    - backend/frontend term masks for the Web Development full-stack bonus.
+    """
+    fields = list(keywords_by_field)
+    terms = sorted(
+        {kw for kws in keywords_by_field.values() for kw in kws}
+        | {kw for kws in STRONG_INDICATORS.values() for kw in kws}
+        | set(BACKEND_KEYWORDS) | set(FRONTEND_KEYWORDS)
+    )
+    term_index = {term: i for i, term in enumerate(terms)}
+    # Plain substring semantics ('kw in text'): try every position, and let the
+    # longest term found there imply all of its prefixes that are terms too.
+    pattern = re.compile('(?=(' + _build_trie_regex(terms) + '))')
+    implied = {term: [term_index[other] for other in terms if term.startswith(other)] for term in terms}
+
+    weights = np.zeros((len(terms), len(fields)), dtype=np.int64)
+    for j, field in enumerate(fields):
+        for word in STRONG_INDICATORS.get(field, []):
+            weights[term_index[word], j] += 15
+        for kw in keywords_by_field[field]:
+            weights[term_index[kw], j] += 1
+    backend_mask = np.zeros(len(terms), dtype=np.int64)
+    for kw in BACKEND_KEYWORDS: backend_mask[term_index[kw]] += 1
+    frontend_mask = np.zeros(len(terms), dtype=np.int64)
+    for kw in FRONTEND_KEYWORDS: frontend_mask[term_index[kw]] += 1
+
+    return {
+        'fields': fields, 'terms': terms, 'pattern': pattern, 'implied': implied,
+        'weights': weights, 'backend_mask': backend_mask, 'frontend_mask': frontend_mask,
+        'web_index': fields.index('Web Development'),
     }
-    for field, words in strong_indicators.items():
-        if field in scores:
-            for word in words:
-                if word in text_lower: scores[field] += 15 
-    backend_keywords = ['django', 'flask', 'fastapi', 'node.js', 'express', 'java', 'spring boot', 'python', 'c#', '.net', 'go', 'php', 'mysql', 'postgresql', 'mongodb', 'sql']
-    frontend_keywords = ['react', 'angular', 'vue', 'next.js', 'html', 'css', 'javascript', 'typescript', 'tailwind', 'bootstrap', 'redux']
-    backend_count = sum(1 for kw in backend_keywords if kw in text_lower)
-    frontend_count = sum(1 for kw in frontend_keywords if kw in text_lower)
-    if backend_count >= 2 and frontend_count >= 2: scores['Web Development'] += 20
-    for field, keywords in KEYWORDS.items():
-        for kw in keywords:
-            if kw in text_lower: scores[field] += 1
-    predicted_field = max(scores, key=scores.get) if any(scores.values()) else 'General'
-    return predicted_field
+
+FIELD_MODEL = build_field_model(KEYWORDS)
+
+def term_presence(texts, model=FIELD_MODEL):
+    """Returns an (n_texts x n_terms) 0/1 matrix from one regex pass per text."""
+    presence = np.zeros((len(texts), len(model['terms'])), dtype=np.int64)
+    implied = model['implied']
+    for row, text in enumerate(texts):
+        for longest in set(model['pattern'].findall(text.lower())):
+            presence[row, implied[longest]] = 1
+    return presence
+
+def field_scores(texts, model=FIELD_MODEL):
+    """Returns an (n_texts x n_fields) score matrix, one column per KEYWORDS field."""
+    presence = term_presence(texts, model)
+    scores = presence @ model['weights']
+    full_stack = ((presence @ model['backend_mask']) >= 2) & ((presence @ model['frontend_mask']) >= 2)
+    scores[:, model['web_index']] += 20 * full_stack
+    return scores
+
+@timed_stage('field_prediction')
+def predict_fields(texts, model=FIELD_MODEL):
+    """Batch form of predict_field_fast: classifies many resumes with one matrix product."""
+    if not texts: return []
+    scores = field_scores(texts, model)
+    # argmax keeps the first maximum, i.e. the same KEYWORDS order tie-break as max(dict)
+    best = scores.argmax(axis=1)
+    fields = model['fields']
+    return [fields[b] if scores[i, b] > 0 else 'General' for i, b in enumerate(best)]
+
+def predict_field_fast(text):
+    return predict_fields([text])[0]
+
+# --- COMPILED JOB DESCRIPTIONS ---
+# Compiled JDs are cached by content hash; set JD_CACHE_PATH to persist them across restarts
+# (texts as JSON at the path, embeddings as a float32 matrix in <path>.npy).
+JD_CACHE_SIZE = int(os.environ.get('JD_CACHE_SIZE', 128))
+JD_CACHE_TTL = float(os.environ.get('JD_CACHE_TTL', 24 * 3600))
+JD_CACHE_PATH = os.environ.get('JD_CACHE_PATH')
+JD_CACHE_VERSION = 2
+
+ALL_SKILLS = frozenset(SKILL_IMPLIED)
+YEARS_PATTERN = re.compile(r'(\d+)\+?\s*years?')
+DEGREE_KEYWORDS = ['bachelor', 'master', 'phd', 'b.tech', 'm.tech', 'bsc', 'msc', 'associate']
+_tfidf_analyzer = None
+
+def tfidf_analyzer():
+    # Same tokenizer/stop words as TfidfVectorizer(stop_words='english'), built on first
+    # use: importing sklearn is most of what importing utils would otherwise cost
+    global _tfidf_analyzer
+    if _tfidf_analyzer is None:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        _tfidf_analyzer = TfidfVectorizer(stop_words='english').build_analyzer()
+    return _tfidf_analyzer
+TFIDF_IDF_SHARED = 1.0
+TFIDF_IDF_SINGLE = math.log(3 / 2) + 1
+
+def tfidf_similarity(counts_a, counts_b):
+    """
+    Cosine similarity of the two rows TfidfVectorizer(stop_words='english')
+    would produce from fit_transform([doc_a, doc_b]), computed from term counts
+    so no vectorizer has to be fitted per resume. With two documents and smooth
+    idf, a term has idf 1 if both documents contain it and ln(3/2)+1 otherwise.
+    Returns None when both documents are empty (sklearn's "empty vocabulary").
+    """
+    if not counts_a and not counts_b: return None
+    def norm(counts, other):
+        return math.sqrt(sum((c * (TFIDF_IDF_SHARED if t in other else TFIDF_IDF_SINGLE)) ** 2 for t, c in counts.items()))
+    norm_a, norm_b = norm(counts_a, counts_b), norm(counts_b, counts_a)
+    if not norm_a or not norm_b: return 0.0
+    shared = sorted(t for t in counts_a if t in counts_b)
+    return sum((counts_a[t] / norm_a) * (counts_b[t] / norm_b) for t in shared)
+
+def job_description_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class JobDescription:
+    """
+    Everything calculate_rigorous_score needs from a JD, computed once:
+    lowercased text, required years, the KEYWORDS skills it mentions,
+    and, on first use, TF-IDF term counts and the semantic embedding.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.key = job_description_key(text)
+        self.lower = text.lower()
+        years_match = YEARS_PATTERN.search(self.lower)
+        self.required_years = int(years_match.group(1)) if years_match else 0
+        self.skill_set = frozenset(kw for kw in ALL_SKILLS if kw in self.lower)
+        self._tfidf_counts = None
+        self._embedding = None
+        self._saved_embedding = None  # numpy, from load_job_description_cache
+        self._vector = None
+
+    def mentions_skill(self, skill):
+        # Same as `skill in jd_lower`; KEYWORDS skills are answered from the precomputed set
+        if skill in ALL_SKILLS: return skill in self.skill_set
+        return skill in self.lower
+
+    @property
+    def tfidf_counts(self):
+        # On first use, so compiling the preset JDs at startup does not import sklearn
+        if self._tfidf_counts is None: self._tfidf_counts = Counter(tfidf_analyzer()(self.text))
+        return self._tfidf_counts
+
+    @property
+    def embedding(self):
+        if self._embedding is None and self.text:
+            semantic_model = get_semantic_model()
+            if semantic_model and self._saved_embedding is not None:
+                import torch
+                self._embedding = torch.from_numpy(self._saved_embedding).to(semantic_model.device)
+            elif semantic_model:
+                self._embedding = semantic_model.encode(self.text, convert_to_tensor=True)
+        return self._embedding
+
+    def saved_embedding(self):
+        # The embedding as a float32 numpy vector (None before it is computed)
+        if self._embedding is not None: return np.asarray(self._embedding.detach().cpu(), dtype=np.float32)
+        return self._saved_embedding
+
+    @property
+    def vector(self):
+        # Unit-length numpy form of the embedding, for the FAISS candidate index
+        if self._vector is None and self.text:
+            vectors = embed_texts([self.text])
+            if vectors is not None: self._vector = vectors[0]
+        return self._vector
+
+JD_CACHE = LRUCache(max_size=JD_CACHE_SIZE, ttl=JD_CACHE_TTL)
+
+def get_job_description(job_description):
+    """Returns the compiled JobDescription for a JD text, compiling it on a cache miss."""
+    if isinstance(job_description, JobDescription): return job_description
+    key = job_description_key(job_description)
+    jd = JD_CACHE.get(key)
+    CACHE_REQUESTS.inc(cache='jd', result='miss' if jd is None else 'hit')
+    if jd is None:
+        with stage('jd_compile'): jd = JobDescription(job_description)
+        JD_CACHE.set(key, jd)
+    return jd
+
+def save_job_description_cache(path=JD_CACHE_PATH):
+    """Writes the cached JDs' texts to `path` (JSON) and their embeddings to `path`.npy."""
+    if not path: return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        entries, embeddings = [], []
+        for key, jd, stored_at in JD_CACHE.items():
+            embedding = jd.saved_embedding()
+            entries.append({'key': key, 'text': jd.text, 'stored_at': stored_at, 'embedding': len(embeddings) if embedding is not None else None})
+            if embedding is not None: embeddings.append(embedding)
+        # The matrix goes first: the JSON names its rows
+        with open(path + '.npy.tmp', 'wb') as f:
+            np.save(f, np.stack(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32), allow_pickle=False)
+        os.replace(path + '.npy.tmp', path + '.npy')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': JD_CACHE_VERSION, 'model': SEMANTIC_MODEL_NAME, 'entries': entries}, f)
+        os.replace(path + '.tmp', path)
+    except Exception as e:
+        print(f"Warning: Could not save JD cache to {path}: {e}")
+
+def load_job_description_cache(path=JD_CACHE_PATH):
+    """Recompiles the JDs saved by save_job_description_cache, reusing their embeddings if the model is the same."""
+    if not path or not os.path.exists(path): return 0
+    try:
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('version') != JD_CACHE_VERSION: return 0
+        embeddings = None
+        if payload.get('model') == SEMANTIC_MODEL_NAME and os.path.exists(path + '.npy'):
+            embeddings = np.load(path + '.npy', allow_pickle=False)
+        loaded = 0
+        for entry in payload['entries']:
+            jd = JobDescription(entry['text'])
+            if jd.key != entry['key']: continue
+            row = entry.get('embedding')
+            if embeddings is not None and row is not None and row < len(embeddings):
+                jd._saved_embedding = embeddings[row].astype(np.float32)
+            JD_CACHE.set(jd.key, jd, stored_at=entry['stored_at'])
+            loaded += 1
+        return loaded
+    except Exception as e:
+        print(f"Warning: Could not load JD cache from {path}: {e}")
+        return 0
+
+def warm_job_description_cache(path=JD_CACHE_PATH):
+    """
+    Prebuilds the Courses.JOB_DESCRIPTIONS presets (their embeddings too once the
+    semantic model is loaded; warm_models() embeds them otherwise).
+    With a cache path, previously compiled JDs are loaded first and the cache is
+    written back now and at interpreter exit.
+    """
+    loaded = load_job_description_cache(path)
+    for text in JOB_DESCRIPTIONS.values():
+        get_job_description(text)
+    if 'semantic' in _models: _embed_cached_job_descriptions()
+    if path:
+        save_job_description_cache(path)
+        atexit.register(save_job_description_cache, path)
+    print(f"JD cache warm: {len(JD_CACHE)} job descriptions ({loaded} loaded from disk)")
+
+def _embed_cached_job_descriptions():
+    for _, jd, _ in JD_CACHE.items():
+        try: jd.embedding
+        except Exception as e: print(f"Semantic scoring error: {e}")
 
 # --- ENHANCED SCORING LOGIC ---
-def calculate_rigorous_score(resume_text, resume_edu_section, resume_exp_section, user_skills, job_description_text):
-    jd_lower = job_description_text.lower()
-    
+# Experience sections are embedded in batches of this size by calculate_rigorous_scores.
+SEMANTIC_BATCH_SIZE = int(os.environ.get('SEMANTIC_BATCH_SIZE', 32))
+
+def _skills_score(user_skills, jd):
     # 1. SKILLS SCORE (40 Points)
     unique_user_skills = set([s.lower() for s in user_skills])
     matched_skills = 0
     for skill in unique_user_skills:
-        if skill in jd_lower: matched_skills += 1
-    skills_score = (matched_skills / len(unique_user_skills)) * 40 if len(unique_user_skills) > 0 else 0
+        if jd.mentions_skill(skill): matched_skills += 1
+    return (matched_skills / len(unique_user_skills)) * 40 if len(unique_user_skills) > 0 else 0
 
+def _education_score(resume_edu_section, jd):
     # 2. EDUCATION SCORE (30 Points)
     edu_score = 0
-    if any(deg in resume_edu_section.lower() for deg in ['bachelor', 'master', 'phd', 'b.tech', 'm.tech', 'bsc', 'msc', 'associate']): edu_score += 20 
-    if resume_edu_section and job_description_text:
-        vectorizer = TfidfVectorizer(stop_words='english')
-        try:
-            tfidf_edu = vectorizer.fit_transform([resume_edu_section, job_description_text])
-            sim_edu = cosine_similarity(tfidf_edu[0:1], tfidf_edu[1:2])[0][0]
-            edu_score += (sim_edu * 10) 
-        except: pass
-    edu_score = min(edu_score, 30)
+    if any(deg in resume_edu_section.lower() for deg in DEGREE_KEYWORDS): edu_score += 20 
+    if resume_edu_section and jd.text:
+        sim_edu = tfidf_similarity(Counter(tfidf_analyzer()(resume_edu_section)), jd.tfidf_counts)
+        if sim_edu is not None: edu_score += (sim_edu * 10) 
+    return min(edu_score, 30)
 
+def _experience_score(resume_exp_section, jd):
     # 3. EXPERIENCE SCORE (20 Points - Reduced slightly to make room for Semantic)
     exp_score = 0
-    years_match = re.search(r'(\d+)\+?\s*years?', resume_exp_section.lower())
+    years_match = YEARS_PATTERN.search(resume_exp_section.lower())
     resume_years = int(years_match.group(1)) if years_match else 0
-    jd_years_match = re.search(r'(\d+)\+?\s*years?', jd_lower)
-    required_years = int(jd_years_match.group(1)) if jd_years_match else 0
+    required_years = jd.required_years
     
     if required_years > 0:
         if resume_years >= required_years: exp_score = 20
         else: exp_score = (resume_years / required_years) * 20
     else:
         exp_score = 5 if resume_years > 0 else 0
-    exp_score = round(exp_score, 2)
+    return round(exp_score, 2)
+
+def _rule_based_scores(resume_edu_section, resume_exp_section, user_skills, jd):
+    return _skills_score(user_skills, jd), _education_score(resume_edu_section, jd), _experience_score(resume_exp_section, jd)
+
+@timed_stage('semantic_fit')
+def _semantic_fit_scores(exp_sections, jd, batch_size):
+    # 4. SEMANTIC FIT SCORE (10 Points)
+    # The JD embedding comes from the compiled JD and all non-empty experience
+    # sections go through the model together, instead of two single-item
+    # forward passes per resume.
+    semantic_fits = [0] * len(exp_sections)
+    to_encode = [i for i, section in enumerate(exp_sections) if section]
+    if not (jd.text and to_encode):
+        return semantic_fits
+    semantic_model = get_semantic_model()
+    if not semantic_model:
+        return semantic_fits
+    from sentence_transformers import util
+
+    def encode(indices):
+        emb_resumes = semantic_model.encode([exp_sections[i] for i in indices], batch_size=batch_size, convert_to_tensor=True)
+        # Calculate cosine similarity, then scale 0.0-1.0 similarity to 0-10 points
+        scores = util.cos_sim(emb_resumes, jd.embedding)
+        for row, i in enumerate(indices):
+            semantic_fits[i] = float(scores[row][0]) * 10
+
+    try:
+        encode(to_encode)
+    except Exception as e:
+        # One section can fail the whole batch: score each on its own, so only
+        # the one that fails gets no semantic fit (as a single upload would)
+        print(f"Semantic scoring error (batch of {len(to_encode)}, retrying one by one): {e}")
+        for i in to_encode:
+            try:
+                encode([i])
+            except Exception as e:
+                print(f"Semantic scoring error: {e}")
+    return semantic_fits
 
-    # 4. SEMANTIC FIT SCORE (10 Points) - NEW FEATURE
-    semantic_fit = 0
-    if semantic_model and resume_exp_section and job_description_text:
+def calculate_rigorous_scores(resumes, job_description_text, batch_size=SEMANTIC_BATCH_SIZE):
+    """
+    Batch form of calculate_rigorous_score for shortlist and batch runs.
+    `resumes` is a list of dicts holding the per-resume keyword arguments of
+    calculate_rigorous_score (resume_text, resume_edu_section, resume_exp_section,
+    user_skills). `job_description_text` may be a JD string or a compiled
+    JobDescription. Returns one result dict per resume, in the same order; a
+    resume whose scoring raised gets its exception instead, so one bad resume
+    never fails the others.
+    """
+    jd = get_job_description(job_description_text)
+    semantic_fits = _semantic_fit_scores([r.get('resume_exp_section', '') for r in resumes], jd, batch_size)
+    results = []
+    for resume, semantic_fit in zip(resumes, semantic_fits):
         try:
-            # Encode text to vectors (embeddings)
-            emb_resume = semantic_model.encode(resume_exp_section, convert_to_tensor=True)
-            emb_jd = semantic_model.encode(job_description_text, convert_to_tensor=True)
-            # Calculate cosine similarity
-            score = util.cos_sim(emb_resume, emb_jd)
-            # Scale 0.0-1.0 similarity to 0-10 points
-            semantic_fit = float(score[0][0]) * 10
+            # Skills, TF-IDF education similarity and experience years
+            with stage('rule_scoring'):
+                skills_score, edu_score, exp_score = _rule_based_scores(
+                    resume.get('resume_edu_section', ''), resume.get('resume_exp_section', ''),
+                    resume.get('user_skills', []), jd
+                )
         except Exception as e:
-            print(f"Semantic scoring error: {e}")
-            
-    total_score = round(skills_score + edu_score + exp_score + semantic_fit, 2)
-    
-    return {
-        'total_score': total_score,
-        'breakdown': {
-            'skills': round(skills_score, 2),
-            'education': round(edu_score, 2),
-            'experience': round(exp_score, 2),
-            'semantic_fit': round(semantic_fit, 2) # New metric returned to frontend
-        }
-    }
\ No newline at end of file
+            results.append(e)
+            continue
+        total_score = round(skills_score + edu_score + exp_score + semantic_fit, 2)
+        results.append({
+            'total_score': total_score,
+            'breakdown': {
+                'skills': round(skills_score, 2),
+                'education': round(edu_score, 2),
+                'experience': round(exp_score, 2),
+                'semantic_fit': round(semantic_fit, 2) # New metric returned to frontend
+            }
+        })
+    return results
+
+def calculate_rigorous_score(resume_text, resume_edu_section, resume_exp_section, user_skills, job_description_text):
+    result = calculate_rigorous_scores([{
+        'resume_text': resume_text,
+        'resume_edu_section': resume_edu_section,
+        'resume_exp_section': resume_exp_section,
+        'user_skills': user_skills,
+    }], job_description_text)[0]
+    if isinstance(result, Exception): raise result
+    return result
+
+# --- CANDIDATE EMBEDDINGS ---
+@timed_stage('embedding')
+def embed_texts(texts, batch_size=SEMANTIC_BATCH_SIZE):
+    """Unit-length float32 embeddings (one numpy row per text), or None without the semantic model."""
+    semantic_model = get_semantic_model()
+    if not semantic_model: return None
+    return np.asarray(semantic_model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True), dtype='float32')
+
+def resume_embeddings(resumes, batch_size=SEMANTIC_BATCH_SIZE):
+    """
+    {'model', 'experience', 'resume'} embeddings of parsed resumes as float32
+    bytes, for write_behind.candidate_record. Experience is None when the
+    section is empty; every entry is None when the semantic model is unavailable.
+    """
+    texts = []
+    for resume in resumes:
+        texts.append(resume['sections'].get('Experience', ''))
+        texts.append(resume['raw_text'])
+    try:
+        vectors = embed_texts(texts, batch_size) if texts else None
+    except Exception as e:
+        print(f"Semantic scoring error: {e}")
+        vectors = None
+    if vectors is None: return [None] * len(resumes)
+    return [{'model': SEMANTIC_MODEL_NAME, 'experience': vectors[2 * i].tobytes() if texts[2 * i] else None,
+             'resume': vectors[2 * i + 1].tobytes()} for i in range(len(resumes))]
+
+# --- CONTENT-ADDRESSED RESUME CACHE ---
+# Bump PARSER_VERSION whenever pdf_reader / parse_resume_sections / extract_resume_data
+# change their output; editing Courses.KEYWORDS or the PDF budgets changes TAXONOMY_VERSION by itself.
+PARSER_VERSION = 1
+TAXONOMY_VERSION = hashlib.sha256((json.dumps(KEYWORDS, sort_keys=True) + f'|parser-{PARSER_VERSION}'
+                                   f'|pdf-{PDF_MAX_PAGES}-{PDF_MAX_CHARS}').encode('utf-8')).hexdigest()[:16]
+# Empty RESUME_CACHE_PATH keeps the cache in memory only
+RESUME_CACHE_PATH = os.environ.get('RESUME_CACHE_PATH', os.path.join('cache', 'resume_cache.sqlite3'))
+RESUME_CACHE = ResumeCache(
+    path=RESUME_CACHE_PATH or None,
+    version=TAXONOMY_VERSION,
+    memory_size=int(os.environ.get('RESUME_CACHE_SIZE', 512)),
+    max_disk_bytes=int(os.environ.get('RESUME_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+    encode=_resume_to_json, decode=_resume_from_json
+)
+
+def _copy_parsed(parsed):
+    # Callers get (and the cache keeps) their own dict, data dict and skills list, so
+    # editing a result never changes the cache. sections is a read-only ResumeSections
+    data = dict(parsed['data'], skills=list(parsed['data']['skills'])) if parsed['data'] else {}
+    return dict(parsed, data=data)
+
+def _parse_resume_deferred(file_input):
+    # parse_resume minus the NER name fallback and the cache write.
+    # Returns (key, parsed, done); done=False means the caller must finish it.
+    # Large uploads are hashed and spooled to disk in chunks, never read into memory whole
+    with spooled_pdf(file_input) as (source, key):
+        cached = RESUME_CACHE.get(key)
+        CACHE_REQUESTS.inc(cache='resume', result='miss' if cached is None else 'hit')
+        if cached is not None: return key, _copy_parsed(cached), True
+        pdf = read_pdf(source)
+
+    raw_text, pages = pdf['text'], pdf['pages']
+    parsed = {'raw_text': raw_text, 'pages': pages, 'cleaned_text': '', 'sections': {}, 'data': {},
+              'truncated': pdf['truncated'], 'pages_read': pdf['pages_read']}
+    if not raw_text.strip(): return key, parsed, True
+    cleaned_text = normalize_text(raw_text)
+    parsed['cleaned_text'] = cleaned_text
+    parsed['sections'] = parse_resume_sections(raw_text)
+    parsed['data'] = extract_resume_data(raw_text, cleaned_text, ner=False)
+    return key, parsed, False
+
+def _finish_parsed(pending):
+    # Runs the NER name fallback for every (key, parsed) that still needs it, then caches them
+    needs_ner = [parsed for _, parsed in pending if parsed['data']['name'] == 'Candidate']
+    if needs_ner:
+        for parsed, name in zip(needs_ner, ner_names([parsed['raw_text'] for parsed in needs_ner])):
+            parsed['data']['name'] = name
+    for key, parsed in pending:
+        # A time-budget cut depends on load, so the next upload gets a full try
+        if parsed.get('truncated') != 'time': RESUME_CACHE.set(key, _copy_parsed(parsed))
+
+def parse_resume(file_input):
+    """
+    Runs pdf_reader, normalize_text, parse_resume_sections and extract_resume_data
+    on a PDF path or upload, reusing the cached result when the same bytes have
+    been parsed before. Returns a dict with raw_text, pages, cleaned_text,
+    sections, data, and truncated / pages_read from read_pdf's budgets. PDFs
+    without text are not cached.
+    """
+    key, parsed, done = _parse_resume_deferred(file_input)
+    if not done: _finish_parsed([(key, parsed)])
+    return parsed
+
+def parse_resumes(file_inputs, progress=None):
+    """
+    Batch form of parse_resume for shortlist and batch jobs: the NER name
+    fallback runs as one nlp.pipe pass over every resume that needs it.
+    Returns one entry per input, in order; an input that failed to parse gets
+    its exception instead of a dict. `progress(done)` is called after each file.
+    """
+    results, pending = [], []
+    for i, file_input in enumerate(file_inputs):
+        try:
+            key, parsed, done = _parse_resume_deferred(file_input)
+            results.append(parsed)
+            if not done: pending.append((i, key, parsed))
+        except Exception as e:
+            results.append(e)
+        if progress: progress(i + 1)
+    try:
+        _finish_parsed([(key, parsed) for _, key, parsed in pending])
+    except Exception:
+        # Batch failed: retry one by one so only the resumes that really fail are lost
+        for i, key, parsed in pending:
+            try: _finish_parsed([(key, parsed)])
+            except Exception as e: results[i] = e
+    return results
+
+IMPORT_SECONDS = round(time.perf_counter() - _import_started, 3)
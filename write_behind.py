@@ -0,0 +1,416 @@
+"""
+Write-behind persistence of scored candidates.
+
+insert_candidates writes any number of candidates (user_data, user_skills and
+the skill counts) with one multi-row INSERT per table, skipping those whose
+content_hash is already stored. WriteBehindQueue runs
+it from a background thread: records are collected in memory and written in
+one transaction per batch, once batch_size records are waiting or the oldest
+has waited flush_interval seconds.
+
+Memory is bounded by max_pending: past it, records go straight to the spill
+file (JSON lines, fsynced), as does whatever is still queued at close() or
+when the database is down at shutdown. The spill file is written back on the
+next start(), or as soon as the queue is idle again. Delivery is
+at-least-once: a crash between a batch commit and the spill offset update
+re-inserts that batch. Processes must not share a spill file.
+
+While the database is unreachable a batch is retried until it is back. A
+batch the database itself refuses (a constraint, an oversized value) is
+retried max_retries times, then written in halves down to the records that
+fail alone; those go to the rejected file (spill path + '.rejected', JSON
+lines with the error) instead of blocking every later write.
+"""
+import os
+import json
+import base64
+import time
+import datetime
+import itertools
+import threading
+import collections
+
+import pymysql
+from db_pool import PoolTimeout
+from Courses import SKILLS_DICT, COURSES
+from skill_stats import record_skills_many, retry_deadlocks
+
+USER_DATA_INSERT_COLUMNS = ['Name', 'Email_ID', 'resume_score', 'Timestamp', 'Page_no', 'Predicted_Field',
+                            'User_level', 'Recommended_skills', 'Recommended_courses', 'content_hash']
+
+def candidate_level(pages):
+    return 'Fresher' if pages == 1 else ('Intermediate' if pages == 2 else 'Experienced')
+
+def candidate_record(name, email, score, pages, field, skills, timestamp=None, embeddings=None, content_hash=None):
+    """
+    One user_data row plus its skills (and embeddings from utils.resume_embeddings,
+    if any), as stored by insert_candidates. `timestamp` defaults to now;
+    `content_hash` (the resume file's sha256) makes storing it idempotent.
+    """
+    return {
+        'name': name, 'email': email, 'score': round(score, 2),
+        'timestamp': timestamp or datetime.datetime.now().replace(microsecond=0),
+        'pages': pages, 'field': field, 'level': candidate_level(pages),
+        'recommended_skills': SKILLS_DICT.get(field, []), 'recommended_courses': COURSES.get(field, []),
+        'skills': list(skills), 'embeddings': embeddings, 'content_hash': content_hash,
+    }
+
+def insert_candidates(cursor, records):
+    """
+    Inserts candidate records with their user_skills rows and skill counts and
+    returns the new user_data IDs. Records with a content_hash go in one
+    multi-row INSERT and their IDs are read back by hash; the others (uploads)
+    are inserted one by one for their lastrowid. A record
+    whose content_hash is already stored (or repeated earlier in `records`) is
+    skipped and gets None for its ID, so writing a batch twice stores it once.
+    Does not commit, so callers decide the transaction.
+    """
+    hashes = {r.get('content_hash') for r in records} - {None}
+    stored = set()
+    if hashes:
+        cursor.execute(f"SELECT content_hash FROM user_data WHERE content_hash IN ({', '.join(['%s'] * len(hashes))})", sorted(hashes))
+        stored = {row[0] for row in cursor.fetchall()}
+    keep = []
+    for r in records:
+        content_hash = r.get('content_hash')
+        keep.append(content_hash not in stored)
+        if content_hash: stored.add(content_hash)
+    new_ids = iter(_insert_new_candidates(cursor, [r for r, new in zip(records, keep) if new]))
+    return [next(new_ids) if new else None for new in keep]
+
+def _user_data_values(record):
+    return (record['name'], record['email'], record['score'], record['timestamp'], str(record['pages']), record['field'],
+            record['level'], str(record['recommended_skills']), str(record['recommended_courses']), record.get('content_hash'))
+
+def _insert_new_candidates(cursor, records):
+    if not records: return []
+    placeholders = '(' + ', '.join(['%s'] * len(USER_DATA_INSERT_COLUMNS)) + ')'
+    insert = f"INSERT INTO user_data ({', '.join(USER_DATA_INSERT_COLUMNS)}) VALUES "
+    # A multi-row INSERT's IDs are not necessarily consecutive (innodb_autoinc_lock_mode=2, the
+    # MySQL 8 default, interleaves concurrent inserts), so they are read back by content hash
+    hashed = [r for r in records if r.get('content_hash')]
+    ids_by_hash = {}
+    if hashed:
+        cursor.execute(insert + ', '.join([placeholders] * len(hashed)), [value for r in hashed for value in _user_data_values(r)])
+        hashes = [r['content_hash'] for r in hashed]
+        cursor.execute(f"SELECT ID, content_hash FROM user_data WHERE content_hash IN ({', '.join(['%s'] * len(hashes))})", hashes)
+        ids_by_hash = {content_hash: user_id for user_id, content_hash in cursor.fetchall()}
+    ids = []
+    for r in records:
+        if r.get('content_hash'):
+            ids.append(ids_by_hash[r['content_hash']])
+        else:
+            cursor.execute(insert + placeholders, _user_data_values(r))
+            ids.append(cursor.lastrowid)
+    skill_rows = [(user_id, skill) for user_id, r in zip(ids, records) for skill in r['skills']]
+    if skill_rows:
+        cursor.executemany("INSERT INTO user_skills (user_id, skill_name) VALUES (%s, %s)", skill_rows)
+        record_skills_many(cursor, [(r['skills'], r['field'], r['timestamp']) for r in records])
+    embedding_rows = [(user_id, e['model'], e['experience'], e['resume'])
+                      for user_id, e in zip(ids, (r.get('embeddings') for r in records)) if e]
+    if embedding_rows:
+        cursor.executemany("INSERT INTO candidate_embeddings (user_id, model, experience, resume) VALUES (%s, %s, %s, %s)", embedding_rows)
+    return ids
+
+def _dump_record(record):
+    embeddings = record.get('embeddings')
+    if embeddings:
+        embeddings = {key: base64.b64encode(value).decode() if isinstance(value, bytes) else value for key, value in embeddings.items()}
+    return json.dumps(dict(record, timestamp=record['timestamp'].isoformat() if record['timestamp'] else None, embeddings=embeddings))
+
+def _is_connection_error(error):
+    # The database is unreachable rather than refusing the rows: client-side
+    # (CR_*, 2000-2999) errors, a closed connection, an exhausted pool
+    if isinstance(error, (PoolTimeout, ConnectionError, pymysql.err.InterfaceError)): return True
+    code = error.args[0] if isinstance(error, pymysql.err.OperationalError) and error.args else None
+    return isinstance(code, int) and 2000 <= code < 3000
+
+def _load_record(line):
+    record = json.loads(line)
+    if record['timestamp']: record['timestamp'] = datetime.datetime.fromisoformat(record['timestamp'])
+    if record.get('embeddings'):
+        record['embeddings'] = {key: base64.b64decode(value) if value and key != 'model' else value for key, value in record['embeddings'].items()}
+    return record
+
+class WriteBehindQueue:
+    """
+    Background batch writer for candidate records (see the module docstring).
+    `pool` is a db_pool.ConnectionPool; on_written(records, ids) runs after each
+    committed batch. submit() never touches the database;
+    flush() waits until everything submitted so far is written (or spilled);
+    stats() reports batches, write time, errors and spill traffic.
+    """
+    def __init__(self, pool, batch_size=200, flush_interval=1.0, max_pending=5000, spill_path=None, retry_interval=5.0, on_written=None,
+                 max_retries=3, rejected_path=None):
+        self.pool = pool
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.retry_interval = retry_interval
+        self.max_retries = max_retries
+        self.rejected_path = rejected_path or (spill_path + '.rejected' if spill_path else None)
+        self._pending = collections.deque()  # (enqueued at, record)
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._in_flight = 0
+        self._in_flight_batch = None
+        self._failures = 0     # consecutive refusals of the batch at the front
+        self._queued = 0       # records ever queued
+        self._done = 0         # of those, written or spilled
+        self._flush_target = 0
+        self._retry_at = 0.0
+        self._replay_needed = False
+        self._metrics = {
+            'submitted': 0, 'written': 0, 'batches': 0, 'write_seconds_total': 0.0, 'write_errors': 0,
+            'spilled': 0, 'replayed': 0, 'rejected': 0, 'dropped': 0, 'last_error': None
+        }
+
+    def start(self):
+        with self._cond:
+            self._stopping = False
+            self._replay_needed = bool(self.spill_path) and (os.path.exists(self.spill_path) or os.path.exists(self.spill_path + '.replaying'))
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, record):
+        self.submit_many([record])
+
+    def submit_many(self, records):
+        overflow = []
+        with self._cond:
+            self._metrics['submitted'] += len(records)
+            for record in records:
+                if self._stopping or len(self._pending) >= self.max_pending:
+                    overflow.append(record)
+                else:
+                    self._pending.append((time.monotonic(), record))
+                    self._queued += 1
+            if len(self._pending) >= self.batch_size: self._cond.notify_all()
+        self._spill(overflow)
+
+    def flush(self, timeout=None):
+        """Writes out everything submitted so far; False if that did not finish within `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._flush_target = max(self._flush_target, self._queued)
+            self._cond.notify_all()
+            while self._done < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Writes what it can within `timeout` seconds, then spills the rest."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            leftover = [record for _, record in self._pending]
+            self._pending.clear()
+            if self._in_flight_batch is not None:
+                # Still being written by the (daemon) writer thread, which dies with the process:
+                # spilled too, so it is not lost (if the write commits after all, replay re-inserts it)
+                leftover = self._in_flight_batch + leftover
+                self._in_flight_batch = None
+                self._in_flight = 0
+            self._done += len(leftover)
+            self._cond.notify_all()
+        self._spill(leftover)
+
+    def _write(self, records):
+        start = time.perf_counter()
+        with self.pool.connection() as connection:
+            ids = retry_deadlocks(connection, lambda cursor: insert_candidates(cursor, records))
+        if self.on_written:
+            # Committed already: a failing callback must not send the batch round again
+            try: self.on_written(records, ids)
+            except Exception as e: print(f"Write-behind callback error: {e}")
+        with self._cond:
+            self._metrics['written'] += len(records)
+            self._metrics['batches'] += 1
+            self._metrics['write_seconds_total'] += time.perf_counter() - start
+
+    def _write_failed(self, error):
+        print(f"Write-behind error: {error}")
+        with self._cond:
+            self._metrics['write_errors'] += 1
+            self._metrics['last_error'] = str(error)
+            self._retry_at = time.monotonic() + self.retry_interval
+
+    def _next_batch(self):
+        # Blocks until a batch is due. [] means "replay the spill file", None means "exit".
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._pending:
+                    if self._stopping: break
+                    due = (len(self._pending) >= self.batch_size or self._flush_target > self._done
+                           or now - self._pending[0][0] >= self.flush_interval)
+                    if due and now >= self._retry_at: break
+                    timeout = (self._retry_at if due else self._pending[0][0] + self.flush_interval) - now
+                elif self._stopping:
+                    return None
+                elif self._replay_needed:
+                    if now >= self._retry_at: return []
+                    timeout = self._retry_at - now
+                else:
+                    timeout = None
+                self._cond.wait(timeout)
+            batch = [self._pending.popleft()[1] for _ in range(min(self.batch_size, len(self._pending)))]
+            self._in_flight = len(batch)
+            self._in_flight_batch = batch
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None: return
+            if not batch:
+                self._replay_spill()
+                continue
+            try:
+                self._write(batch)
+                self._failures = 0
+            except Exception as e:
+                self._write_failed(e)
+                unwritten = batch
+                if not _is_connection_error(e):
+                    self._failures += 1
+                    if self._failures >= self.max_retries:
+                        self._failures = 0
+                        unwritten = self._write_isolating(batch)
+                with self._cond:
+                    if self._in_flight_batch is not batch: return  # close() already spilled it
+                    self._in_flight, self._in_flight_batch = 0, None
+                    self._done += len(batch) - len(unwritten)
+                    if not unwritten:
+                        self._cond.notify_all()
+                        continue
+                    if not self._stopping:
+                        # Back to the front, in order, for the retry
+                        self._pending.extendleft((time.monotonic(), record) for record in reversed(unwritten))
+                        continue
+                    # Shutting down with the database unreachable: everything goes to disk
+                    leftover = unwritten + [record for _, record in self._pending]
+                    self._pending.clear()
+                    self._done += len(leftover)
+                    self._cond.notify_all()
+                self._spill(leftover)
+                return
+            with self._cond:
+                if self._in_flight_batch is not batch: return  # close() already spilled it
+                self._in_flight, self._in_flight_batch = 0, None
+                self._done += len(batch)
+                self._cond.notify_all()
+
+    def _write_isolating(self, records):
+        """
+        Writes a batch the database keeps refusing in halves, down to the single
+        records it refuses, which are rejected. Returns the records left unwritten
+        because the database became unreachable meanwhile ([] when all are handled).
+        """
+        parts = [records]
+        while parts:
+            part = parts.pop(0)
+            try:
+                self._write(part)
+            except Exception as e:
+                if _is_connection_error(e):
+                    return [record for unwritten in [part] + parts for record in unwritten]
+                if len(part) == 1:
+                    self._reject(part[0], e)
+                else:
+                    middle = len(part) // 2
+                    parts[:0] = [part[:middle], part[middle:]]
+        return []
+
+    def _reject(self, record, error):
+        print(f"Write-behind: database rejected candidate {record.get('name')!r}: {error}")
+        if not self.rejected_path:
+            with self._cond: self._metrics['dropped'] += 1
+            return
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.rejected_path)), exist_ok=True)
+            with open(self.rejected_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'error': str(error), 'record': json.loads(_dump_record(record))}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        with self._cond: self._metrics['rejected'] += 1
+
+    def _spill(self, records):
+        if not records: return
+        if not self.spill_path:
+            print(f"Write-behind: no spill file, dropping {len(records)} candidate records")
+            with self._cond: self._metrics['dropped'] += len(records)
+            return
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(_dump_record(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        with self._cond:
+            self._metrics['spilled'] += len(records)
+            if not self._stopping:
+                self._replay_needed = True
+                self._cond.notify_all()
+
+    def _replay_spill(self):
+        # The spill file is renamed to .replaying and written back batch by batch;
+        # .replaying.offset remembers how far, so a failed or interrupted replay resumes there
+        with self._cond: self._replay_needed = False
+        replaying = self.spill_path + '.replaying'
+        offset_path = replaying + '.offset'
+        with self._spill_lock:
+            if not os.path.exists(replaying):
+                if not os.path.exists(self.spill_path): return
+                os.replace(self.spill_path, replaying)
+        offset = 0
+        if os.path.exists(offset_path):
+            with open(offset_path) as f: offset = int(f.read() or 0)
+        with open(replaying, 'rb') as f:
+            f.seek(offset)
+            while not self._stopping:
+                lines = list(itertools.islice(f, self.batch_size))
+                if not lines: break
+                records = []
+                for line in lines:
+                    try: records.append(_load_record(line))
+                    except (ValueError, KeyError) as e: print(f"Write-behind: skipping unreadable spill line: {e}")
+                try:
+                    self._write(records)
+                except Exception as e:
+                    self._write_failed(e)
+                    # A refused spill batch is isolated right away, or it would stall the replay for good
+                    if _is_connection_error(e) or self._write_isolating(records):
+                        with self._cond: self._replay_needed = True
+                        return
+                with open(offset_path, 'w') as offset_file: offset_file.write(str(f.tell()))
+                with self._cond: self._metrics['replayed'] += len(records)
+            else:
+                # close() came first: the offset file picks this up on the next start
+                return
+        os.remove(replaying)
+        if os.path.exists(offset_path): os.remove(offset_path)
+        # Records spilled while this replay ran are picked up on the next idle moment
+        with self._spill_lock, self._cond:
+            self._replay_needed = self._replay_needed or os.path.exists(self.spill_path)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._metrics)
+            stats.update({'pending': len(self._pending), 'in_flight': self._in_flight, 'max_pending': self.max_pending,
+                          'batch_size': self.batch_size, 'flush_interval': self.flush_interval})
+        stats['avg_batch_size'] = stats['written'] / stats['batches'] if stats['batches'] else 0.0
+        stats['spill_file_bytes'] = sum(os.path.getsize(path) for path in (self.spill_path, (self.spill_path or '') + '.replaying')
+                                        if path and os.path.exists(path))
+        return stats